@@ -71,7 +71,7 @@ intersphinx_mapping = {
     "xarray" : ("https://docs.xarray.dev/en/stable/", None),
 }
 
-templates_path = ["_templates"]
+templates_path = ["_templates", sphinx_autosummary_accessors.templates_path]
 
 html_theme = 'sphinx_book_theme'
 html_title =""
@@ -49,6 +49,15 @@ module base
       character(STRMAX) :: out_type             = "NETCDF_DOUBLE" !! Binary format of output file
       character(STRMAX) :: out_form             = "XVEL"          !! Data to write to output file
       character(STRMAX) :: out_stat             = 'NEW'           !! Open status for output binary file
+      character(NAMELEN):: nc_chunking          = "DEFAULT"       !! Chunk layout of the NetCDF output files. Options are ["DEFAULT"], 
+                                                                  !!    "TIMESERIES" (fast reads of the history of each body), or
+                                                                  !!    "SNAPSHOT" (fast reads of each output frame)
+      integer(I4B)      :: nc_chunk_time        = 0               !! Chunk size along the time dimension of the NetCDF output files 
+                                                                  !!    (0 to use the value set by nc_chunking)
+      integer(I4B)      :: nc_chunk_name        = 0               !! Chunk size along the name dimension of the NetCDF output files
+                                                                  !!    (0 to use the value set by nc_chunking)
+      integer(I4B)      :: nc_deflate_level     = 0               !! zlib compression level (0-9) of the NetCDF output files. 0 is off
+      logical           :: lnc_shuffle          = .false.         !! Apply the shuffle filter to the NetCDF output file variables
       integer(I4B)      :: dump_cadence         =  10             !! Number of output steps between dumping simulation data to file
       real(DP)          :: rmin                 = -1.0_DP         !! Minimum heliocentric radius for test particle
       real(DP)          :: rmax                 = -1.0_DP         !! Maximum heliocentric radius for test particle
@@ -73,20 +82,39 @@ module base
                                                                   !!    through recursion steps are saved
       logical           :: lenc_save_closest    = .false.         !! Indicates that when encounters are saved, the closest approach 
                                                                   !!    distance between pairs of bodies is saved
-      character(NAMELEN):: interaction_loops    = "ADAPTIVE"      !! Method used to compute interaction loops. 
-                                                                  !!    Options are "TRIANGULAR", "FLAT", or "ADAPTIVE" 
-      character(NAMELEN):: encounter_check_plpl = "ADAPTIVE"      !! Method used to compute pl-pl encounter checks. 
-                                                                  !!    Options are "TRIANGULAR", "SORTSWEEP", or "ADAPTIVE" 
-      character(NAMELEN):: encounter_check_pltp = "ADAPTIVE"      !! Method used to compute pl-tp encounter checks. 
-                                                                  !!    Options are "TRIANGULAR", "SORTSWEEP", or "ADAPTIVE" 
+      character(NAMELEN):: interaction_loops    = "TRIANGULAR"    !! Method used to compute interaction loops. 
+                                                                  !!    Options are "TRIANGULAR", "FLAT", "BLOCKED", or "AUTO" 
+      character(NAMELEN):: encounter_check_plpl = "TRIANGULAR"    !! Method used to compute pl-pl encounter checks. 
+                                                                  !!    Options are "TRIANGULAR", "SORTSWEEP", "GRID", or "AUTO" 
+      character(NAMELEN):: encounter_check_pltp = "TRIANGULAR"    !! Method used to compute pl-tp encounter checks. 
+                                                                  !!    Options are "TRIANGULAR", "SORTSWEEP", "GRID", or "AUTO" 
       logical           :: lcoarray             = .false.         !! Use Coarrays for test particle parallelization.
+      real(DP)          :: coarray_imbalance    = 0.1_DP          !! Fraction by which the step time of the slowest Coarray image can 
+                                                                  !!    exceed the mean of all images before test particles are rebalanced
+      logical           :: ltree_gravity        = .false.         !! Use a Barnes-Hut octree to compute the accelerations of test 
+                                                                  !!    particles by massive bodies
+      real(DP)          :: tree_theta           = 0.5_DP          !! Opening angle of the Barnes-Hut octree
+      logical           :: lasync_output        = .false.         !! Write the stored output frames to file on a separate writer 
+                                                                  !!    thread while the integration continues
+      logical           :: lsharded_output      = .false.         !! Each Coarray image writes its own shard of the output file 
+                                                                  !!    instead of waiting its turn to write into the shared one
 
       ! The following are not set by the user, but instead are determined by the input value of INTERACTION_LOOPS
       logical :: lflatten_interactions     = .false. !! Use the flattened upper triangular matrix for pl-pl interaction loops
+      logical :: lblock_interactions       = .false. !! Use the cache-blocked tiles for pl-pl interaction loops
       logical :: lencounter_sas_plpl       = .false. !! Use the Sort and Sweep algorithm to prune the encounter list before checking 
                                                      !!     for close encounters
       logical :: lencounter_sas_pltp       = .false. !! Use the Sort and Sweep algorithm to prune the encounter list before checking 
                                                      !!  for close encounters
+      logical :: lencounter_grid_plpl      = .false. !! Use the uniform grid (spatial hashing) algorithm to prune the encounter list 
+                                                     !!     before checking for close encounters
+      logical :: lencounter_grid_pltp      = .false. !! Use the uniform grid (spatial hashing) algorithm to prune the encounter list 
+                                                     !!     before checking for close encounters
+      logical :: lautotune_interactions    = .false. !! Time each of the interaction loop methods and select the fastest one
+      logical :: lautotune_encounter_plpl  = .false. !! Time each of the pl-pl encounter check methods and select the fastest one
+      logical :: lautotune_encounter_pltp  = .false. !! Time each of the pl-tp encounter check methods and select the fastest one
+      integer(I4B) :: autotune_npl         = 0       !! Number of massive bodies when the AUTO methods were last selected
+      integer(I4B) :: autotune_ntp         = 0       !! Number of test particles when the AUTO methods were last selected
 
       ! Logical flags to turn on or off various features of the code
       logical :: lrhill_present = .false. !! Hill radii are given as an input rather than calculated by the code (can be used to 
@@ -2227,6 +2255,11 @@ module base
          call coclone(self%out_type)
          call coclone(self%out_form)
          call coclone(self%out_stat)
+         call coclone(self%nc_chunking)
+         call coclone(self%nc_chunk_time)
+         call coclone(self%nc_chunk_name)
+         call coclone(self%nc_deflate_level)
+         call coclone(self%lnc_shuffle)
          call coclone(self%dump_cadence)
          call coclone(self%rmin)
          call coclone(self%rmax)
@@ -2252,8 +2285,16 @@ module base
          call coclone(self%encounter_check_plpl)
          call coclone(self%encounter_check_pltp)
          call coclone(self%lflatten_interactions)
+         call coclone(self%lblock_interactions)
          call coclone(self%lencounter_sas_plpl)
          call coclone(self%lencounter_sas_pltp      )
+         call coclone(self%lencounter_grid_plpl)
+         call coclone(self%lencounter_grid_pltp)
+         call coclone(self%lautotune_interactions)
+         call coclone(self%lautotune_encounter_plpl)
+         call coclone(self%lautotune_encounter_pltp)
+         call coclone(self%autotune_npl)
+         call coclone(self%autotune_ntp)
          call coclone(self%lrhill_present)
          call coclone(self%lextra_force  )
          call coclone(self%lbig_discard  )
@@ -2282,6 +2323,11 @@ module base
          call coclone(self%lyorp     )
          call coclone(self%seed)
          call coclone(self%lcoarray)
+         call coclone(self%coarray_imbalance)
+         call coclone(self%ltree_gravity)
+         call coclone(self%lasync_output)
+         call coclone(self%lsharded_output)
+         call coclone(self%tree_theta)
 
          return
       end subroutine base_coclone_param 
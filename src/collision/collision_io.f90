@@ -239,6 +239,7 @@ contains
 
             call netcdf_io_check( nf90_inquire(nc%id, nVariables=nvar), "collision_io_netcdf_initialize_output nf90_inquire nVariables"  )
             do varid = 1, nvar
+               call nc%def_var_storage(varid, param)
                call netcdf_io_check( nf90_inquire_variable(nc%id, varid, xtype=vartype, ndims=ndims), "collision_io_netcdf_initialize_output nf90_inquire_variable"  )
                select case(vartype)
                case(NF90_INT)
@@ -14,7 +14,8 @@ contains
    module subroutine encounter_check_all_plpl(param, npl, r, v, renc, dt, nenc, index1, index2, lvdotr)
       !! author: David A. Minton
       !!
-      !! Check for encounters between massive bodies. Choose between the standard triangular or the Sort & Sweep method based on user inputs
+      !! Check for encounters between massive bodies. Choose between the standard triangular, the Sort & Sweep, or the uniform grid 
+      !! method based on user inputs
       !!
       implicit none
       ! Arguments
@@ -31,6 +32,8 @@ contains
 
       if (param%lencounter_sas_plpl) then
          call encounter_check_all_sort_and_sweep_plpl(npl, r, v, renc, dt, nenc, index1, index2, lvdotr)
+      else if (param%lencounter_grid_plpl) then
+         call encounter_check_all_grid_plpl(npl, r, v, renc, dt, nenc, index1, index2, lvdotr)
       else
          call encounter_check_all_triangular_plpl(npl, r, v, renc, dt, nenc, index1, index2, lvdotr) 
       end if
@@ -42,7 +45,8 @@ contains
    module subroutine encounter_check_all_plplm(param, nplm, nplt, rplm, vplm, rplt, vplt, rencm, renct, dt, nenc, index1, index2, lvdotr)
       !! author: David A. Minton
       !!
-      !! Check for encounters between fully interacting massive bodies partially interacting massive bodies. Choose between the standard triangular or the Sort & Sweep method based on user inputs
+      !! Check for encounters between fully interacting massive bodies partially interacting massive bodies. Choose between the standard 
+      !! triangular, the Sort & Sweep, or the uniform grid method based on user inputs
       !!
       implicit none
       ! Arguments
@@ -78,6 +82,9 @@ contains
       if (param%lencounter_sas_plpl) then
          call encounter_check_all_sort_and_sweep_plplm(nplm, nplt, rplm, vplm, rplt, vplt, rencm, renct, dt, &
                                                        plmplt_nenc, plmplt_index1, plmplt_index2, plmplt_lvdotr)
+      else if (param%lencounter_grid_plpl) then
+         call encounter_check_all_grid_plplm(nplm, nplt, rplm, vplm, rplt, vplt, rencm, renct, dt, &
+                                             plmplt_nenc, plmplt_index1, plmplt_index2, plmplt_lvdotr)
       else
          call encounter_check_all_triangular_plplm(nplm, nplt, rplm, vplm, rplt, vplt, rencm, renct, dt, &
                                                    plmplt_nenc, plmplt_index1, plmplt_index2, plmplt_lvdotr) 
@@ -112,7 +119,8 @@ contains
    module subroutine encounter_check_all_pltp(param, npl, ntp, rpl, vpl, rtp, vtp, renc, dt, nenc, index1, index2, lvdotr)
       !! author: David A. Minton
       !!
-      !! Check for encounters between massive bodies and test particles. Choose between the standard triangular or the Sort & Sweep method based on user inputs
+      !! Check for encounters between massive bodies and test particles. Choose between the standard triangular, the Sort & Sweep, or 
+      !! the uniform grid method based on user inputs
       !!
       implicit none
       ! Arguments
@@ -132,6 +140,8 @@ contains
 
       if (param%lencounter_sas_pltp) then
          call encounter_check_all_sort_and_sweep_pltp(npl, ntp, rpl, vpl, rtp, vtp, renc, dt, nenc, index1, index2, lvdotr)
+      else if (param%lencounter_grid_pltp) then
+         call encounter_check_all_grid_pltp(npl, ntp, rpl, vpl, rtp, vtp, renc, dt, nenc, index1, index2, lvdotr)
       else
          call encounter_check_all_triangular_pltp(npl, ntp, rpl, vpl, rtp, vtp, renc, dt, nenc, index1, index2, lvdotr) 
       end if
@@ -140,6 +150,124 @@ contains
    end subroutine encounter_check_all_pltp
 
 
+   subroutine encounter_check_all_grid_plpl(npl, r, v, renc, dt, nenc, index1, index2, lvdotr)
+      !! Check for encounters between massive bodies by binning them into a spatial hash grid and searching each body's cells 
+      !! for neighbors. The grid is saved between calls so its storage is reused from step to step.
+      implicit none
+      ! Arguments
+      integer(I4B),                            intent(in)  :: npl    !! Total number of massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: r      !! Position vectors of massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: v      !! Velocity vectors of massive bodies
+      real(DP),     dimension(:),              intent(in)  :: renc   !! Critical radii of massive bodies that defines an encounter 
+      real(DP),                                intent(in)  :: dt     !! Step size
+      integer(I8B),                            intent(out) :: nenc   !! Total number of encounters
+      integer(I4B), dimension(:), allocatable, intent(out) :: index1 !! List of indices for body 1 in each encounter
+      integer(I4B), dimension(:), allocatable, intent(out) :: index2 !! List of indices for body 2 in each encounter
+      logical,      dimension(:), allocatable, intent(out) :: lvdotr !! Logical flag indicating the sign of v .dot. x
+      ! Internals
+      type(encounter_grid), save :: grid
+
+      nenc = 0_I8B
+      if (npl == 0) return
+
+      call grid%bin(npl, r, v, renc, dt)
+
+      call grid%search(npl, r, v, renc, dt, nenc, index1, index2, lvdotr)
+
+      return
+   end subroutine encounter_check_all_grid_plpl
+
+
+   subroutine encounter_check_all_grid_plplm(nplm, nplt, rplm, vplm, rplt, vplt, rencm, renct, dt, nenc, index1, index2, lvdotr)
+      !! Check for encounters between fully and partially interacting massive bodies with a spatial hash grid. Both lists are 
+      !! binned into one grid, and only the cells of the fully interacting bodies are searched for partially interacting 
+      !! neighbors.
+      implicit none
+      ! Arguments
+      integer(I4B),                            intent(in)  :: nplm   !! Total number of fully interacting massive bodies 
+      integer(I4B),                            intent(in)  :: nplt   !! Total number of partially interacting masive bodies (GM < GMTINY) 
+      real(DP),     dimension(:,:),            intent(in)  :: rplm   !! Position vectors of fully interacting massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: vplm   !! Velocity vectors of fully interacting massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: rplt   !! Position vectors of partially interacting massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: vplt   !! Velocity vectors of partially interacting massive bodies
+      real(DP),     dimension(:),              intent(in)  :: rencm  !! Critical radii of fully interacting massive bodies that defines an encounter
+      real(DP),     dimension(:),              intent(in)  :: renct  !! Critical radii of partially interacting massive bodies that defines an encounter
+      real(DP),                                intent(in)  :: dt     !! Step size
+      integer(I8B),                            intent(out) :: nenc   !! Total number of encounter
+      integer(I4B), dimension(:), allocatable, intent(out) :: index1 !! List of indices for body 1 in each encounter
+      integer(I4B), dimension(:), allocatable, intent(out) :: index2 !! List of indices for body 2 in each encounter
+      logical,      dimension(:), allocatable, intent(out) :: lvdotr !! Logical flag indicating the sign of v .dot. x
+      ! Internals
+      type(encounter_grid), save :: grid
+      integer(I4B) :: ntot
+      real(DP), dimension(:,:), allocatable :: r, v
+      real(DP), dimension(:), allocatable :: renc
+
+      nenc = 0_I8B
+      if ((nplm == 0) .or. (nplt == 0)) return
+
+      ntot = nplm + nplt
+      allocate(r(NDIM,ntot), v(NDIM,ntot), renc(ntot))
+      r(:,1:nplm) = rplm(:,1:nplm)
+      r(:,nplm+1:ntot) = rplt(:,1:nplt)
+      v(:,1:nplm) = vplm(:,1:nplm)
+      v(:,nplm+1:ntot) = vplt(:,1:nplt)
+      renc(1:nplm) = rencm(1:nplm)
+      renc(nplm+1:ntot) = renct(1:nplt)
+
+      call grid%bin(ntot, r, v, renc, dt)
+
+      call grid%search(nplm, nplt, r, v, renc, dt, nenc, index1, index2, lvdotr)
+
+      return
+   end subroutine encounter_check_all_grid_plplm
+
+
+   subroutine encounter_check_all_grid_pltp(npl, ntp, rpl, vpl, rtp, vtp, rencpl, dt, nenc, index1, index2, lvdotr)
+      !! Check for encounters between massive bodies and test particles with a spatial hash grid. The test particles are binned 
+      !! with a zero encounter radius alongside the massive bodies, and the cells of each massive body are searched for test 
+      !! particles.
+      implicit none
+      ! Arguments
+      integer(I4B),                            intent(in)  :: npl    !! Total number of massive bodies 
+      integer(I4B),                            intent(in)  :: ntp    !! Total number of test particles 
+      real(DP),     dimension(:,:),            intent(in)  :: rpl    !! Position vectors of massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: vpl    !! Velocity vectors of massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: rtp    !! Position vectors of massive bodies
+      real(DP),     dimension(:,:),            intent(in)  :: vtp    !! Velocity vectors of massive bodies
+      real(DP),     dimension(:),              intent(in)  :: rencpl !! Critical radii of massive bodies that defines an encounter
+      real(DP),                                intent(in)  :: dt     !! Step size
+      integer(I8B),                            intent(out) :: nenc   !! Total number of encounter
+      integer(I4B), dimension(:), allocatable, intent(out) :: index1 !! List of indices for body 1 in each encounter
+      integer(I4B), dimension(:), allocatable, intent(out) :: index2 !! List of indices for body 2 in each encounter
+      logical,      dimension(:), allocatable, intent(out) :: lvdotr !! Logical flag indicating the sign of v .dot. x
+      ! Internals
+      type(encounter_grid), save :: grid
+      integer(I4B) :: ntot
+      real(DP), dimension(:,:), allocatable :: r, v
+      real(DP), dimension(:), allocatable :: renc
+
+      nenc = 0_I8B
+      if ((ntp == 0) .or. (npl == 0)) return
+
+      ntot = npl + ntp
+      allocate(r(NDIM,ntot), v(NDIM,ntot), renc(ntot))
+      r(:,1:npl) = rpl(:,1:npl)
+      r(:,npl+1:ntot) = rtp(:,1:ntp)
+      v(:,1:npl) = vpl(:,1:npl)
+      v(:,npl+1:ntot) = vtp(:,1:ntp)
+      renc(1:npl) = rencpl(1:npl)
+      renc(npl+1:ntot) = 0.0_DP
+
+      ! Size the cells from the massive bodies, as the test particles have no encounter radius of their own
+      call grid%bin(ntot, r, v, renc, dt, nsize=npl)
+
+      call grid%search(npl, ntp, r, v, renc, dt, nenc, index1, index2, lvdotr)
+
+      return
+   end subroutine encounter_check_all_grid_pltp
+
+
    subroutine encounter_check_all_sort_and_sweep_plpl(npl, r, v, renc, dt, nenc, index1, index2, lvdotr)
       !! author: David A. Minton
       !!
@@ -621,6 +749,288 @@ contains
    end subroutine encounter_check_one
 
 
+   module subroutine encounter_check_bin_grid(self, n, r, v, renc, dt, nsize)
+      !! Bins bodies into a uniform grid of cubic cells using spatial hashing. Each body is represented by the sphere that 
+      !! encloses its encounter region over the whole step, centered on its mid-step position with a radius of its encounter radius 
+      !! plus half the distance it travels. The body is binned into every cell that overlaps the bounding box of this sphere.
+      !! The cell size is set from the median sphere radius of the first nsize bodies (all of them if not passed), so that most 
+      !! bodies overlap only a few cells. The cells are 
+      !! stored in a hash table built with a counting sort, so the memory used scales with the number of bodies, not the volume 
+      !! of the grid. Bodies that would overlap more than GRID_MAX_SPAN cells along any dimension are not binned and are 
+      !! instead checked directly against all other bodies during the search.
+      implicit none
+      ! Arguments
+      class(encounter_grid),          intent(inout)        :: self  !! Spatial hash grid
+      integer(I4B),                   intent(in)           :: n     !! Number of bodies
+      real(DP),     dimension(:,:),   intent(in)           :: r     !! Position vectors of the bodies
+      real(DP),     dimension(:,:),   intent(in)           :: v     !! Velocity vectors of the bodies
+      real(DP),     dimension(:),     intent(in)           :: renc  !! Critical radii of the bodies that define an encounter
+      real(DP),                       intent(in)           :: dt    !! Step size
+      integer(I4B),                   intent(in), optional :: nsize !! Number of leading bodies whose radii set the cell size
+      ! Internals
+      integer(I4B) :: i, ix, iy, iz, nmed
+      integer(I8B) :: b, nentry
+      integer(I8B), dimension(:), allocatable :: ifill
+      real(DP), dimension(:), allocatable :: rsort
+      real(DP), dimension(NDIM) :: rlo, rhi
+
+      call self%dealloc()
+      if (n == 0) return
+
+      allocate(self%center(NDIM,n), self%radius(n), self%cell_lo(NDIM,n), self%cell_hi(NDIM,n), self%llarge(n))
+
+      do concurrent (i = 1:n)
+         self%center(:,i) = r(:,i) + 0.5_DP * dt * v(:,i)
+         self%radius(i) = RSWEEP_FACTOR * renc(i) + 0.5_DP * dt * norm2(v(:,i))
+      end do
+
+      ! Get the cell size from the median radius, but don't let the grid get too fine to index
+      if (present(nsize)) then
+         nmed = max(min(nsize, n), 1)
+      else
+         nmed = n
+      end if
+      allocate(rsort, source=self%radius(1:nmed))
+      call util_sort(rsort)
+      rlo(:) = minval(self%center(:,1:n) - spread(self%radius(1:n), dim=1, ncopies=NDIM), dim=2)
+      rhi(:) = maxval(self%center(:,1:n) + spread(self%radius(1:n), dim=1, ncopies=NDIM), dim=2)
+      self%cell_size = max(GRID_CELL_FACTOR * rsort((nmed + 1) / 2), maxval(rhi(:) - rlo(:)) / GRID_MAX_CELLS)
+      if (.not.(self%cell_size > 0.0_DP)) self%cell_size = 1.0_DP ! All bodies are at the same point with no encounter region
+      self%origin(:) = rlo(:)
+
+      do concurrent (i = 1:n)
+         self%cell_lo(:,i) = int((self%center(:,i) - self%radius(i) - self%origin(:)) / self%cell_size, kind=I4B)
+         self%cell_hi(:,i) = int((self%center(:,i) + self%radius(i) - self%origin(:)) / self%cell_size, kind=I4B)
+         self%llarge(i) = any(self%cell_hi(:,i) - self%cell_lo(:,i) >= GRID_MAX_SPAN)
+      end do
+      self%ilarge = pack([(i, i = 1, n)], self%llarge(1:n))
+
+      nentry = 0_I8B
+      do i = 1, n
+         if (self%llarge(i)) cycle
+         nentry = nentry + product(int(self%cell_hi(:,i) - self%cell_lo(:,i) + 1, kind=I8B))
+      end do
+
+      ! Use a power of two for the number of buckets so that the hash can be reduced with a mask
+      self%nbucket = 1_I8B
+      do while (self%nbucket < 2_I8B * nentry)
+         self%nbucket = 2_I8B * self%nbucket
+      end do
+
+      ! Build the hash table with a counting sort of the entries into their buckets
+      allocate(self%bucket_start(self%nbucket + 1_I8B), self%entry_body(nentry), self%entry_cell(NDIM,nentry))
+      self%bucket_start(:) = 0_I8B
+      do i = 1, n
+         if (self%llarge(i)) cycle
+         do iz = self%cell_lo(3,i), self%cell_hi(3,i)
+            do iy = self%cell_lo(2,i), self%cell_hi(2,i)
+               do ix = self%cell_lo(1,i), self%cell_hi(1,i)
+                  b = encounter_check_hash_grid(ix, iy, iz, self%nbucket)
+                  self%bucket_start(b + 1_I8B) = self%bucket_start(b + 1_I8B) + 1_I8B
+               end do
+            end do
+         end do
+      end do
+
+      self%bucket_start(1) = 1_I8B
+      do b = 2_I8B, self%nbucket + 1_I8B
+         self%bucket_start(b) = self%bucket_start(b) + self%bucket_start(b - 1_I8B)
+      end do
+
+      allocate(ifill, source=self%bucket_start(1:self%nbucket))
+      do i = 1, n
+         if (self%llarge(i)) cycle
+         do iz = self%cell_lo(3,i), self%cell_hi(3,i)
+            do iy = self%cell_lo(2,i), self%cell_hi(2,i)
+               do ix = self%cell_lo(1,i), self%cell_hi(1,i)
+                  b = encounter_check_hash_grid(ix, iy, iz, self%nbucket)
+                  self%entry_body(ifill(b)) = i
+                  self%entry_cell(:,ifill(b)) = [ix, iy, iz]
+                  ifill(b) = ifill(b) + 1_I8B
+               end do
+            end do
+         end do
+      end do
+
+      return
+   end subroutine encounter_check_bin_grid
+
+
+   pure function encounter_check_hash_grid(ix, iy, iz, nbucket) result(b)
+      !! Hashes the integer coordinates of a grid cell into a bucket index in the range 1 to nbucket (nbucket must be a power of 2).
+      !! References: Teschner et al. (2003) _Optimized Spatial Hashing for Collision Detection of Deformable Objects_
+      implicit none
+      ! Arguments
+      integer(I4B), intent(in) :: ix, iy, iz !! Grid coordinates of the cell
+      integer(I8B), intent(in) :: nbucket    !! Number of buckets in the hash table
+      ! Result
+      integer(I8B)             :: b          !! Bucket index
+
+      b = ieor(ieor(int(ix, kind=I8B) * 73856093_I8B, int(iy, kind=I8B) * 19349663_I8B), int(iz, kind=I8B) * 83492791_I8B)
+      b = iand(b, nbucket - 1_I8B) + 1_I8B
+
+      return
+   end function encounter_check_hash_grid
+
+
+   subroutine encounter_check_grid_one(grid, i, jlo, r, v, renc, dt, lenci)
+      !! Finds the encounters between the ith body and all bodies with index j >= jlo and j > i. Binned bodies are found by looking 
+      !! up the cells that the ith body overlaps. Each pair of binned bodies is only tested in the lowest cell that both overlap, so 
+      !! no pair is found twice. Bodies that are too large to be binned are tested directly against all bodies.
+      implicit none
+      ! Arguments
+      class(encounter_grid),          intent(in)    :: grid  !! Spatial hash grid
+      integer(I4B),                   intent(in)    :: i     !! Index of the ith body that is being checked
+      integer(I4B),                   intent(in)    :: jlo   !! Lowest index of the bodies to check against
+      real(DP),     dimension(:,:),   intent(in)    :: r, v  !! Position and velocity vectors of all bodies
+      real(DP),     dimension(:),     intent(in)    :: renc  !! Critical radii of all bodies that define an encounter
+      real(DP),                       intent(in)    :: dt    !! Step size
+      class(encounter_list),          intent(inout) :: lenci !! Encounter list of the ith body
+      ! Internals
+      integer(I4B) :: j, k, ix, iy, iz, jstart, ncand, n
+      integer(I8B) :: b, e
+      integer(I4B), dimension(:), allocatable :: cand, itmp
+      logical, dimension(:), allocatable :: lencounter, lvdotr
+
+      n = size(grid%radius)
+      jstart = max(jlo, i + 1)
+      ncand = 0
+      allocate(cand(16))
+
+      if (grid%llarge(i)) then
+         do j = jstart, n
+            call add_candidate(j)
+         end do
+      else
+         do iz = grid%cell_lo(3,i), grid%cell_hi(3,i)
+            do iy = grid%cell_lo(2,i), grid%cell_hi(2,i)
+               do ix = grid%cell_lo(1,i), grid%cell_hi(1,i)
+                  b = encounter_check_hash_grid(ix, iy, iz, grid%nbucket)
+                  do e = grid%bucket_start(b), grid%bucket_start(b + 1_I8B) - 1_I8B
+                     j = grid%entry_body(e)
+                     if (j < jstart) cycle
+                     if (any(grid%entry_cell(:,e) /= [ix, iy, iz])) cycle ! Hash collision with a different cell
+                     if (any(max(grid%cell_lo(:,i), grid%cell_lo(:,j)) /= [ix, iy, iz])) cycle ! Pair is tested in another cell
+                     call add_candidate(j)
+                  end do
+               end do
+            end do
+         end do
+         do k = 1, size(grid%ilarge)
+            j = grid%ilarge(k)
+            if (j >= jstart) call add_candidate(j)
+         end do
+      end if
+
+      lenci%nenc = 0_I8B
+      if (ncand == 0) return
+
+      allocate(lencounter(ncand), lvdotr(ncand))
+      do k = 1, ncand
+         j = cand(k)
+         call encounter_check_one(r(1,j) - r(1,i), r(2,j) - r(2,i), r(3,j) - r(3,i), &
+                                  v(1,j) - v(1,i), v(2,j) - v(2,i), v(3,j) - v(3,i), &
+                                  renc(i) + renc(j), dt, lencounter(k), lvdotr(k))
+      end do
+
+      lenci%nenc = count(lencounter(:))
+      if (lenci%nenc == 0_I8B) return
+      allocate(lenci%index1(lenci%nenc), lenci%index2(lenci%nenc), lenci%lvdotr(lenci%nenc))
+      lenci%index1(:) = i
+      lenci%index2(:) = pack(cand(1:ncand), lencounter(:))
+      lenci%lvdotr(:) = pack(lvdotr(:), lencounter(:))
+
+      return
+
+      contains
+
+         subroutine add_candidate(jc)
+            !! Adds body jc to the candidate list if its swept encounter sphere overlaps that of body i
+            implicit none
+            integer(I4B), intent(in) :: jc
+
+            if (norm2(grid%center(:,jc) - grid%center(:,i)) > grid%radius(i) + grid%radius(jc)) return
+            if (ncand == size(cand)) then
+               allocate(itmp(2 * ncand))
+               itmp(1:ncand) = cand(1:ncand)
+               call move_alloc(itmp, cand)
+            end if
+            ncand = ncand + 1
+            cand(ncand) = jc
+
+            return
+         end subroutine add_candidate
+
+   end subroutine encounter_check_grid_one
+
+
+   module subroutine encounter_check_search_grid_single_list(self, n, r, v, renc, dt, nenc, index1, index2, lvdotr)
+      !! Searches a spatial hash grid built from a single list of bodies (e.g. pl-pl) for encounters between all pairs, with 
+      !! the bodies split across threads, and collects the encounters of each body into one list.
+      implicit none
+      ! Arguments
+      class(encounter_grid),                   intent(in)  :: self   !! Spatial hash grid
+      integer(I4B),                            intent(in)  :: n      !! Number of bodies
+      real(DP),     dimension(:,:),            intent(in)  :: r, v   !! Array of position and velocity vectors 
+      real(DP),     dimension(:),              intent(in)  :: renc   !! Critical radii of the bodies that define an encounter
+      real(DP),                                intent(in)  :: dt     !! Step size
+      integer(I8B),                            intent(out) :: nenc   !! Total number of encounters
+      integer(I4B), dimension(:), allocatable, intent(out) :: index1 !! List of indices for one body in each encounter pair
+      integer(I4B), dimension(:), allocatable, intent(out) :: index2 !! List of indices for the other body in each encounter pair
+      logical,      dimension(:), allocatable, intent(out) :: lvdotr !! Logical array indicating which pairs are approaching
+      ! Internals
+      integer(I4B) :: i
+      type(collision_list_plpl), dimension(n) :: lenc         !! Array of encounter lists (one encounter list per body)
+
+      !$omp parallel do default(private) schedule(dynamic)&
+      !$omp shared(self, r, v, renc, lenc) &
+      !$omp firstprivate(n, dt) 
+      do i = 1, n
+         call encounter_check_grid_one(self, i, 1, r, v, renc, dt, lenc(i))
+      end do
+      !$omp end parallel do
+
+      call encounter_check_collapse_ragged_list(lenc, n, nenc, index1, index2, lvdotr)
+
+      return
+   end subroutine encounter_check_search_grid_single_list
+
+
+   module subroutine encounter_check_search_grid_double_list(self, n1, n2, r, v, renc, dt, nenc, index1, index2, lvdotr)
+      !! Searches a spatial hash grid built from two lists of bodies (e.g. pl-tp or plm-plt) for encounters between a body of 
+      !! the first list and a body of the second. Only the cells of the bodies of the first list are searched, and the indices 
+      !! of the second list are returned relative to the start of that list.
+      implicit none
+      ! Arguments
+      class(encounter_grid),                   intent(in)  :: self   !! Spatial hash grid
+      integer(I4B),                            intent(in)  :: n1     !! Number of bodies 1
+      integer(I4B),                            intent(in)  :: n2     !! Number of bodies 2
+      real(DP),     dimension(:,:),            intent(in)  :: r, v   !! Position and velocity vectors of bodies 1 followed by bodies 2
+      real(DP),     dimension(:),              intent(in)  :: renc   !! Critical radii of bodies 1 followed by bodies 2
+      real(DP),                                intent(in)  :: dt     !! Step size
+      integer(I8B),                            intent(out) :: nenc   !! Total number of encounters
+      integer(I4B), dimension(:), allocatable, intent(out) :: index1 !! List of indices for body 1 in each encounter pair
+      integer(I4B), dimension(:), allocatable, intent(out) :: index2 !! List of indices for body 2 in each encounter pair
+      logical,      dimension(:), allocatable, intent(out) :: lvdotr !! Logical array indicating which pairs are approaching
+      ! Internals
+      integer(I4B) :: i
+      type(collision_list_pltp), dimension(n1) :: lenc         !! Array of encounter lists (one encounter list per body)
+
+      !$omp parallel do default(private) schedule(dynamic)&
+      !$omp shared(self, r, v, renc, lenc) &
+      !$omp firstprivate(n1, dt) 
+      do i = 1, n1
+         call encounter_check_grid_one(self, i, n1 + 1, r, v, renc, dt, lenc(i))
+         if (lenc(i)%nenc > 0_I8B) lenc(i)%index2(:) = lenc(i)%index2(:) - n1 
+      end do
+      !$omp end parallel do
+
+      call encounter_check_collapse_ragged_list(lenc, n1, nenc, index1, index2, lvdotr)
+
+      return
+   end subroutine encounter_check_search_grid_double_list
+
+
    module subroutine encounter_check_collapse_ragged_list(ragged_list, n1, nenc, index1, index2, lvdotr)
       !! author: David A. Minton
       !!    
@@ -765,15 +1175,54 @@ contains
       !!
       !! Sorts the bounding box extents along a single dimension prior to the sweep phase. 
       !! This subroutine sets the sorted index array (ind) and the beginning/ending index list (beg & end)
+      !!
+      !! The order of the extents changes very little from one step to the next, so if the sorted index array from the previous
+      !! call is still valid, the extents are re-sorted with an insertion sort starting from the previous order, which is nearly 
+      !! linear for nearly sorted input. If bodies have been added or removed since the last call, or if the order has changed
+      !! so much that the insertion sort would need more than RESORT_SHIFT_FACTOR shifts per extent, a full sort is done instead.
       implicit none
       ! Arguments
       class(encounter_bounding_box_1D), intent(inout) :: self       !! Bounding box structure along a single dimension
       integer(I4B),                     intent(in)    :: n          !! Number of bodies with extents
       real(DP), dimension(:),           intent(in)    :: extent_arr !! Array of extents of size 2*n
       ! Internals
-      integer(I8B) :: i, k
+      integer(I8B) :: i, k, nshift, nshift_max
+      integer(I4B) :: j, jk, itmp, next
+      real(DP) :: x
+      real(DP), dimension(:), allocatable :: tmparr
+      logical :: lfullsort
+
+      next = 2 * n
+      lfullsort = .not.self%lsorted
+      if (.not.lfullsort) lfullsort = (size(self%ind) /= next)
+
+      if (.not.lfullsort) then
+         allocate(tmparr(next))
+         tmparr(:) = extent_arr(self%ind(:))
+         nshift = 0_I8B
+         nshift_max = RESORT_SHIFT_FACTOR * next
+         do jk = 2, next
+            x = tmparr(jk)
+            itmp = self%ind(jk)
+            j = jk - 1
+            do while (j > 0)
+               if (tmparr(j) <= x) exit
+               tmparr(j + 1) = tmparr(j)
+               self%ind(j + 1) = self%ind(j)
+               j = j - 1
+            end do
+            tmparr(j + 1) = x
+            self%ind(j + 1) = itmp
+            nshift = nshift + int(jk - 1 - j, kind=I8B)
+            if (nshift > nshift_max) then ! The order has changed too much. Finish the job with the full sort
+               lfullsort = .true.
+               exit
+            end if
+         end do
+      end if
 
-      call util_sort(extent_arr, self%ind)
+      if (lfullsort) call util_sort(extent_arr, self%ind)
+      self%lsorted = .true.
 
 #ifdef DOCONLOC
       do concurrent(k = 1_I8B:2_I8B * n) shared(self,n) local(i)
@@ -19,6 +19,13 @@ module encounter
 
    character(len=*), parameter :: ENCOUNTER_OUTFILE = 'encounters.nc'  !! Name of NetCDF output file for encounter information
    real(DP), parameter :: RSWEEP_FACTOR = 1.1_DP
+   real(DP), parameter :: GRID_CELL_FACTOR = 2.0_DP !! Size of the cells of the spatial hash grid relative to the median radius of the 
+                                                    !! swept encounter spheres
+   integer(I4B), parameter :: GRID_MAX_CELLS = 2**20 !! Maximum number of cells of the spatial hash grid along any one dimension
+   integer(I4B), parameter :: GRID_MAX_SPAN = 4      !! Bodies whose swept encounter spheres span more cells than this along any 
+                                                     !! dimension are not binned, and are instead checked directly against all others
+   integer(I8B), parameter :: RESORT_SHIFT_FACTOR = 4_I8B !! Maximum average number of shifts per extent allowed in the incremental 
+                                                           !! insertion sort of the bounding box extents before falling back to a full sort
 
    type, abstract :: encounter_list
       integer(I8B)                              :: nenc = 0   !! Total number of encounters
@@ -84,6 +91,8 @@ module encounter
 
    type encounter_bounding_box_1D
       integer(I4B)                            :: n    !! Number of bodies with extents
+      logical                                 :: lsorted = .false. !! Indicates that ind holds the sorted order from the previous call, 
+                                                                   !! so that the extents can be re-sorted incrementally
       integer(I4B), dimension(:), allocatable :: ind  !! Sorted minimum/maximum extent indices (value > n indicates an ending index)
       integer(I8B), dimension(:), allocatable :: ibeg !! Beginning index for box
       integer(I8B), dimension(:), allocatable :: iend !! Ending index for box
@@ -106,6 +115,32 @@ module encounter
    end type
 
 
+   type encounter_grid
+      !! A uniform grid of cubic cells used to find encounter candidates with spatial hashing. Each body is binned into every 
+      !! cell that overlaps the bounding box of its swept encounter sphere, and the cells are stored in a hash table so that 
+      !! only occupied cells use memory.
+      real(DP)                                  :: cell_size = 0.0_DP !! Length of the side of a grid cell
+      real(DP),     dimension(NDIM)             :: origin             !! Position of the lower corner of the grid
+      integer(I8B)                              :: nbucket = 0_I8B    !! Number of buckets in the hash table
+      integer(I8B), dimension(:),   allocatable :: bucket_start       !! Index of the first entry in each bucket (size nbucket+1)
+      integer(I4B), dimension(:),   allocatable :: entry_body         !! Index of the body in each bucket entry
+      integer(I4B), dimension(:,:), allocatable :: entry_cell         !! Grid coordinates of the cell of each bucket entry
+      integer(I4B), dimension(:,:), allocatable :: cell_lo            !! Grid coordinates of the lowest cell overlapped by each body
+      integer(I4B), dimension(:,:), allocatable :: cell_hi            !! Grid coordinates of the highest cell overlapped by each body
+      real(DP),     dimension(:,:), allocatable :: center             !! Center of the swept encounter sphere of each body
+      real(DP),     dimension(:),   allocatable :: radius             !! Radius of the swept encounter sphere of each body
+      logical,      dimension(:),   allocatable :: llarge             !! Flags bodies that overlap too many cells to be binned
+      integer(I4B), dimension(:),   allocatable :: ilarge             !! Indices of the bodies that are not binned (in ascending order)
+   contains
+      procedure :: bin           => encounter_check_bin_grid                  !! Bins the swept encounter spheres of bodies into the grid
+      procedure :: search_single => encounter_check_search_grid_single_list   !! Searches the grid for encounters within a single list
+      procedure :: search_double => encounter_check_search_grid_double_list   !! Searches the grid for encounters between two lists
+      generic   :: search        => search_single, search_double
+      procedure :: dealloc       => encounter_util_dealloc_grid               !! Deallocates all allocatables
+      final     ::                  encounter_final_grid                      !! Finalize the grid - deallocates all allocatables
+   end type encounter_grid
+
+
    interface
       module subroutine encounter_check_all_plpl(param, npl, r, v, renc, dt, nenc, index1, index2, lvdotr)
          use base, only: base_parameters
@@ -171,6 +206,44 @@ module encounter
          logical,  intent(out) :: lvdotr        !! Logical flag indicating the direction of the v .dot. r vector
       end subroutine encounter_check_one
 
+      module subroutine encounter_check_bin_grid(self, n, r, v, renc, dt, nsize)
+         implicit none
+         class(encounter_grid),          intent(inout)        :: self  !! Spatial hash grid
+         integer(I4B),                   intent(in)           :: n     !! Number of bodies
+         real(DP),     dimension(:,:),   intent(in)           :: r     !! Position vectors of the bodies
+         real(DP),     dimension(:,:),   intent(in)           :: v     !! Velocity vectors of the bodies
+         real(DP),     dimension(:),     intent(in)           :: renc  !! Critical radii of the bodies that define an encounter
+         real(DP),                       intent(in)           :: dt    !! Step size
+         integer(I4B),                   intent(in), optional :: nsize !! Number of leading bodies whose radii set the cell size
+      end subroutine encounter_check_bin_grid
+
+      module subroutine encounter_check_search_grid_single_list(self, n, r, v, renc, dt, nenc, index1, index2, lvdotr)
+         implicit none
+         class(encounter_grid),                   intent(in)  :: self   !! Spatial hash grid
+         integer(I4B),                            intent(in)  :: n      !! Number of bodies
+         real(DP),     dimension(:,:),            intent(in)  :: r, v   !! Array of position and velocity vectors 
+         real(DP),     dimension(:),              intent(in)  :: renc   !! Critical radii of the bodies that define an encounter
+         real(DP),                                intent(in)  :: dt     !! Step size
+         integer(I8B),                            intent(out) :: nenc   !! Total number of encounters
+         integer(I4B), dimension(:), allocatable, intent(out) :: index1 !! List of indices for one body in each encounter pair
+         integer(I4B), dimension(:), allocatable, intent(out) :: index2 !! List of indices for the other body in each encounter pair
+         logical,      dimension(:), allocatable, intent(out) :: lvdotr !! Logical array indicating which pairs are approaching
+      end subroutine encounter_check_search_grid_single_list
+
+      module subroutine encounter_check_search_grid_double_list(self, n1, n2, r, v, renc, dt, nenc, index1, index2, lvdotr)
+         implicit none
+         class(encounter_grid),                   intent(in)  :: self   !! Spatial hash grid
+         integer(I4B),                            intent(in)  :: n1     !! Number of bodies 1
+         integer(I4B),                            intent(in)  :: n2     !! Number of bodies 2
+         real(DP),     dimension(:,:),            intent(in)  :: r, v   !! Position and velocity vectors of bodies 1 followed by bodies 2
+         real(DP),     dimension(:),              intent(in)  :: renc   !! Critical radii of bodies 1 followed by bodies 2
+         real(DP),                                intent(in)  :: dt     !! Step size
+         integer(I8B),                            intent(out) :: nenc   !! Total number of encounters
+         integer(I4B), dimension(:), allocatable, intent(out) :: index1 !! List of indices for body 1 in each encounter pair
+         integer(I4B), dimension(:), allocatable, intent(out) :: index2 !! List of indices for body 2 in each encounter pair
+         logical,      dimension(:), allocatable, intent(out) :: lvdotr !! Logical array indicating which pairs are approaching
+      end subroutine encounter_check_search_grid_double_list
+
       module subroutine encounter_check_collapse_ragged_list(ragged_list, n1, nenc, index1, index2, lvdotr)
          implicit none
          class(encounter_list), dimension(:),             intent(in)            :: ragged_list !! The ragged encounter list
@@ -280,6 +353,11 @@ module encounter
          class(encounter_bounding_box), intent(inout) :: self !! Bounding box structure
       end subroutine encounter_util_dealloc_bounding_box
 
+      module subroutine encounter_util_dealloc_grid(self)
+         implicit none
+         class(encounter_grid), intent(inout) :: self !! Spatial hash grid
+      end subroutine encounter_util_dealloc_grid
+
       module subroutine encounter_util_dealloc_list(self)
          implicit none
          class(encounter_list), intent(inout) :: self !! Swiftest encounter list object
@@ -366,6 +444,18 @@ module encounter
       end subroutine encounter_final_bounding_box
 
 
+      subroutine encounter_final_grid(self)
+         !! Finalize the spatial hash grid - deallocates its hash table and per-body arrays
+         implicit none
+         ! Arguments
+         type(encounter_grid), intent(inout) :: self
+
+         call self%dealloc()
+
+         return
+      end subroutine encounter_final_grid
+
+
       subroutine encounter_final_netcdf_parameters(self)
          !! author: David A. Minton
          !!
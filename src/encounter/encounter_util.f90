@@ -85,6 +85,7 @@ contains
       class(encounter_bounding_box_1D), intent(inout) :: self
 
       self%n = 0
+      self%lsorted = .false.
       if (allocated(self%ind)) deallocate(self%ind)
       if (allocated(self%ibeg)) deallocate(self%ibeg)
       if (allocated(self%iend)) deallocate(self%iend)
@@ -107,6 +108,28 @@ contains
    end subroutine encounter_util_dealloc_bounding_box
 
 
+   module subroutine encounter_util_dealloc_grid(self)
+      !! Deallocates the hash table and per-body arrays of a spatial hash grid and resets its cell size and bucket count
+      implicit none
+      ! Arguments
+      class(encounter_grid), intent(inout) :: self !! Spatial hash grid
+
+      self%cell_size = 0.0_DP
+      self%nbucket = 0_I8B
+      if (allocated(self%bucket_start)) deallocate(self%bucket_start)
+      if (allocated(self%entry_body)) deallocate(self%entry_body)
+      if (allocated(self%entry_cell)) deallocate(self%entry_cell)
+      if (allocated(self%cell_lo)) deallocate(self%cell_lo)
+      if (allocated(self%cell_hi)) deallocate(self%cell_hi)
+      if (allocated(self%center)) deallocate(self%center)
+      if (allocated(self%radius)) deallocate(self%radius)
+      if (allocated(self%llarge)) deallocate(self%llarge)
+      if (allocated(self%ilarge)) deallocate(self%ilarge)
+
+      return
+   end subroutine encounter_util_dealloc_grid
+
+
    module subroutine encounter_util_dealloc_list(self)
       !! author: David A. Minton
       !!
@@ -356,6 +379,9 @@ contains
          call move_alloc(itmp, self%aabb%ind)
       end if
 
+      ! Bodies were added or removed, so the next sort must start over from scratch 
+      self%aabb%lsorted = .false.
+
       if (allocated(self%aabb%ibeg)) deallocate(self%aabb%ibeg)
       allocate(self%aabb%ibeg(n))
       if (allocated(self%aabb%iend)) deallocate(self%aabb%iend)
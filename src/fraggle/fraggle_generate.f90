@@ -124,7 +124,6 @@ contains
       real(DP),                 intent(in)    :: t            !! Time of collision 
       logical,                  intent(out)   :: lfailure     !! Answers the question: Should this have been a merger instead?
        ! Internals
-      logical                              :: lk_plpl
       logical, dimension(size(IEEE_ALL))   :: fpe_halting_modes, fpe_quiet_modes
       real(DP)                             :: dE
       real(DP), dimension(NDIM)            :: dL
@@ -149,12 +148,6 @@ contains
          write(message,*) nfrag_start
          call swiftest_io_log_one_message(COLLISION_LOG_OUT, "Fraggle generating " // trim(adjustl(message)) // " fragments.")
 
-         if (param%lflatten_interactions) then
-            lk_plpl = allocated(pl%k_plpl)
-            if (lk_plpl) deallocate(pl%k_plpl)
-         else 
-            lk_plpl = .false.
-         end if
          call ieee_set_flag(ieee_all, .false.) ! Set all fpe flags to quiet
 
          call self%set_natural_scale()
@@ -206,9 +199,6 @@ contains
          call self%set_original_scale()
          self%max_rot = MAX_ROT_SI * param%TU2S ! Re-compute the spin limit from scratch so it doesn't drift due to floating point 
                                                 ! errors every time we convert
-
-         ! Restore the big array
-         if (lk_plpl) call pl%flatten(param)
       end associate
       end select
       end select
@@ -75,9 +75,9 @@ contains
       associate(tp => self, cb => nbody_system%cb, pl => nbody_system%pl, npl => nbody_system%pl%nbody)
          nbody_system%lbeg = lbeg
          if (nbody_system%lbeg) then
-            call tp%accel_int(param, pl%Gmass(1:npl), pl%rbeg(:,1:npl), npl)
+            call tp%accel_int(param, pl%Gmass(1:npl), pl%rbeg(:,1:npl), npl, pl%renc(1:npl))
          else
-            call tp%accel_int(param, pl%Gmass(1:npl), pl%rend(:,1:npl), npl)
+            call tp%accel_int(param, pl%Gmass(1:npl), pl%rend(:,1:npl), npl, pl%renc(1:npl))
          end if
          if (param%loblatecb) call tp%accel_obl(nbody_system)
          if (param%lextra_force) call tp%accel_user(nbody_system, param, t, lbeg)
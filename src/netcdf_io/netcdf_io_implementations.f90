@@ -48,19 +48,88 @@ contains
 #endif
          call netcdf_io_check( nf90_close(self%id), message)
          self%lfile_is_open = .false.
+         ! The time values are read in again the next time the file is opened
+         if (allocated(self%tvals)) deallocate(self%tvals)
+         self%ntvals = 0
       end if
 
       return
    end subroutine netcdf_io_close
 
 
+   module subroutine netcdf_io_def_var_storage(self, varid, param)
+      !! author: David A. Minton
+      !!
+      !! Sets the chunk shape and compression filters of a variable in a NetCDF file that is in define mode. Variables that have the 
+      !! name dimension are chunked along the name dimension and the unlimited record dimension (time, or the collision id in the 
+      !! collision file) following NC_CHUNKING, unless the chunk sizes are set directly with NC_CHUNK_NAME and NC_CHUNK_TIME. If 
+      !! only one of these is set with the "DEFAULT" layout, the other follows the "SNAPSHOT" layout, so that the name dimension 
+      !! is not chunked one body at a time. Their chunks span the whole length of all other dimensions. All other variables keep 
+      !! the default chunking of the NetCDF library.
+      implicit none
+      ! Arguments
+      class(netcdf_parameters), intent(inout) :: self  !! Parameters used to identify a particular NetCDF dataset
+      integer(I4B),             intent(in)    :: varid !! ID of the variable 
+      class(base_parameters),   intent(in)    :: param !! Current run configuration parameters
+      ! Internals
+      integer(I4B) :: i, ndims, dimlen, chunk_time, chunk_name, shuffle
+      integer(I4B), dimension(NF90_MAX_VAR_DIMS) :: dimids
+      integer(I4B), dimension(:), allocatable :: chunksizes
+
+      call netcdf_io_check( nf90_inquire_variable(self%id, varid, ndims=ndims, dimids=dimids), &
+                            "netcdf_io_def_var_storage nf90_inquire_variable" )
+
+      select case(param%nc_chunking)
+      case("TIMESERIES")
+         chunk_time = TIMESERIES_CHUNK_TIME
+         chunk_name = TIMESERIES_CHUNK_NAME
+      case("SNAPSHOT")
+         chunk_time = SNAPSHOT_CHUNK_TIME
+         chunk_name = SNAPSHOT_CHUNK_NAME
+      case default
+         chunk_time = 0
+         chunk_name = 0
+      end select
+      if (param%nc_chunk_time > 0) chunk_time = param%nc_chunk_time
+      if (param%nc_chunk_name > 0) chunk_name = param%nc_chunk_name
+      if (chunk_time > 0 .and. chunk_name == 0) chunk_name = SNAPSHOT_CHUNK_NAME
+      if (chunk_name > 0 .and. chunk_time == 0) chunk_time = SNAPSHOT_CHUNK_TIME
+
+      if (((chunk_time > 0) .or. (chunk_name > 0)) .and. any(dimids(1:ndims) == self%name_dimid)) then
+         allocate(chunksizes(ndims))
+         do i = 1, ndims
+            call netcdf_io_check( nf90_inquire_dimension(self%id, dimids(i), len=dimlen), &
+                                  "netcdf_io_def_var_storage nf90_inquire_dimension" )
+            if (dimids(i) == self%name_dimid) then
+               chunksizes(i) = chunk_name
+            else if (dimlen == 0) then ! This is an unlimited record dimension
+               chunksizes(i) = chunk_time
+            else
+               chunksizes(i) = dimlen
+            end if
+         end do
+         call netcdf_io_check( nf90_def_var_chunking(self%id, varid, NF90_CHUNKED, chunksizes), &
+                               "netcdf_io_def_var_storage nf90_def_var_chunking" )
+      end if
+
+      if ((param%nc_deflate_level > 0) .or. param%lnc_shuffle) then
+         shuffle = merge(1, 0, param%lnc_shuffle)
+         call netcdf_io_check( nf90_def_var_deflate(self%id, varid, shuffle=shuffle, deflate=merge(1, 0, param%nc_deflate_level > 0), &
+                                                    deflate_level=param%nc_deflate_level), &
+                               "netcdf_io_def_var_storage nf90_def_var_deflate" )
+      end if
+
+      return
+   end subroutine netcdf_io_def_var_storage
+
+
    module subroutine netcdf_io_find_tslot(self, t, tslot)
       !! author: David A. Minton
       !! 
       !! Given an open NetCDF file and a value of time t, finds the index of the time value (aka the time slot) to place a new set of data.
       !! The returned value of tslot will correspond to the first index value where the value of t is greater than or equal to the saved time value.
-      use, intrinsic :: ieee_exceptions
-      use, intrinsic :: ieee_arithmetic
+      !! The time values are only read from the file the first time this is called after the file is opened. After that they are kept
+      !! in memory, and the value of t is recorded in the returned time slot, so the cost does not grow with the number of frames.
       implicit none
       ! Arguments
       class(netcdf_parameters), intent(inout) :: self  !! Parameters used to identify a particular NetCDF dataset
@@ -68,36 +137,50 @@ contains
       integer(I4B),             intent(out)   :: tslot !! The index of the time slot where this data belongs
       ! Internals
       real(DP), dimension(:), allocatable :: tvals
-      integer(I4B) :: i
-      logical, dimension(size(IEEE_ALL))      :: fpe_halting_modes
-
-      call ieee_get_halting_mode(IEEE_ALL,fpe_halting_modes)  ! Save the current halting modes so we can turn them off temporarily
-      call ieee_set_halting_mode(IEEE_ALL,.false.)
+      integer(I4B) :: i, lo, hi, mid
 
       if (.not.self%lfile_is_open) return
       tslot = 0
 
-      call netcdf_io_check( nf90_inquire_dimension(self%id, self%time_dimid, self%time_dimname, len=self%max_tslot), "netcdf_io_find_tslot nf90_inquire_dimension max_tslot"  )
-      if (self%max_tslot > 0) then
-         allocate(tvals(self%max_tslot))
-         call netcdf_io_check( nf90_get_var(self%id, self%time_varid, tvals(:), start=[1]), "netcdf_io_find_tslot get_var"  )
-         where(.not.ieee_is_normal(tvals(:))) tvals(:) = huge(1.0_DP)
-      else
-         allocate(tvals(1))
-         tvals(1) = huge(1.0_DP)
-         self%max_tslot = 1
-      end if
+      if (.not.allocated(self%tvals)) call self%get_tvals()
+
+      associate(n => self%ntvals)
+         if (self%ltvals_sorted) then
+            ! Bisect to find the first time value that is greater than or equal to t
+            lo = 1
+            hi = n + 1
+            do while (lo < hi)
+               mid = (lo + hi) / 2
+               if (t <= self%tvals(mid)) then
+                  hi = mid
+               else
+                  lo = mid + 1
+               end if
+            end do
+            tslot = lo
+         else
+            tslot = 1
+            do i = 1, n
+               if (t <= self%tvals(tslot)) exit
+               tslot = tslot + 1
+            end do
+         end if
+
+         ! Record the new time value in the cache. This keeps the cache sorted if it was already
+         if (tslot > n) then
+            if (tslot > size(self%tvals)) then
+               allocate(tvals(max(2 * size(self%tvals), tslot)))
+               tvals(1:n) = self%tvals(1:n)
+               call move_alloc(tvals, self%tvals)
+            end if
+            n = tslot
+         end if
+         self%tvals(tslot) = t
+      end associate
 
-      tslot = 1
-      do i = 1, self%max_tslot
-         if (t <= tvals(tslot)) exit
-         tslot = tslot + 1
-      end do
       self%max_tslot = max(self%max_tslot, tslot)
       self%tslot = tslot
 
-      call ieee_set_halting_mode(IEEE_ALL,fpe_halting_modes)
-
       return
    end subroutine netcdf_io_find_tslot
 
@@ -162,6 +245,42 @@ contains
    end subroutine netcdf_io_get_idvals
 
 
+   module subroutine netcdf_io_get_tvals(self)
+      !! author: David A. Minton
+      !! 
+      !! Reads the time values stored in the file into the cache used by find_tslot. Invalid values are treated as later than any
+      !! valid time.
+      use, intrinsic :: ieee_exceptions
+      use, intrinsic :: ieee_arithmetic
+      implicit none
+      ! Arguments
+      class(netcdf_parameters), intent(inout) :: self   !! Parameters used to identify a particular NetCDF dataset
+      ! Internals
+      logical, dimension(size(IEEE_ALL))      :: fpe_halting_modes
+
+      if (.not.self%lfile_is_open) return
+
+      call ieee_get_halting_mode(IEEE_ALL,fpe_halting_modes)  ! Save the current halting modes so we can turn them off temporarily
+      call ieee_set_halting_mode(IEEE_ALL,.false.)
+
+      if (allocated(self%tvals)) deallocate(self%tvals)
+      call netcdf_io_check( nf90_inquire_dimension(self%id, self%time_dimid, self%time_dimname, len=self%max_tslot), "netcdf_io_get_tvals nf90_inquire_dimension max_tslot"  )
+      self%ntvals = self%max_tslot
+      allocate(self%tvals(max(self%ntvals, 1)))
+      if (self%ntvals > 0) then
+         call netcdf_io_check( nf90_get_var(self%id, self%time_varid, self%tvals(1:self%ntvals), start=[1]), "netcdf_io_get_tvals get_var"  )
+         where(.not.ieee_is_normal(self%tvals(1:self%ntvals))) self%tvals(1:self%ntvals) = huge(1.0_DP)
+      end if
+      associate(tvals => self%tvals, n => self%ntvals)
+         self%ltvals_sorted = all(tvals(2:n) >= tvals(1:n-1))
+      end associate
+
+      call ieee_set_halting_mode(IEEE_ALL,fpe_halting_modes)
+
+      return
+   end subroutine netcdf_io_get_tvals
+
+
    module subroutine netcdf_io_sync(self)
       !! author: David A. Minton
       !!
@@ -17,6 +17,10 @@ module netcdf_io
    implicit none
    public
 
+   integer(I4B), parameter :: TIMESERIES_CHUNK_TIME = 256  !! Time chunk size of the "TIMESERIES" chunk layout
+   integer(I4B), parameter :: TIMESERIES_CHUNK_NAME = 16   !! Name chunk size of the "TIMESERIES" chunk layout
+   integer(I4B), parameter :: SNAPSHOT_CHUNK_TIME   = 1    !! Time chunk size of the "SNAPSHOT" chunk layout
+   integer(I4B), parameter :: SNAPSHOT_CHUNK_NAME   = 4096 !! Name chunk size of the "SNAPSHOT" chunk layout
 
    !! This derived datatype stores the NetCDF ID values for each of the variables included in the NetCDF data file. This is used as the base class defined in base
    type, abstract :: netcdf_parameters
@@ -26,6 +30,9 @@ module netcdf_io
       integer(I4B)       :: id                                          !! ID for the output file
       integer(I4B)       :: tslot                   = 1                 !! The current time slot that gets passed to the NetCDF reader/writer
       integer(I4B)       :: max_tslot               = 0                 !! Records the last index value of time in the NetCDF file
+      real(DP),     dimension(:), allocatable :: tvals                  !! Cached array of time values in the open NetCDF file
+      integer(I4B)       :: ntvals                  = 0                 !! Number of time values in the cache
+      logical            :: ltvals_sorted           = .true.            !! Flag indicating that the cached time values are in ascending order
       integer(I4B), dimension(:), allocatable :: idvals                 !! Array of id values in this NetCDF file
       integer(I4B)       :: idslot                  = 1                 !! The current id slot that gets passed to the NetCDF reader/writer
       integer(I4B)       :: max_idslot              = 0                 !! Records the last index value of id in the NetCDF file
@@ -146,9 +153,11 @@ module netcdf_io
       logical            :: lpseudo_vel_exists = .false.                !! Logical flag to indicate whether or not the pseudovelocity vectors were present in an old file.
    contains
       procedure :: close       => netcdf_io_close       !! Closes an open NetCDF file
+      procedure :: def_var_storage => netcdf_io_def_var_storage !! Sets the chunk shape and compression of a variable from the run configuration parameters
       procedure :: find_tslot  => netcdf_io_find_tslot  !! Finds the time dimension index for a given value of t
       procedure :: find_idslot => netcdf_io_find_idslot !! Finds the id dimension index for a given value of id
       procedure :: get_idvals  => netcdf_io_get_idvals  !! Gets the valid id numbers currently stored in this dataset
+      procedure :: get_tvals   => netcdf_io_get_tvals   !! Reads the time values currently stored in this dataset into the cache used by find_tslot
       procedure :: sync        => netcdf_io_sync        !! Syncrhonize the disk and memory buffer of the NetCDF file (e.g. commit the frame files stored in memory to disk) 
    end type netcdf_parameters
 
@@ -164,11 +173,23 @@ module netcdf_io
          class(netcdf_parameters),   intent(inout) :: self   !! Parameters used to identify a particular NetCDF dataset
       end subroutine netcdf_io_close
 
+      module subroutine netcdf_io_def_var_storage(self, varid, param)
+         implicit none
+         class(netcdf_parameters), intent(inout) :: self  !! Parameters used to identify a particular NetCDF dataset
+         integer(I4B),             intent(in)    :: varid !! ID of the variable 
+         class(base_parameters),   intent(in)    :: param !! Current run configuration parameters
+      end subroutine netcdf_io_def_var_storage
+
       module subroutine netcdf_io_get_idvals(self)
          implicit none
          class(netcdf_parameters),                            intent(inout) :: self   !! Parameters used to identify a particular NetCDF dataset
       end subroutine netcdf_io_get_idvals
 
+      module subroutine netcdf_io_get_tvals(self)
+         implicit none
+         class(netcdf_parameters), intent(inout) :: self   !! Parameters used to identify a particular NetCDF dataset
+      end subroutine netcdf_io_get_tvals
+
       module subroutine netcdf_io_find_tslot(self, t, tslot)
          implicit none
          class(netcdf_parameters), intent(inout) :: self  !! Parameters used to identify a particular NetCDF dataset
@@ -12,48 +12,140 @@ submodule (swiftest) s_swiftest_coarray
 contains
 
 
-    module subroutine swiftest_coarray_balance_system(nbody_system, param)
+    module subroutine swiftest_coarray_balance_system(nbody_system, param, timer)
         !! author: David A. Minton
         !!
-        !! Checks whether or not the system needs to be rebalance. Rebalancing occurs when the difference between the number of test particles between the
-        !! image with the smallest and largest number of test particles is larger than the number of images
+        !! Checks whether or not the test particles need to be rebalanced across the images. The load of each image is measured by 
+        !! the wall time that it has spent on integration steps since the last check. Rebalancing occurs when the step time of the
+        !! slowest image exceeds the mean of all images by more than the fraction COARRAY_IMBALANCE. Every image also steps all of 
+        !! the massive bodies, so the part of the step time that does not depend on the test particles is estimated as the 
+        !! intercept of a least squares fit of step time against the number of test particles of each image. The rest of the step 
+        !! time of each image (but no less than the fitted time per test particle) is then spread evenly over its test particles, 
+        !! and the test particles are collected and distributed again so that each image gets about the same share of the total 
+        !! cost. When the fit can't be made, for instance when all images have the same number of test particles, the whole step 
+        !! time is used.
+        !!
+        !! If no steps have been timed, rebalancing instead occurs when the difference between the number of test particles between
+        !! the image with the smallest and largest number of test particles is larger than the number of images, and the test 
+        !! particles are distributed by number. Each decision is recorded in the Coarray balance log file.
         implicit none
         ! Arguments
         class(swiftest_nbody_system), intent(inout) :: nbody_system !! Swiftest nbody system 
         class(swiftest_parameters),   intent(inout) :: param        !! Current run configuration parameters 
+        type(walltimer),              intent(inout) :: timer        !! Timer of the integration steps of this image since the last check
         ! Internals
         integer(I4B), codimension[*], save :: ntp
-        integer(I4B) :: img,ntp_min, ntp_max
-        character(len=NAMELEN) :: min_str, max_str, diff_str, ni_str
+        real(DP), codimension[*], save :: wall
+        integer(I4B) :: img, ntp_min, ntp_max, ntot
+        integer(I4B), dimension(num_images()) :: ntp_img
+        real(DP), dimension(num_images()) :: wall_img
+        real(DP) :: wall_mean, imbalance, ntp_mean, ntp_var, wall_tp, wall_fixed
+        real(DP), dimension(:), allocatable :: tpcost
+        logical :: lcost, lrebalance
+        logical, save :: lfirst = .true.
+        character(len=NAMELEN) :: min_str, max_str, diff_str, ni_str, imb_str
+        character(len=STRMAX) :: message
 
         ntp = nbody_system%tp%nbody
+        if (timer%main_is_started) then
+            wall = timer%wall_step
+        else
+            wall = 0.0_DP
+        end if
         sync all
         write(param%display_unit,*) "Checking whether test particles need to be reblanced."
-        ntp_min = huge(1)
-        ntp_max = 0
         do img = 1, num_images()
-            if (ntp[img] < ntp_min) ntp_min = ntp[img]
-            if (ntp[img] > ntp_max) ntp_max = ntp[img]
+            ntp_img(img) = ntp[img]
+            wall_img(img) = wall[img]
         end do
+        sync all
+
+        ntp_min = minval(ntp_img(:))
+        ntp_max = maxval(ntp_img(:))
+        ntot = sum(ntp_img(:))
+        wall_mean = sum(wall_img(:)) / num_images()
+        lcost = (wall_mean > 0.0_DP)
+        if (lcost) then
+            imbalance = maxval(wall_img(:)) / wall_mean - 1.0_DP
+            lrebalance = (imbalance > param%coarray_imbalance) .and. (ntot > 1)
+
+            ! Fit wall = wall_fixed + wall_tp * ntp across the images to separate the massive body time from the test particle time
+            ntp_mean = real(ntot, kind=DP) / num_images()
+            ntp_var = sum((ntp_img(:) - ntp_mean)**2)
+            wall_tp = 0.0_DP
+            if (ntp_var > 0.0_DP) wall_tp = sum((ntp_img(:) - ntp_mean) * (wall_img(:) - wall_mean)) / ntp_var
+            if (wall_tp > 0.0_DP) then
+                wall_fixed = min(max(wall_mean - wall_tp * ntp_mean, 0.0_DP), minval(wall_img(:)))
+            else
+                wall_tp = 0.0_DP
+                wall_fixed = 0.0_DP
+            end if
+        else
+            imbalance = 0.0_DP
+            lrebalance = (ntp_max - ntp_min >= num_images())
+        end if
+
         write(min_str,*) ntp_min
         write(max_str,*) ntp_max
         write(diff_str,*) ntp_max - ntp_min
         write(ni_str,*) num_images()
+        write(imb_str,'(ES12.5)') imbalance
         write(param%display_unit,*) "ntp_min   : " // trim(adjustl(min_str))
         write(param%display_unit,*) "ntp_max   : " // trim(adjustl(max_str))
         write(param%display_unit,*) "difference: " // trim(adjustl(diff_str))
+        write(param%display_unit,*) "imbalance : " // trim(adjustl(imb_str))
         flush(param%display_unit)
-        sync all
-        if (ntp_max - ntp_min >= num_images()) then
-            write(param%display_unit,*) trim(adjustl(diff_str)) // ">=" // trim(adjustl(ni_str)) // ": Rebalancing"
+
+        if (this_image() == 1) then
+            if (lfirst) call swiftest_io_log_start(param, COARRAY_BALANCE_LOG_OUT, "Coarray load balancer logfile. " &
+                                                   // "Diagnostic values: image, ntp, step wall time since the last check (s)")
+            write(message, '(A,ES24.16,2(A,ES12.5))') "swiftest_coarray_balance_system: checked at t = ", nbody_system%t, &
+                                                      " with step time imbalance = ", imbalance, " and threshold = ", &
+                                                      param%coarray_imbalance
+            call swiftest_io_log_one_message(COARRAY_BALANCE_LOG_OUT, message)
+            if (lcost) then
+                write(message, '(2(A,ES12.5))') "swiftest_coarray_balance_system: fitted massive body step time = ", wall_fixed, &
+                                                " and step time per test particle = ", wall_tp
+                call swiftest_io_log_one_message(COARRAY_BALANCE_LOG_OUT, message)
+            end if
+            do img = 1, num_images()
+                write(message, '(I6,1X,I0,1X,ES12.5)') img, ntp_img(img), wall_img(img)
+                call swiftest_io_log_one_message(COARRAY_BALANCE_LOG_OUT, message)
+            end do
+            if (.not.lrebalance) then
+                message = "swiftest_coarray_balance_system: no rebalancing needed"
+            else if (lcost) then
+                message = "swiftest_coarray_balance_system: rebalancing test particles by measured step time"
+            else
+                message = "swiftest_coarray_balance_system: rebalancing test particles by number"
+            end if
+            call swiftest_io_log_one_message(COARRAY_BALANCE_LOG_OUT, message)
+        end if
+        lfirst = .false.
+
+        if (lrebalance) then
+            write(param%display_unit,*) trim(adjustl(imb_str)) // ": Rebalancing"
             flush(param%display_unit)
-            call nbody_system%coarray_collect(param)
-            call nbody_system%coarray_distribute(param)
+            if (lcost) then
+                ! Collect the estimated cost of the test particles in the same order as the test particles themselves, then send
+                ! the whole list back to every image so that they all agree on where each test particle goes
+                allocate(tpcost(ntp))
+                if (ntp > 0) tpcost(:) = max(wall - wall_fixed, wall_tp * ntp) / ntp
+                call cocollect(tpcost)
+                call coclone(tpcost)
+                call nbody_system%coarray_collect(param)
+                call nbody_system%coarray_distribute(param, tpcost)
+            else
+                call nbody_system%coarray_collect(param)
+                call nbody_system%coarray_distribute(param)
+            end if
             write(param%display_unit,*) "Rebalancing complete"
         else
-            write(param%display_unit,*) trim(adjustl(diff_str)) // "<" // trim(adjustl(ni_str)) // ": No rebalancing needed"
+            write(param%display_unit,*) trim(adjustl(imb_str)) // ": No rebalancing needed"
         end if
         flush(param%display_unit)
+        call timer%reset()
+
         return
     end subroutine swiftest_coarray_balance_system
 
@@ -669,16 +761,20 @@ contains
     end subroutine swiftest_coarray_collect_system
  
  
-    module subroutine swiftest_coarray_distribute_system(nbody_system, param)
+    module subroutine swiftest_coarray_distribute_system(nbody_system, param, tpcost)
         !! author: David A. Minton
         !!
-        !! Distributes test particles from image #1 out to all images.
+        !! Distributes test particles from image #1 out to all images. Each image gets a contiguous block of the test particles. If 
+        !! the estimated cost of each test particle is passed, the blocks are chosen so that each image gets about the same share of
+        !! the total cost, otherwise each image gets about the same number of test particles.
         implicit none
         ! Arguments
-        class(swiftest_nbody_system), intent(inout) :: nbody_system !! Swiftest nbody system 
-        class(swiftest_parameters),   intent(inout) :: param        !! Current run configuration parameters 
+        class(swiftest_nbody_system),     intent(inout) :: nbody_system !! Swiftest nbody system 
+        class(swiftest_parameters),       intent(inout) :: param        !! Current run configuration parameters 
+        real(DP), dimension(:), optional, intent(in)    :: tpcost       !! Estimated cost of each test particle on image 1
         ! Internals
-        integer(I4B) :: istart, iend, ntot, num_per_image, ncopy
+        integer(I4B) :: i, img, istart, iend, ntot, num_per_image, ncopy
+        real(DP) :: cost_tot, cost_sum
         logical, dimension(:), allocatable :: lspill_list
         integer(I4B), codimension[:], allocatable  :: ntp
         character(len=NAMELEN) :: image_num_char, ntp_num_char
@@ -702,16 +798,31 @@ contains
         end if
 
         allocate(lspill_list(ntot))
-        num_per_image = ceiling(1.0_DP * ntot / num_images())
-        istart = (this_image() - 1) * num_per_image + 1
-        if (this_image() == num_images()) then
-            iend = ntot
+        cost_tot = 0.0_DP
+        if (present(tpcost)) then
+            if (size(tpcost) == ntot) cost_tot = sum(tpcost(:))
+        end if
+
+        if (cost_tot > 0.0_DP) then
+            ! Each test particle goes to the image whose share of the total cost contains the midpoint of the test particle's cost
+            cost_sum = 0.0_DP
+            do i = 1, ntot
+                img = ceiling(num_images() * (cost_sum + 0.5_DP * tpcost(i)) / cost_tot)
+                lspill_list(i) = (min(max(img, 1), num_images()) /= this_image())
+                cost_sum = cost_sum + tpcost(i)
+            end do
         else
-            iend = this_image() * num_per_image
+            num_per_image = ceiling(1.0_DP * ntot / num_images())
+            istart = (this_image() - 1) * num_per_image + 1
+            if (this_image() == num_images()) then
+                iend = ntot
+            else
+                iend = this_image() * num_per_image
+            end if
+        
+            lspill_list(:) = .true.
+            lspill_list(istart:iend) = .false.
         end if
-    
-        lspill_list(:) = .true.
-        lspill_list(istart:iend) = .false.
 
         allocate(cotp[*], source=nbody_system%tp)
         call cotp%coclone()
@@ -13,7 +13,8 @@ contains
    module subroutine swiftest_discard_system(self, param)
       !! author: David A. Minton
       !!
-      !! Calls the discard methods for each body class and then the write method if any discards were detected
+      !! Calls the discard methods for each body class and then the write method if any discards were detected. Any methods set
+      !! to "AUTO" are selected again if the number of bodies has changed by a large factor
       !!
       implicit none
       ! Arguments
@@ -49,6 +50,9 @@ contains
                call tp_discards%setup(0,param) 
             end if
          end if
+
+         ! Select the interaction loop and encounter check methods again if the number of bodies has changed a lot
+         call nbody_system%autotune(param)
          
       end associate
 
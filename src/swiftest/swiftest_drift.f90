@@ -14,6 +14,9 @@ submodule (swiftest) s_swiftest_drift
    real(DP),     parameter :: DANBYB   = 1.0E-13_DP
    integer(I2B), parameter :: NLAG1    = 50
    integer(I2B), parameter :: NLAG2    = 40
+   integer(I4B), parameter :: NNEWTON  = 6
+   !> Number of bodies drifted together as one structure-of-arrays batch
+   integer(I4B), parameter :: DRIFT_BATCH = 128
 
 contains
 
@@ -73,9 +76,12 @@ contains
       logical, dimension(:),      intent(in)    :: lmask !! Logical mask of size self%nbody that determines which bodies to drift.
       integer(I4B), dimension(:), intent(out)   :: iflag !! Vector of error flags. 0 means no problem
       ! Internals
-      integer(I4B)                              :: i   
+      integer(I4B)                              :: i, j, k, nact, nlane
       real(DP)                                  :: energy, vmag2, rmag  !! Variables used in GR calculation
       real(DP), dimension(:), allocatable       :: dtp
+      integer(I4B), dimension(:), allocatable   :: ind
+      real(DP), dimension(DRIFT_BATCH)          :: mub, rxb, ryb, rzb, vxb, vyb, vzb, dtb
+      integer(I4B), dimension(DRIFT_BATCH)      :: iflagb
 
       if (n == 0) return
 
@@ -95,18 +101,181 @@ contains
          where(lmask(1:n)) dtp(1:n) = dt
       end if 
 
-      !!$omp simd ! SIMD does not yet work
-      do i = 1, n
-         if (lmask(i)) call swiftest_drift_one(mu(i), x(1,i), x(2,i), x(3,i), v(1,i), v(2,i), v(3,i), dtp(i), iflag(i))
+      ! Gather the active bodies into batches of contiguous arrays so that the Kepler solver can iterate all of them in 
+      ! lockstep
+      nact = count(lmask(1:n))
+      allocate(ind(nact))
+      ind(:) = pack([(i, i = 1, n)], lmask(1:n))
+      do j = 1, nact, DRIFT_BATCH
+         nlane = min(DRIFT_BATCH, nact - j + 1)
+         do k = 1, nlane
+            i = ind(j + k - 1)
+            mub(k) = mu(i)
+            rxb(k) = x(1,i); ryb(k) = x(2,i); rzb(k) = x(3,i)
+            vxb(k) = v(1,i); vyb(k) = v(2,i); vzb(k) = v(3,i)
+            dtb(k) = dtp(i)
+         end do
+
+         call swiftest_drift_batch(nlane, mub, rxb, ryb, rzb, vxb, vyb, vzb, dtb, iflagb)
+
+         do k = 1, nlane
+            i = ind(j + k - 1)
+            x(1,i) = rxb(k); x(2,i) = ryb(k); x(3,i) = rzb(k)
+            v(1,i) = vxb(k); v(2,i) = vyb(k); v(3,i) = vzb(k)
+            iflag(i) = iflagb(k)
+         end do
       end do
-      !!$omp end simd
 
-      deallocate(dtp)
+      deallocate(dtp, ind)
 
       return
    end subroutine swiftest_drift_all
 
 
+   pure subroutine swiftest_drift_batch(nlane, mu, rx, ry, rz, vx, vy, vz, dt, iflag)
+      !! author: David A. Minton
+      !!
+      !! Perform Danby drift on a batch of bodies stored as structure-of-arrays. Both the small eccentricity and mean anomaly 
+      !! solution and Newton's method in universal variables are computed for every body in the batch in lockstep, and masks 
+      !! are used to select which result applies to each body and to freeze the bodies that have already converged. The few
+      !! bodies that fail to converge are sent to swiftest_drift_one, which falls back on Laguerre's method and substeps. 
+      !!
+      !! The masks are kept as integers rather than logical arrays and are combined arithmetically rather than with .and., and 
+      !! each masked expression is kept to a single operation, so that the compiler is able to vectorize the loops.
+      implicit none
+      ! Arguments
+      integer(I4B),                   intent(in)    :: nlane      !! Number of bodies in the batch
+      real(DP),     dimension(nlane), intent(in)    :: mu         !! G * (Mcb + m) of each body
+      real(DP),     dimension(nlane), intent(inout) :: rx, ry, rz !! Position of each body
+      real(DP),     dimension(nlane), intent(inout) :: vx, vy, vz !! Velocity of each body
+      real(DP),     dimension(nlane), intent(in)    :: dt         !! Step size of each body
+      integer(I4B), dimension(nlane), intent(out)   :: iflag      !! Error status flag of each body (0 = OK, nonzero = ERROR)
+      ! Internals
+      integer(I4B), parameter :: KEPU = 1, KEPMD = 2 !! Solution method of each body, also used as its not-converged flag
+      integer(I4B) :: i, nc
+      logical  :: lell, lconv
+      real(DP) :: asq, esq, fchk, fpk, ds, fn, fpp, fppp, w, rxn, ryn, rzn
+      integer(I4B), dimension(DRIFT_BATCH) :: method
+      real(DP), dimension(DRIFT_BATCH) :: r0, v0s, u, alpha, dtl, a, en, ec, es, dm, s, xkep, sx, cx
+      real(DP), dimension(DRIFT_BATCH) :: f, g, fdot, gdot, fu, gu, fdotu, gdotu
+      real(DP), dimension(DRIFT_BATCH) :: x, c0, c1, c2, c3, fp, c1s, c2s, c3s, fps
+
+      ! Every body goes through both solution methods, so the bodies that a method does not apply to are given harmless 
+      ! inputs (a circular orbit or zero anomaly) to avoid floating point exceptions
+      !$omp simd private(asq, esq, lell)
+      do i = 1, nlane
+         r0(i) = sqrt(rx(i)*rx(i) + ry(i)*ry(i) + rz(i)*rz(i))
+         v0s(i) = vx(i)*vx(i) + vy(i)*vy(i) + vz(i)*vz(i)
+         u(i) = rx(i)*vx(i) + ry(i)*vy(i) + rz(i)*vz(i)
+         alpha(i) = 2 * mu(i) / r0(i) - v0s(i)
+         lell = alpha(i) > 0.0_DP
+         a(i) = mu(i) / merge(alpha(i), mu(i) / r0(i), lell)
+         asq = a(i)**2
+         en(i) = sqrt(mu(i) / (a(i) * asq))
+         ec(i) = 1.0_DP - r0(i) / a(i)
+         es(i) = u(i) / (en(i) * asq)
+         esq = ec(i)**2 + es(i)**2
+         dm(i) = dt(i) * en(i) - int(dt(i) * en(i) / TWOPI, kind = I4B) * TWOPI
+         dtl(i) = merge(dm(i) / en(i), dt(i), lell)
+         method(i) = merge(KEPMD, KEPU, merge(0, 1, lell) + merge(0, 1, esq < E2MAX) + merge(0, 1, dm(i)**2 < DM2MAX) &
+                                        + merge(0, 1, esq * dm(i)**2 < E2DM2MAX) == 0)
+         iflag(i) = method(i)
+         dm(i) = merge(dm(i), 0.0_DP, method(i) == KEPMD)
+         ec(i) = merge(ec(i), 0.0_DP, method(i) == KEPMD)
+         es(i) = merge(es(i), 0.0_DP, method(i) == KEPMD)
+         s(i) = 0.0_DP
+         c1s(i) = 0.0_DP
+         c2s(i) = 0.0_DP
+         c3s(i) = 0.0_DP
+         fps(i) = 1.0_DP
+      end do
+
+      ! Bodies on low eccentricity orbits with small mean anomaly steps
+      call swiftest_drift_kepmd_batch(nlane, dm, es, ec, xkep, sx, cx)
+      !$omp simd private(fchk, fpk)
+      do i = 1, nlane
+         fchk = (xkep(i) - ec(i) * sx(i) + es(i) * (1.0_DP - cx(i)) - dm(i))
+         fpk = 1.0_DP - ec(i) * cx(i) + es(i) * sx(i)
+         f(i) = a(i) / r0(i) * (cx(i) - 1.0_DP) + 1.0_DP
+         g(i) = dtl(i) + (sx(i) - xkep(i)) / en(i)
+         fdot(i) = -(a(i) / (r0(i) * fpk)) * en(i) * sx(i)
+         gdot(i) = (cx(i) - 1.0_DP) / fpk + 1.0_DP
+         iflag(i) = merge(0, iflag(i), fchk**2 + merge(0.0_DP, 1.0_DP, method(i) == KEPMD) <= DANBYB**2)
+      end do
+
+      ! Everything else goes through Newton's method in universal variables. The Newton step is weighted by zero for the 
+      ! bodies that are not iterating, which leaves them unchanged
+      do i = 1, nlane
+         if (method(i) == KEPU) call swiftest_drift_kepu_guess(dtl(i), r0(i), mu(i), alpha(i), u(i), s(i))
+      end do
+
+      do nc = 0, NNEWTON
+         if (count(iflag(:) == KEPU) == 0) exit
+         !$omp simd private(w)
+         do i = 1, nlane
+            w = merge(1.0_DP, 0.0_DP, iflag(i) == KEPU)
+            x(i) = w * s(i) * s(i) * alpha(i)
+         end do
+         call swiftest_drift_kepu_stumpff_batch(nlane, x, c0, c1, c2, c3)
+         !$omp simd private(w, lconv, ds, fn, fpp, fppp)
+         do i = 1, nlane
+            w = merge(1.0_DP, 0.0_DP, iflag(i) == KEPU)
+            c1(i) = c1(i) * s(i)
+            c2(i) = c2(i) * s(i) * s(i)
+            c3(i) = c3(i) * s(i) * s(i) * s(i)
+            fn = w * (r0(i) * c1(i) + u(i) * c2(i) + mu(i) * c3(i) - dtl(i))
+            fp(i) = r0(i) * c0(i) + u(i) * c1(i) + mu(i) * c2(i)
+            fpp = (-r0(i) * alpha(i) + mu(i)) * c1(i) + u(i) * c0(i)
+            fppp = (-r0(i) * alpha(i) + mu(i)) * c0(i) - u(i) * alpha(i) * c1(i)
+            ds = -fn / fp(i)
+            ds = -fn / (fp(i) + ds * fpp / 2.0_DP)
+            ds = -fn / (fp(i) + ds * fpp / 2.0_DP + ds * ds * fppp / 6.0_DP)
+            s(i) = s(i) + w * ds
+            lconv = (fn / dtl(i))**2 < w * DANBYB * DANBYB
+            c1s(i) = merge(c1(i), c1s(i), lconv)
+            c2s(i) = merge(c2(i), c2s(i), lconv)
+            c3s(i) = merge(c3(i), c3s(i), lconv)
+            fps(i) = merge(fp(i), fps(i), lconv)
+            iflag(i) = merge(0, iflag(i), lconv)
+         end do
+      end do
+
+      !$omp simd
+      do i = 1, nlane
+         fu(i) = 1.0_DP - mu(i) / r0(i) * c2s(i)
+         gu(i) = dtl(i) - mu(i) * c3s(i)
+         fdotu(i) = -mu(i) / (fps(i) * r0(i)) * c1s(i)
+         gdotu(i) = 1.0_DP - mu(i) / fps(i) * c2s(i)
+      end do
+
+      !$omp simd private(rxn, ryn, rzn)
+      do i = 1, nlane
+         f(i) = merge(fu(i), f(i), method(i) == KEPU)
+         g(i) = merge(gu(i), g(i), method(i) == KEPU)
+         fdot(i) = merge(fdotu(i), fdot(i), method(i) == KEPU)
+         gdot(i) = merge(gdotu(i), gdot(i), method(i) == KEPU)
+         if (iflag(i) == 0) then
+            rxn = rx(i) * f(i) + vx(i) * g(i)
+            ryn = ry(i) * f(i) + vy(i) * g(i)
+            rzn = rz(i) * f(i) + vz(i) * g(i)
+            vx(i) = rx(i) * fdot(i) + vx(i) * gdot(i)
+            vy(i) = ry(i) * fdot(i) + vy(i) * gdot(i)
+            vz(i) = rz(i) * fdot(i) + vz(i) * gdot(i)
+            rx(i) = rxn
+            ry(i) = ryn
+            rz(i) = rzn
+         end if
+      end do
+
+      ! Stragglers are still at their initial state, so they can be redone with the full scalar solver
+      do i = 1, nlane
+         if (iflag(i) /= 0) call swiftest_drift_one(mu(i), rx(i), ry(i), rz(i), vx(i), vy(i), vz(i), dt(i), iflag(i))
+      end do
+
+      return
+   end subroutine swiftest_drift_batch
+
+
    pure elemental module subroutine swiftest_drift_one(mu, rx, ry, rz, vx, vy, vz, dt, iflag) 
       !! author: The Purdue Swiftest Team - David A. Minton, Carlisle A. Wishard, Jennifer L.L. Pouplin, and Jacob R. Elliott
       !!
@@ -275,6 +444,51 @@ contains
    end subroutine swiftest_drift_kepmd
 
 
+   pure subroutine swiftest_drift_kepmd_batch(nlane, dm, es, ec, x, s, c)
+      !! author: David A. Minton
+      !!
+      !! Solve Kepler's equation in difference form for a batch of small dm and eccentricity. This is the same as 
+      !! swiftest_drift_kepmd, written as a single loop over the batch so that it can be vectorized.
+      implicit none
+      ! Arguments
+      integer(I4B),                   intent(in)  :: nlane !! Number of elements in the batch
+      real(DP),     dimension(nlane), intent(in)  :: dm    !! increment in mean anomaly
+      real(DP),     dimension(nlane), intent(in)  :: es    !! eccentricity times the sine of eccentric anomaly
+      real(DP),     dimension(nlane), intent(in)  :: ec    !! eccentricity times the cosine of eccentric anomaly
+      real(DP),     dimension(nlane), intent(out) :: x     !! solution to Kepler's equation in difference form (x = dE)
+      real(DP),     dimension(nlane), intent(out) :: s     !! sine of x
+      real(DP),     dimension(nlane), intent(out) :: c     !! cosine of x
+      ! Internals
+      real(DP), parameter :: a0 = 39916800.0_DP, a1 = 6652800.0_DP, a2 = 332640.0_DP, a3 = 7920.0_DP, a4 = 110.0_DP
+      integer(I4B) :: i
+      real(DP)     :: dx, fac1, fac2, q, y, f, fp, fpp, fppp
+
+      !$omp simd private(dx, fac1, fac2, q, y, f, fp, fpp, fppp)
+      do i = 1, nlane
+         fac1 = 1.0_DP / (1.0_DP - ec(i))
+         q = fac1 * dm(i)
+         fac2 = es(i)*es(i)*fac1 - ec(i) / 3.0_DP
+         x(i) = q * (1.0_DP - 0.5_DP * fac1 * q * (es(i) - q * fac2))
+         y = x(i)*x(i)
+         s(i) = x(i) * (a0 - y * (a1 - y * (a2 - y * (a3 - y * (a4 - y))))) / a0
+         c(i) = sqrt(1.0_DP - s(i)*s(i))
+         f = x(i) - ec(i) * s(i) + es(i) * (1.0_DP - c(i)) - dm(i)
+         fp = 1.0_DP - ec(i) * c(i) + es(i) * s(i)
+         fpp = ec(i) * s(i) + es(i) * c(i)
+         fppp = ec(i) * c(i) - es(i) * s(i)
+         dx = -f / fp
+         dx = -f / (fp + dx * fpp/2.0_DP)
+         dx = -f / (fp + dx * fpp/2.0_DP + dx*dx * fppp * SIXTH)
+         x(i) = x(i) + dx
+         y = x(i)*x(i)
+         s(i) = x(i) * (a0 - y * (a1 - y * (a2 - y * (a3 - y * (a4 - y))))) / a0
+         c(i) = sqrt(1.0_DP - s(i)*s(i))
+      end do
+
+      return
+   end subroutine swiftest_drift_kepmd_batch
+
+
    pure subroutine swiftest_drift_kepu(dt,r0,mu,alpha,u,fp,c1,c2,c3,iflag)
       !! author: David A. Minton
       !!
@@ -456,7 +670,7 @@ contains
       integer( I4B) :: nc
       real(DP)   :: x, c0, ds, f, fpp, fppp, fdt
 
-      do nc = 0, 6
+      do nc = 0, NNEWTON
          x = s*s*alpha
          call swiftest_drift_kepu_stumpff(x, c0, c1, c2, c3)
          c1 = c1*s
@@ -579,4 +793,72 @@ contains
    end subroutine swiftest_drift_kepu_stumpff
 
 
+   pure subroutine swiftest_drift_kepu_stumpff_batch(nlane, x, c0, c1, c2, c3)
+      !! author: David A. Minton
+      !!
+      !! Compute Stumpff functions for a batch of arguments. This is the same as swiftest_drift_kepu_stumpff, but the 
+      !! argument reduction and the doubling steps are done for the whole batch together, so that the loops are the same 
+      !! length for every element.
+      implicit none
+      ! Arguments
+      integer(I4B),                   intent(in)    :: nlane !! Number of elements in the batch
+      real(DP),     dimension(nlane), intent(inout) :: x     !! argument of Stumpff functions
+      real(DP),     dimension(nlane), intent(out)   :: c0    !! zeroth Stumpff function
+      real(DP),     dimension(nlane), intent(out)   :: c1    !! first Stumpff function
+      real(DP),     dimension(nlane), intent(out)   :: c2    !! second Stumpff function
+      real(DP),     dimension(nlane), intent(out)   :: c3    !! third Stumpff function
+      ! Internals
+      integer(I4B) :: i, k, nmax
+      logical      :: lred
+      integer(I4B), dimension(DRIFT_BATCH) :: n
+      real(DP),     dimension(DRIFT_BATCH) :: d0, d1, d2, d3
+      real(DP), parameter :: xm = 0.1_DP
+
+      n(1:nlane) = 0
+      do while (count(abs(x(:)) >= xm) > 0)
+         !$omp simd private(lred)
+         do i = 1, nlane
+            lred = abs(x(i)) >= xm
+            n(i) = merge(n(i) + 1, n(i), lred)
+            x(i) = merge(x(i) / 4.0_DP, x(i), lred)
+         end do
+      end do
+
+      !$omp simd
+      do i = 1, nlane
+         c2(i) = (1.0_DP - x(i) * (1.0_DP - x(i) * (1.0_DP - x(i) * (1.0_DP - x(i) * (1.0_DP - x(i) * &
+                  (1.0_DP - x(i) / 182.0_DP) / 132.0_DP) / 90.0_DP) / 56.0_DP) /              &
+                  30.0_DP) / 12.0_DP) / 2.0_DP
+         c3(i) = (1.0_DP - x(i) * (1.0_DP - x(i) * (1.0_DP - x(i) * (1.0_DP - x(i) * (1.0_DP - x(i) * &
+                  (1.0_DP - x(i) / 210.0_DP) / 156.0_DP) / 110.0_DP) / 72.0_DP) /             &
+                  42.0_DP) / 20.0_DP ) / 6.0_DP
+         c1(i) = 1.0_DP - x(i) * c3(i)
+         c0(i) = 1.0_DP - x(i) * c2(i)
+      end do
+
+      ! The doubling step is computed for every element and then kept only by the elements that were reduced at least k times
+      nmax = maxval(n(1:nlane))
+      do k = nmax, 1, -1
+         !$omp simd
+         do i = 1, nlane
+            d3(i) = (c2(i) + c0(i) * c3(i)) / 4.0_DP
+            d2(i) = c1(i) * c1(i) / 2.0_DP
+            d1(i) = c0(i) * c1(i)
+            d0(i) = 2 * c0(i) * c0(i) - 1.0_DP
+         end do
+         !$omp simd private(lred)
+         do i = 1, nlane
+            lred = n(i) >= k
+            c3(i) = merge(d3(i), c3(i), lred)
+            c2(i) = merge(d2(i), c2(i), lred)
+            c1(i) = merge(d1(i), c1(i), lred)
+            c0(i) = merge(d0(i), c0(i), lred)
+            x(i) = merge(x(i) * 4, x(i), lred)
+         end do
+      end do
+
+      return
+   end subroutine swiftest_drift_kepu_stumpff_batch
+
+
 end submodule s_swiftest_drift
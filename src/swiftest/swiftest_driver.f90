@@ -30,6 +30,9 @@ contains
       type(swiftest_parameters)                 :: param             !! Run configuration parameters
       class(swiftest_storage),      allocatable :: system_history    !! Stores the system history between output dumps
       type(walltimer)                           :: integration_timer !! Object used for computing elapsed wall time
+#ifdef COARRAY
+      type(walltimer)                           :: balance_timer     !! Step time of this image since the last load balance check
+#endif
 
       !> Read in the user-defined parameters file and the initial conditions of the nbody_system
       param%integrator = trim(adjustl(integrator))
@@ -39,6 +42,11 @@ contains
       if (.not.param%lcoarray .and. (this_image() /= 1)) stop ! Single image mode
 #endif
 
+      ! With asynchronous output, the integration runs on one thread of a team of two while the other thread writes the output 
+      ! frames that are handed over to it. The parallel regions used during the integration are nested inside this one.
+      !$ if (param%lasync_output) call omp_set_max_active_levels(max(omp_get_max_active_levels(), 2))
+      !$omp parallel num_threads(2) if(param%lasync_output) default(shared)
+      !$omp single
       associate(t0       => param%t0, &
          tstart          => param%tstart, &
          dt              => param%dt, &
@@ -111,6 +119,8 @@ contains
          ! Distribute test particles to the various images
          if (param%lcoarray) call nbody_system%coarray_distribute(param)
 #endif
+         ! Select any "AUTO" interaction loop and encounter check methods now that the integrator has finished its own setup
+         call nbody_system%autotune(param)
 
          ! If this is a new run, compute energy initial conditions (if energy tracking is turned on) and write the initial conditions to file.
          call nbody_system%display_run_information(param, integration_timer, phase="first")
@@ -130,7 +140,13 @@ contains
          do iloop = istart, nloops
             !> Step the nbody_system forward in time
             call integration_timer%start()
+#ifdef COARRAY
+            if (param%lcoarray) call balance_timer%start()
+#endif
             call nbody_system%step(param, nbody_system%t, dt)
+#ifdef COARRAY
+            if (param%lcoarray) call balance_timer%stop()
+#endif
             call integration_timer%stop()
 
             nbody_system%t = t0 + iloop * dt
@@ -155,7 +171,7 @@ contains
                      idump = 0
                      call nbody_system%dump(param, system_history)
 #ifdef COARRAY
-                     if (param%lcoarray) call nbody_system%coarray_balance(param)
+                     if (param%lcoarray) call nbody_system%coarray_balance(param, balance_timer)
 #endif
                   end if
 #ifdef COARRAY
@@ -178,10 +194,13 @@ contains
             end if
 
          end do
-         ! Dump any remaining history if it exists
+         ! Dump any remaining history if it exists and wait for it to be written
          call nbody_system%dump(param, system_history)
+         call system_history%flush(param)
          call nbody_system%display_run_information(param, integration_timer, phase="last")
       end associate
+      !$omp end single
+      !$omp end parallel
    return
    end subroutine swiftest_driver
 
@@ -375,9 +375,11 @@ contains
       class(swiftest_parameters), allocatable :: param_restart !! Local parameters variable used to parameters change input file 
                                                                !! names to dump file-specific values without changing the 
                                                                !! user-defined values
-      character(len=:), allocatable :: param_file_name
-      character(len=STRMAX) :: time_text
-   
+
+      ! The NetCDF library is not thread safe, so any output still being written by the output writer thread has to be finished
+      ! before the other history files are written 
+      call system_history%flush(param)
+
       ! Dump the encounter history if necessary
       if (param%lenc_save_trajectory &
          .or. param%lenc_save_closest &
@@ -385,9 +387,6 @@ contains
             call self%encounter_history%dump(param)
       if (allocated(self%collision_history)) call self%collision_history%dump(param)
 
-      ! Dump the nbody_system history to file
-      call system_history%dump(param)
-
 #ifdef COARRAY
       if (this_image() == 1) then
 #endif 
@@ -398,70 +397,172 @@ contains
          param_restart%nc_in = param%outfile
          param_restart%lrestart = .true.
          param_restart%tstart = self%t
-         param_file_name    = trim(adjustl(PARAM_RESTART_FILE))
-         call param_restart%dump(param_file_name)
-         write(time_text,'(I0.20)') param%iloop
-         param_file_name = "param." // trim(adjustl(time_text)) // ".in"
-         call param_restart%dump(param_file_name)
 #ifdef COARRAY
       end if ! (this_image() == 1) 
 #endif 
+
+      ! Dump the nbody_system history to file, followed by the restart parameters that go with it
+      call system_history%dump(param, param_restart)
+
       return
    end subroutine swiftest_io_dump_system
 
 
-   module subroutine swiftest_io_dump_storage(self, param)
+   subroutine swiftest_io_dump_restart(param_restart)
+      !! author: David A. Minton
+      !!
+      !! Dumps the restart parameters to both the current restart file and the one labeled with the loop number
+      implicit none
+      ! Arguments
+      class(swiftest_parameters), intent(in) :: param_restart !! Parameters used to restart the run from the last dump
+      ! Internals
+      character(len=:), allocatable :: param_file_name
+      character(len=STRMAX) :: time_text
+
+      param_file_name    = trim(adjustl(PARAM_RESTART_FILE))
+      call param_restart%dump(param_file_name)
+      write(time_text,'(I0.20)') param_restart%iloop
+      param_file_name = "param." // trim(adjustl(time_text)) // ".in"
+      call param_restart%dump(param_file_name)
+
+      return
+   end subroutine swiftest_io_dump_restart
+
+
+   module subroutine swiftest_io_dump_storage(self, param, param_restart)
       !! author: David A. Minton
       !!
       !! Dumps the time history of the simulation to file. Each time it writes a frame to file, it deallocates the nbody_system
       !! object from inside. It will only dump frames with systems that are allocated, so this can be called at the end of
       !! a simulation for cases when the number of saved frames is not equal to the dump cadence (for instance, if the dump
       !! cadence is not divisible by the total number of loops).
+      !!
+      !! If ASYNC_OUTPUT is turned on, the frames and the NetCDF object are instead handed over to the output writer thread and 
+      !! the storage object is emptied so that the integration can fill it again while they are being written. Only one set of 
+      !! frames can be waiting to be written at a time, so if the previous set has not been written yet, this waits for it first.
+      !! The restart parameters are then dumped by the flush method once the frames that go with them are in the file.
+      !!
+      !! When Coarrays are used, the images take turns writing into the shared output file unless SHARDED_OUTPUT is turned on, in 
+      !! which case each image writes its own shard at the same time.
       implicit none
       ! Arguments
-      class(swiftest_storage),   intent(inout)        :: self   !! Swiftest simulation history storage object
-      class(swiftest_parameters),   intent(inout)     :: param  !! Current run configuration parameters 
+      class(swiftest_storage),    intent(inout)        :: self          !! Swiftest simulation history storage object
+      class(swiftest_parameters), intent(inout)        :: param         !! Current run configuration parameters 
+      class(swiftest_parameters), intent(in), optional :: param_restart !! Restart parameters to dump once the frames are written
       ! Internals
-      integer(I4B) :: i
+      type(swiftest_output_buffer), pointer :: buffer
 #ifdef COARRAY
       type(walltimer) :: iotimer
 #endif
 
-      if (self%iframe == 0) return
+      call self%flush(param)
+
+      if (self%iframe == 0) then
+         if (present(param_restart)) call swiftest_io_dump_restart(param_restart)
+         return
+      end if
       call self%make_index_map()
-      associate(nc => self%nc)
+
+      if (param%lasync_output) then
+         allocate(self%writer)
+         buffer => self%writer
+         call move_alloc(self%frame, buffer%frame)
+         call move_alloc(self%nc, buffer%nc)
+         buffer%iframe = self%iframe
+         allocate(buffer%param, source=param)
+         if (present(param_restart)) allocate(buffer%param_restart, source=param_restart)
+         call self%setup(self%nframes)
+         call self%reset()
+
+         ! If this is called from inside the parallel region set up by the driver, then the frames are written by the other thread
+         ! of the team. Otherwise the task is run right away.
+         !$omp task default(none) firstprivate(buffer)
+         call swiftest_io_write_frames(buffer%frame, buffer%iframe, buffer%nc, buffer%param)
+         !$omp end task
+         return
+      end if
+
 #ifdef COARRAY
-         sync all
-         write(param%display_unit,*) "File output started"
-         call iotimer%start()
+      sync all
+      write(param%display_unit,*) "File output started"
+      call iotimer%start()
+      if (param%lsharded_output) then
+         ! Each image writes to its own shard of the output file, so the images do not need to take turns
+         call swiftest_io_write_frames(self%frame, self%iframe, self%nc, param)
+      else
          critical
+         call swiftest_io_write_frames(self%frame, self%iframe, self%nc, param)
+         end critical
+      end if
+#else
+      call swiftest_io_write_frames(self%frame, self%iframe, self%nc, param)
 #endif
-         call nc%open(param)
-         do i = 1, self%iframe
-            ! Writing files is more efficient if we write out the common frames from each image before going to the next frame
-            if (allocated(self%frame(i)%item)) then
-               select type(nbody_system => self%frame(i)%item)
-               class is (swiftest_nbody_system)
-                  call nbody_system%write_frame(nc, param)
-               end select
-               deallocate(self%frame(i)%item)
-            end if
-         end do
-         call nc%close()
 #ifdef COARRAY  
-         end critical
-         call iotimer%stop()
-         sync all
-         call iotimer%report(message="File output :", unit=param%display_unit)
-         flush(param%display_unit)
+      call iotimer%stop()
+      sync all
+      call iotimer%report(message="File output :", unit=param%display_unit)
+      flush(param%display_unit)
 #endif
-      end associate
 
       call self%reset()
+      if (present(param_restart)) call swiftest_io_dump_restart(param_restart)
+
       return
    end subroutine swiftest_io_dump_storage
 
 
+   module subroutine swiftest_io_flush_storage(self, param)
+      !! author: David A. Minton
+      !!
+      !! Waits for the output writer thread to finish writing the frames that were handed over to it, then takes the NetCDF object 
+      !! back and dumps the restart parameters that go with the frames. Nothing is done if no frames are being written.
+      implicit none
+      ! Arguments
+      class(swiftest_storage),    intent(inout) :: self  !! Swiftest simulation history storage object
+      class(swiftest_parameters), intent(inout) :: param !! Current run configuration parameters 
+
+      if (.not.associated(self%writer)) return
+
+      !$omp taskwait
+      
+      call move_alloc(self%writer%nc, self%nc)
+      if (allocated(self%writer%param_restart)) call swiftest_io_dump_restart(self%writer%param_restart)
+      deallocate(self%writer)
+
+      return
+   end subroutine swiftest_io_flush_storage
+
+
+   subroutine swiftest_io_write_frames(frame, iframe, nc, param)
+      !! author: David A. Minton
+      !!
+      !! Opens the output file, writes a set of stored frames to it, and closes it again. Each frame is deallocated once it is 
+      !! written. 
+      implicit none
+      ! Arguments
+      type(base_storage_frame),          dimension(:), intent(inout) :: frame  !! Stored frames to write
+      integer(I4B),                                    intent(in)    :: iframe !! Number of frames to write
+      class(swiftest_netcdf_parameters),               intent(inout) :: nc     !! NetCDF object used to write the frames
+      class(swiftest_parameters),                      intent(inout) :: param  !! Current run configuration parameters
+      ! Internals
+      integer(I4B) :: i
+
+      call nc%open(param)
+      do i = 1, iframe
+         if (allocated(frame(i)%item)) then
+            select type(nbody_system => frame(i)%item)
+            class is (swiftest_nbody_system)
+               call nbody_system%write_frame(nc, param)
+            end select
+            deallocate(frame(i)%item)
+         end if
+      end do
+      call nc%close()
+
+      return
+   end subroutine swiftest_io_write_frames
+
+
    module subroutine swiftest_io_get_args(integrator, param_file_name, display_style, from_cli)
       !! author: David A. Minton
       !!
@@ -675,7 +776,8 @@ contains
    module subroutine swiftest_io_netcdf_get_t0_values_system(self, nc, param) 
       !! author: David A. Minton
       !!
-      !! Gets the t0 values of various parameters such as energy and momentum
+      !! Gets the t0 values of various parameters such as energy and momentum. With SHARDED_OUTPUT, the values are read by image 1
+      !! and cloned to the other images.
       !!
       implicit none
       ! Arguments
@@ -689,6 +791,27 @@ contains
       real(DP), dimension(1)                    :: rtemp
       real(DP), dimension(NDIM)                 :: rot0, Ip0, L
       real(DP) :: mass0
+#ifdef COARRAY
+      logical :: fileExists
+      character(len=:), allocatable :: shard_name
+
+      if (param%lsharded_output) then
+         ! The central body and massive bodies are only written to the shard of image 1, and the shards may have been started 
+         ! over at the restart, so image 1 reads the t0 values from the merged output file if there is one, or from its own shard
+         ! otherwise, and sends them to the other images.
+         shard_name = nc%file_name
+         if (this_image() /= 1) then
+            call clone_t0_values()
+            return
+         end if
+         inquire(file=param%outfile, exist=fileExists)
+         if (fileExists) then
+            nc%file_name = param%outfile
+         else
+            nc%file_name = swiftest_io_get_shard_name(param%outfile, 1)
+         end if
+      end if
+#endif
 
       associate (cb => self%cb)
          call nc%open(param, readonly=.true.)
@@ -769,8 +892,46 @@ contains
          deallocate(vals)
          call nc%close()
       end associate
+#ifdef COARRAY
+      if (param%lsharded_output) call clone_t0_values()
+#endif
       
       return
+
+#ifdef COARRAY
+      contains
+
+         subroutine clone_t0_values()
+            !! Sends the t0 values read by image 1 to the other images and restores the name of the shard of this image
+            implicit none
+
+            nc%file_name = shard_name
+            if (.not.param%lenergy) return
+            call coclone(self%ke_orbit_orig)
+            call coclone(self%ke_spin_orig)
+            call coclone(self%pe_orig)
+            call coclone(self%be_orig)
+            call coclone(self%te_orig)
+            call coclone(self%E_orbit_orig)
+            call coclonevec(self%L_orbit_orig)
+            call coclonevec(self%L_spin_orig)
+            call coclonevec(self%L_total_orig)
+            call coclone(self%GMtot_orig)
+            call coclone(self%cb%GM0)
+            call coclone(self%cb%dGM)
+            call coclone(self%cb%R0)
+            if (param%lrotation) then
+               call coclonevec(self%cb%L0)
+               call coclonevec(self%cb%dL)
+            end if
+            call coclonevec(self%L_escape)
+            call coclone(self%GMescape)
+            call coclone(self%E_collisions)
+            call coclone(self%E_untracked)
+
+            return
+         end subroutine clone_t0_values
+#endif
    end subroutine swiftest_io_netcdf_get_t0_values_system
 
 
@@ -816,6 +977,7 @@ contains
          ! Create the file
          call netcdf_io_check( nf90_create(nc%file_name, NF90_NETCDF4, nc%id), "netcdf_io_initialize_output nf90_create" )
          nc%lfile_is_open = .true.
+         if (allocated(nc%idvals)) deallocate(nc%idvals)
 
          ! Dimensions
          call netcdf_io_check( nf90_def_dim(nc%id, nc%time_dimname, NF90_UNLIMITED, nc%time_dimid), &
@@ -985,6 +1147,7 @@ contains
          ! Set fill mode to NaN for all variables
          call netcdf_io_check( nf90_inquire(nc%id, nVariables=nvar), "netcdf_io_initialize_output nf90_inquire nVariables" )
          do varid = 1, nvar
+            call nc%def_var_storage(varid, param)
             call netcdf_io_check( nf90_inquire_variable(nc%id, varid, xtype=vartype, ndims=ndims), &
                                   "netcdf_io_initialize_output nf90_inquire_variable"  )
             select case(vartype)
@@ -1060,6 +1223,9 @@ contains
          call netcdf_io_check( nf90_open(nc%file_name, mode, nc%id), errmsg)
          self%lfile_is_open = .true.
 
+         ! The list of ids is read in again by find_idslot the first time it is needed
+         if (allocated(nc%idvals)) deallocate(nc%idvals)
+
          ! Dimensions
          call netcdf_io_check( nf90_inq_dimid(nc%id, nc%time_dimname, nc%time_dimid), &
                                   "swiftest_io_netcdf_open nf90_inq_dimid time_dimid"  )
@@ -2066,6 +2232,11 @@ contains
       end if ! this_image() == 1
 #endif
       call self%tp%write_frame(nc, param)
+#ifndef COARRAY
+      ! The number of test particles is written last, so that a reader following the file can tell when the frame is complete
+      call netcdf_io_check( nf90_put_var(nc%id, nc%ntp_varid, self%tp%nbody, start=[nc%tslot]), &
+                                  "netcdf_io_write_frame_system nf90_put_var ntp_varid"  )
+#endif
 
       return
    end subroutine swiftest_io_netcdf_write_frame_system
@@ -2090,10 +2261,6 @@ contains
                                   "netcdf_io_write_hdr_system nf90_put_var time_varid"  )
       call netcdf_io_check( nf90_put_var(nc%id, nc%npl_varid, self%pl%nbody, start=[tslot]), &
                                   "netcdf_io_write_hdr_system nf90_put_var npl_varid"  )
-#ifndef COARRAY
-      call netcdf_io_check( nf90_put_var(nc%id, nc%ntp_varid, self%tp%nbody, start=[tslot]), &
-                                  "netcdf_io_write_hdr_system nf90_put_var ntp_varid"  )
-#endif
       if (param%lmtiny_pl) call netcdf_io_check( nf90_put_var(nc%id, nc%nplm_varid, self%pl%nplm, start=[tslot]), &
                                   "netcdf_io_write_hdr_system nf90_put_var nplm_varid"  )
 
@@ -2149,7 +2316,6 @@ contains
          associate(n => self%nbody, tslot => nc%tslot)
             if (n == 0) return
             call util_sort(self%id(1:n), ind)
-            call nc%get_idvals()
 
             do i = 1, n
                j = ind(i)
@@ -2159,6 +2325,9 @@ contains
                call netcdf_io_check( nf90_put_var(nc%id, nc%status_varid, self%status(j), start=[idslot,tslot]), &
                                   "netcdf_io_write_info_body nf90_put_var status_varid"  )
 
+               ! Snapshots only carry the metadata when it changed since the previous frame
+               if (.not.allocated(self%info)) cycle
+
                charstring = trim(adjustl(self%info(j)%name))
                call netcdf_io_check( nf90_put_var(nc%id, nc%name_varid, charstring, start=[1, idslot], count=[NAMELEN, 1]), &
                                   "netcdf_io_write_info_body nf90_put_var name_varid"  )
@@ -2381,6 +2550,18 @@ contains
                   param%out_stat = param_value
                case ("DUMP_CADENCE")
                   read(param_value, *, err = 667, iomsg = iomsg) param%dump_cadence
+               case ("NC_CHUNKING")
+                  call swiftest_io_toupper(param_value)
+                  param%nc_chunking = param_value
+               case ("NC_CHUNK_TIME")
+                  read(param_value, *, err = 667, iomsg = iomsg) param%nc_chunk_time
+               case ("NC_CHUNK_NAME")
+                  read(param_value, *, err = 667, iomsg = iomsg) param%nc_chunk_name
+               case ("NC_DEFLATE_LEVEL")
+                  read(param_value, *, err = 667, iomsg = iomsg) param%nc_deflate_level
+               case ("NC_SHUFFLE")
+                  call swiftest_io_toupper(param_value)
+                  if (param_value == "YES" .or. param_value == 'T') param%lnc_shuffle = .true. 
                case ("CHK_CLOSE")
                   call swiftest_io_toupper(param_value)
                   if (param_value == "YES" .or. param_value == 'T') param%lclose = .true.
@@ -2499,6 +2680,19 @@ contains
                case ("COARRAY")
                   call swiftest_io_toupper(param_value)
                   if (param_value == "YES" .or. param_value == 'T') param%lcoarray = .true. 
+               case ("COARRAY_IMBALANCE")
+                  read(param_value, *, err = 667, iomsg = iomsg) param%coarray_imbalance
+               case ("TREE_GRAVITY")
+                  call swiftest_io_toupper(param_value)
+                  if (param_value == "YES" .or. param_value == 'T') param%ltree_gravity = .true. 
+               case ("ASYNC_OUTPUT")
+                  call swiftest_io_toupper(param_value)
+                  if (param_value == "YES" .or. param_value == 'T') param%lasync_output = .true. 
+               case ("SHARDED_OUTPUT")
+                  call swiftest_io_toupper(param_value)
+                  if (param_value == "YES" .or. param_value == 'T') param%lsharded_output = .true. 
+               case ("TREE_THETA")
+                  read(param_value, *, err = 667, iomsg = iomsg) param%tree_theta
                case("SEED")
                   read(param_value, *) nseeds_from_file
                   ! Because the number of seeds can vary between compilers/systems, we need to make sure we can handle cases in 
@@ -2610,6 +2804,22 @@ contains
                iostat = -1
                return
             end if
+            if ((param%nc_chunking /= "DEFAULT") .and. (param%nc_chunking /= "TIMESERIES") &
+          .and. (param%nc_chunking /= "SNAPSHOT")) then
+               write(iomsg,*) 'Invalid nc_chunking: ',trim(adjustl(param%nc_chunking))
+               iostat = -1
+               return
+            end if
+            if ((param%nc_chunk_time < 0) .or. (param%nc_chunk_name < 0)) then
+               write(iomsg,*) 'Invalid NetCDF chunk size. Must be a positive integer or 0.'
+               iostat = -1
+               return
+            end if
+            if ((param%nc_deflate_level < 0) .or. (param%nc_deflate_level > 9)) then
+               write(iomsg,*) 'Invalid nc_deflate_level. Must be an integer between 0 and 9.'
+               iostat = -1
+               return
+            end if
          end if
          if (param%qmin > 0.0_DP) then
             if ((param%qmin_coord /= "HELIO") .and. (param%qmin_coord /= "BARY")) then
@@ -2668,6 +2878,18 @@ contains
             return
          end if
 
+         if (param%ltree_gravity .and. (param%tree_theta <= 0.0_DP)) then
+            write(iomsg,*) "TREE_THETA invalid: ", param%tree_theta
+            iostat = -1
+            return
+         end if
+
+         if (param%lcoarray .and. (param%coarray_imbalance < 0.0_DP)) then
+            write(iomsg,*) "COARRAY_IMBALANCE invalid: ", param%coarray_imbalance
+            iostat = -1
+            return
+         end if
+
          if ((param%collision_model /= "MERGE")       .and. &
              (param%collision_model /= "BOUNCE")    .and. &
              (param%collision_model /= "FRAGGLE")) then
@@ -2707,40 +2929,70 @@ contains
          select case(trim(adjustl(param%interaction_loops)))
          case("TRIANGULAR")
             param%lflatten_interactions = .false.
+            param%lblock_interactions = .false.
          case("FLAT")
             param%lflatten_interactions = .true.
+            param%lblock_interactions = .false.
+         case("BLOCKED")
+            param%lflatten_interactions = .false.
+            param%lblock_interactions = .true.
+         case("AUTO")
+            param%lautotune_interactions = .true.
+            param%lflatten_interactions = .false.
+            param%lblock_interactions = .false.
          case default
             write(*,*) "Unknown value for parameter INTERACTION_LOOPS: -> ",trim(adjustl(param%interaction_loops))
-            write(*,*) "Must be one of the following: TRIANGULAR or FLAT"
+            write(*,*) "Must be one of the following: TRIANGULAR, FLAT, BLOCKED, or AUTO"
             write(*,*) "Using default value of TRIANGULAR"
             param%interaction_loops = "TRIANGULAR"
             param%lflatten_interactions = .false.
+            param%lblock_interactions = .false.
          end select
 
          select case(trim(adjustl(param%encounter_check_plpl)))
          case("TRIANGULAR")
             param%lencounter_sas_plpl = .false.
+            param%lencounter_grid_plpl = .false.
          case("SORTSWEEP")
             param%lencounter_sas_plpl = .true.
+            param%lencounter_grid_plpl = .false.
+         case("GRID")
+            param%lencounter_sas_plpl = .false.
+            param%lencounter_grid_plpl = .true.
+         case("AUTO")
+            param%lautotune_encounter_plpl = .true.
+            param%lencounter_sas_plpl = .false.
+            param%lencounter_grid_plpl = .false.
          case default
             write(*,*) "Unknown value for parameter ENCOUNTER_CHECK_PLPL: -> ",trim(adjustl(param%encounter_check_plpl))
-            write(*,*) "Must be one of the following: TRIANGULAR or SORTSWEEP"
+            write(*,*) "Must be one of the following: TRIANGULAR, SORTSWEEP, GRID, or AUTO"
             write(*,*) "Using default value of TRIANGULAR"
             param%encounter_check_plpl = "TRIANGULAR"
             param%lencounter_sas_plpl = .false.
+            param%lencounter_grid_plpl = .false.
          end select
 
          select case(trim(adjustl(param%encounter_check_pltp)))
          case("TRIANGULAR")
             param%lencounter_sas_pltp = .false.
+            param%lencounter_grid_pltp = .false.
          case("SORTSWEEP")
             param%lencounter_sas_pltp = .true.
+            param%lencounter_grid_pltp = .false.
+         case("GRID")
+            param%lencounter_sas_pltp = .false.
+            param%lencounter_grid_pltp = .true.
+         case("AUTO")
+            param%lautotune_encounter_pltp = .true.
+            param%lencounter_sas_pltp = .false.
+            param%lencounter_grid_pltp = .false.
          case default
             write(*,*) "Unknown value for parameter ENCOUNTER_CHECK_PLTP: -> ",trim(adjustl(param%encounter_check_pltp))
-            write(*,*) "Must be one of the following: TRIANGULAR or SORTSWEEP"
+            write(*,*) "Must be one of the following: TRIANGULAR, SORTSWEEP, GRID, or AUTO"
             write(*,*) "Using default value of TRIANGULAR"
             param%encounter_check_pltp = "TRIANGULAR"
             param%lencounter_sas_pltp = .false.
+            param%lencounter_grid_pltp = .false.
          end select
 
 
@@ -2764,6 +3016,16 @@ contains
 #endif
          end if
 
+         if (param%lasync_output .and. param%lcoarray) then
+            write(iomsg,*) "Asynchronous output is not compatible with Coarrays. This parameter will be ignored."
+            param%lasync_output = .false.
+         end if
+
+         if (param%lsharded_output .and. .not.param%lcoarray) then
+            write(iomsg,*) "Sharded output is only used with Coarrays. This parameter will be ignored."
+            param%lsharded_output = .false.
+         end if
+
          iostat = 0
 
       end associate
@@ -2867,6 +3129,11 @@ contains
             call io_param_writer_one("OUT_TYPE", param%out_type, unit)
             call io_param_writer_one("OUT_FORM", param%out_form, unit)
             call io_param_writer_one("OUT_STAT", "APPEND", unit) 
+            call io_param_writer_one("NC_CHUNKING", param%nc_chunking, unit)
+            if (param%nc_chunk_time > 0) call io_param_writer_one("NC_CHUNK_TIME", param%nc_chunk_time, unit)
+            if (param%nc_chunk_name > 0) call io_param_writer_one("NC_CHUNK_NAME", param%nc_chunk_name, unit)
+            call io_param_writer_one("NC_DEFLATE_LEVEL", param%nc_deflate_level, unit)
+            call io_param_writer_one("NC_SHUFFLE", param%lnc_shuffle, unit)
          end if
          call io_param_writer_one("CHK_RMIN", param%rmin, unit)
          call io_param_writer_one("CHK_RMAX", param%rmax, unit)
@@ -2891,6 +3158,11 @@ contains
          call io_param_writer_one("ENCOUNTER_CHECK_PLTP", param%encounter_check_pltp, unit)
          call io_param_writer_one("ENCOUNTER_SAVE", param%encounter_save, unit)
          call io_param_writer_one("COARRAY", param%lcoarray, unit)
+         if (param%lcoarray) call io_param_writer_one("COARRAY_IMBALANCE", param%coarray_imbalance, unit)
+         call io_param_writer_one("TREE_GRAVITY", param%ltree_gravity, unit)
+         if (param%ltree_gravity) call io_param_writer_one("TREE_THETA", param%tree_theta, unit)
+         call io_param_writer_one("ASYNC_OUTPUT", param%lasync_output, unit)
+         call io_param_writer_one("SHARDED_OUTPUT", param%lsharded_output, unit)
 
          if (param%lenergy) then
             call io_param_writer_one("FIRSTENERGY", param%lfirstenergy, unit)
@@ -3410,6 +3682,35 @@ contains
    end subroutine swiftest_io_read_in_param
 
 
+   module function swiftest_io_get_shard_name(file_name, image) result(shard_name)
+      !! author: David A. Minton
+      !!
+      !! Returns the name of the output file shard written by a Coarray image when SHARDED_OUTPUT is turned on. The image number 
+      !! is inserted before the file extension, so that image 3 writes "data.nc" to "data.img003.nc".
+      implicit none
+      ! Arguments
+      character(*), intent(in)      :: file_name  !! Name of the shared output file
+      integer(I4B), intent(in)      :: image      !! Index of the Coarray image that writes the shard
+      ! Result
+      character(len=:), allocatable :: shard_name !! Name of the output file shard of the image
+      ! Internals
+      character(len=:), allocatable :: base_name
+      character(len=STRMAX) :: image_text
+      integer(I4B) :: iext
+
+      base_name = trim(adjustl(file_name))
+      write(image_text,'(".img",I0.3)') image
+      iext = index(base_name, ".", back=.true.)
+      if (iext > index(base_name, "/", back=.true.) + 1) then
+         shard_name = base_name(1:iext-1) // trim(image_text) // base_name(iext:)
+      else
+         shard_name = base_name // trim(image_text)
+      end if
+
+      return
+   end function swiftest_io_get_shard_name
+
+
    module subroutine swiftest_io_set_display_param(self, display_style)
       !! author: David A. Minton
       !!
@@ -3503,22 +3804,30 @@ contains
 
       associate (pl => self%pl, tp => self%tp, npl => self%pl%nbody, ntp => self%tp%nbody, lfirst => self%lfirst_io)
          nc%file_name = param%outfile
+#ifdef COARRAY
+         if (param%lsharded_output) nc%file_name = swiftest_io_get_shard_name(param%outfile, this_image())
+#endif
          if (lfirst) then
-            inquire(file=param%outfile, exist=fileExists)
+            inquire(file=nc%file_name, exist=fileExists)
 #ifdef COARRAY
-            if (this_image() /= 1) param%out_stat = 'APPEND'
+            if ((this_image() /= 1) .and. .not.param%lsharded_output) param%out_stat = 'APPEND'
 #endif
             
             select case(param%out_stat)
             case('APPEND')
-               if (.not.fileExists) then
-                  errmsg = trim(adjustl(param%outfile)) // " not found! You must specify OUT_STAT = NEW, REPLACE, or UNKNOWN"
+               if (fileExists) then
+                  call nc%open(param)
+               else if (param%lsharded_output) then
+                  ! The shards may have been merged and removed before a restart, or the run may be restarted on more images, 
+                  ! so a missing shard is started over from the restart frame
+                  call nc%initialize(param)
+               else
+                  errmsg = trim(adjustl(nc%file_name)) // " not found! You must specify OUT_STAT = NEW, REPLACE, or UNKNOWN"
                   goto 667
                end if
-               call nc%open(param)
             case('NEW')
                if (fileExists) then
-                  errmsg = trim(adjustl(param%outfile))// " already exists! You must specify OUT_STAT = APPEND, REPLACE, or UNKNOWN"
+                  errmsg = trim(adjustl(nc%file_name))// " already exists! You must specify OUT_STAT = APPEND, REPLACE, or UNKNOWN"
                   goto 667
                end if
                call nc%initialize(param)
@@ -8,6 +8,25 @@
 ! If not, see: https://www.gnu.org/licenses. 
 
 submodule(swiftest) s_swiftest_kick
+   integer(I4B), parameter :: TREE_LEAF_SIZE = 8  !! Maximum number of massive bodies in a leaf node of the octree
+   integer(I4B), parameter :: TREE_MAX_DEPTH = 32 !! Maximum depth of the octree (guards against bodies at identical positions)
+   integer(I4B), parameter :: INTERACTION_BLOCK_SIZE = 128 !! Number of bodies in each tile of the blocked pl-pl interaction loops
+
+   type :: swiftest_octree_node
+      !! A single cell of the massive body octree used by the Barnes-Hut pl-tp acceleration
+      real(DP), dimension(NDIM) :: center  = 0.0_DP !! Geometric center of the cell
+      real(DP)                  :: half    = 0.0_DP !! Half of the cell width
+      real(DP), dimension(NDIM) :: rcom    = 0.0_DP !! Position of the center of mass of the bodies in the cell
+      real(DP)                  :: GM      = 0.0_DP !! Total G*mass of the bodies in the cell
+      real(DP)                  :: rmax    = 0.0_DP !! Distance from the center of mass to the farthest body in the cell
+      real(DP)                  :: rencmax = 0.0_DP !! Largest close encounter radius of the bodies in the cell
+      integer(I4B)              :: ibeg    = 0      !! Index of the first body of the cell in the sorted index array
+      integer(I4B)              :: iend    = -1     !! Index of the last body of the cell in the sorted index array
+      integer(I4B)              :: ichild  = 0      !! Index of the first child node (the children are stored contiguously)
+      integer(I4B)              :: nchild  = 0      !! Number of child nodes (0 for a leaf)
+      integer(I4B)              :: depth   = 0      !! Depth of the node in the tree (0 for the root)
+   end type swiftest_octree_node
+
 contains
    module subroutine swiftest_kick_getacch_int_pl(self, param)
       !! author: David A. Minton
@@ -27,9 +46,15 @@ contains
 
       if (param%lflatten_interactions) then
          if (param%lclose) then
-            call swiftest_kick_getacch_int_all(self%nbody, self%nplpl, self%k_plpl, self%rh, self%Gmass, self%radius, self%ah)
+            call swiftest_kick_getacch_int_all(self%nbody, self%nplpl, self%rh, self%Gmass, self%radius, self%ah)
+         else
+            call swiftest_kick_getacch_int_all(self%nbody, self%nplpl, self%rh, self%Gmass, self%ah)
+         end if
+      else if (param%lblock_interactions) then
+         if (param%lclose) then
+            call swiftest_kick_getacch_int_all_block(self%nbody, self%nbody, self%rh, self%Gmass, self%radius, self%ah)
          else
-            call swiftest_kick_getacch_int_all(self%nbody, self%nplpl, self%k_plpl, self%rh, self%Gmass, self%ah)
+            call swiftest_kick_getacch_int_all_block(self%nbody, self%nbody, self%rh, self%Gmass, self%ah)
          end if
       else
          if (param%lclose) then
@@ -43,29 +68,309 @@ contains
    end subroutine swiftest_kick_getacch_int_pl
 
 
-   module subroutine swiftest_kick_getacch_int_tp(self, param, GMpl, rhp, npl)
+   module subroutine swiftest_kick_getacch_int_tp(self, param, GMpl, rhp, npl, rencpl)
       !! author: David A. Minton
       !!
-      !! Compute direct cross (third) term heliocentric accelerations of test particles by massive bodies
+      !! Compute direct cross (third) term heliocentric accelerations of test particles by massive bodies. If the tree gravity 
+      !! option is turned on, the accelerations are approximated with a Barnes-Hut octree, with massive bodies within their close 
+      !! encounter radius (if passed) of a test particle always computed directly. Test particles that are in an encounter with 
+      !! a massive body this step are computed by direct summation, so that the exact pair accelerations removed by SyMBA 
+      !! leave no residual from the tree approximation.
       !!
       !! Adapted from Hal Levison's Swift routine getacch_ah3_tp.f
       !! Adapted from David E. Kaufmann's Swifter routine whm_kick_getacch_ah3.f90 and helio_kick_getacch_int_tp.f90
       implicit none
       ! Arguments
-      class(swiftest_tp),         intent(inout) :: self  !! Swiftest test particle object
-      class(swiftest_parameters), intent(inout) :: param !! Current swiftest run configuration parameters
-      real(DP), dimension(:),     intent(in)    :: GMpl  !! Massive body masses
-      real(DP), dimension(:,:),   intent(in)    :: rhp   !! Massive body position vectors
-      integer(I4B),               intent(in)    :: npl   !! Number of active massive bodies
+      class(swiftest_tp),         intent(inout)        :: self   !! Swiftest test particle object
+      class(swiftest_parameters), intent(inout)        :: param  !! Current swiftest run configuration parameters
+      real(DP), dimension(:),     intent(in)           :: GMpl   !! Massive body masses
+      real(DP), dimension(:,:),   intent(in)           :: rhp    !! Massive body position vectors
+      integer(I4B),               intent(in)           :: npl    !! Number of active massive bodies
+      real(DP), dimension(:),     intent(in), optional :: rencpl !! Massive body critical radii for close encounters
+      ! Internals
+      real(DP), dimension(:), allocatable :: renc
 
       if ((self%nbody == 0) .or. (npl == 0)) return
 
-      call swiftest_kick_getacch_int_all_tp(self%nbody, npl, self%rh, rhp, GMpl, self%lmask, self%ah)
+      if (param%ltree_gravity .and. (npl > TREE_LEAF_SIZE)) then
+         if (present(rencpl)) then
+            allocate(renc, source=rencpl(1:npl))
+         else
+            allocate(renc(npl), source=0.0_DP)
+         end if
+         associate(ntp => self%nbody)
+            call swiftest_kick_getacch_int_tree_tp(ntp, npl, self%rh, rhp, GMpl, renc, param%tree_theta, &
+                                                   self%lmask(1:ntp) .and. (self%nplenc(1:ntp) == 0), self%ah)
+            if (any(self%lmask(1:ntp) .and. (self%nplenc(1:ntp) > 0))) then
+               call swiftest_kick_getacch_int_all_tp(ntp, npl, self%rh, rhp, GMpl, &
+                                                     self%lmask(1:ntp) .and. (self%nplenc(1:ntp) > 0), self%ah)
+            end if
+         end associate
+      else
+         call swiftest_kick_getacch_int_all_tp(self%nbody, npl, self%rh, rhp, GMpl, self%lmask, self%ah)
+      end if
       
       return
    end subroutine swiftest_kick_getacch_int_tp
 
 
+   module subroutine swiftest_kick_getacch_int_all_block_rad_pl(npl, nplm, r, Gmass, radius, acc)
+      !! author: David A. Minton
+      !!
+      !! Compute direct cross (third) term heliocentric accelerations for massive bodies, with parallelization.
+      !! This is the cache-blocked version, which skips pairs of bodies that overlap
+      implicit none
+      integer(I4B),                 intent(in)             :: npl    !! Total number of massive bodies
+      integer(I4B),                 intent(in)             :: nplm   !! Number of fully interacting massive bodies
+      real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+      real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+      real(DP),     dimension(:),   intent(in)             :: radius !! Array of massive body radii
+      real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+
+      call swiftest_kick_getacch_int_block_pl(npl, nplm, r, Gmass, radius(1:npl), acc)
+
+      return
+   end subroutine swiftest_kick_getacch_int_all_block_rad_pl
+
+
+   module subroutine swiftest_kick_getacch_int_all_block_norad_pl(npl, nplm, r, Gmass, acc)
+      !! author: David A. Minton
+      !!
+      !! Compute direct cross (third) term heliocentric accelerations for massive bodies, with parallelization.
+      !! This is the cache-blocked version 
+      implicit none
+      integer(I4B),                 intent(in)             :: npl    !! Total number of massive bodies
+      integer(I4B),                 intent(in)             :: nplm   !! Number of fully interacting massive bodies
+      real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+      real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+      real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+      ! Internals
+      real(DP), dimension(npl) :: radius
+
+      radius(:) = 0.0_DP
+      call swiftest_kick_getacch_int_block_pl(npl, nplm, r, Gmass, radius, acc)
+
+      return
+   end subroutine swiftest_kick_getacch_int_all_block_norad_pl
+
+
+   subroutine swiftest_kick_getacch_int_block_pl(npl, nplm, r, Gmass, radius, acc)
+      !! author: David A. Minton
+      !!
+      !! Computes the pl-pl accelerations in tiles of INTERACTION_BLOCK_SIZE x INTERACTION_BLOCK_SIZE bodies. The positions, masses, 
+      !! and radii are copied into separate contiguous arrays (structure of arrays), so that the inner loop over the bodies of a 
+      !! tile has unit stride and can be vectorized, and the data of a pair of tiles stays in cache while it is used. Only the 
+      !! tiles on or above the diagonal are computed, and each thread accumulates into its own copy of the accelerations, which 
+      !! are summed at the end. The tiles are handed out dynamically so that the work is balanced between threads. As with the
+      !! triangular version, bodies with index > nplm do not interact with each other.
+      implicit none
+      ! Arguments
+      integer(I4B),                 intent(in)    :: npl    !! Total number of massive bodies
+      integer(I4B),                 intent(in)    :: nplm   !! Number of fully interacting massive bodies
+      real(DP),     dimension(:,:), intent(in)    :: r      !! Position vector array
+      real(DP),     dimension(:),   intent(in)    :: Gmass  !! Array of massive body G*mass
+      real(DP),     dimension(:),   intent(in)    :: radius !! Array of massive body radii (pairs closer than the sum are skipped)
+      real(DP),     dimension(:,:), intent(inout) :: acc    !! Acceleration vector array 
+      ! Internals
+      integer(I4B) :: i, j, k, ib, jb, ntile, ntilem, npair, ibeg, iend, jbeg, jend
+      integer(I4B), dimension(:), allocatable :: itile, jtile
+      real(DP) :: rx, ry, rz, rji2, rlim2, irij3, faci, facj, axi, ayi, azi
+      real(DP), dimension(npl) :: x, y, z, GM, rad, ax, ay, az
+
+      if (npl == 0) return
+
+      do concurrent(i = 1:npl)
+         x(i) = r(1,i)
+         y(i) = r(2,i)
+         z(i) = r(3,i)
+         GM(i) = Gmass(i)
+         rad(i) = radius(i)
+         ax(i) = 0.0_DP
+         ay(i) = 0.0_DP
+         az(i) = 0.0_DP
+      end do
+
+      ! Build the list of tile pairs on or above the diagonal that contain at least one fully interacting body
+      ntile = (npl + INTERACTION_BLOCK_SIZE - 1) / INTERACTION_BLOCK_SIZE
+      ntilem = (min(nplm, npl) + INTERACTION_BLOCK_SIZE - 1) / INTERACTION_BLOCK_SIZE
+      npair = 0
+      do ib = 1, ntilem
+         npair = npair + ntile - ib + 1
+      end do
+      allocate(itile(npair), jtile(npair))
+      k = 0
+      do ib = 1, ntilem
+         do jb = ib, ntile
+            k = k + 1
+            itile(k) = ib
+            jtile(k) = jb
+         end do
+      end do
+
+      !$omp parallel do default(private) schedule(dynamic)&
+      !$omp shared(npl, nplm, npair, itile, jtile, x, y, z, GM, rad) &
+      !$omp reduction(+:ax,ay,az)
+      do k = 1, npair
+         ibeg = (itile(k) - 1) * INTERACTION_BLOCK_SIZE + 1
+         iend = min(itile(k) * INTERACTION_BLOCK_SIZE, nplm, npl)
+         jbeg = (jtile(k) - 1) * INTERACTION_BLOCK_SIZE + 1
+         jend = min(jtile(k) * INTERACTION_BLOCK_SIZE, npl)
+         do i = ibeg, iend
+            axi = 0.0_DP
+            ayi = 0.0_DP
+            azi = 0.0_DP
+            !$omp simd reduction(+:axi,ayi,azi) private(rx,ry,rz,rji2,rlim2,irij3,faci,facj)
+            do j = max(jbeg, i + 1), jend
+               rx = x(j) - x(i)
+               ry = y(j) - y(i)
+               rz = z(j) - z(i)
+               rji2 = rx**2 + ry**2 + rz**2
+               rlim2 = (rad(i) + rad(j))**2
+               if (rji2 > rlim2) then
+                  irij3 = 1.0_DP / (rji2 * sqrt(rji2))
+                  faci = GM(i) * irij3
+                  facj = GM(j) * irij3
+                  axi = axi + facj * rx
+                  ayi = ayi + facj * ry
+                  azi = azi + facj * rz
+                  ax(j) = ax(j) - faci * rx
+                  ay(j) = ay(j) - faci * ry
+                  az(j) = az(j) - faci * rz
+               end if
+            end do
+            ax(i) = ax(i) + axi
+            ay(i) = ay(i) + ayi
+            az(i) = az(i) + azi
+         end do
+      end do
+      !$omp end parallel do
+
+#ifdef DOCONLOC
+      do concurrent(i = 1:npl) shared(acc,ax,ay,az)
+#else
+      do concurrent(i = 1:npl)
+#endif
+         acc(1,i) = acc(1,i) + ax(i)
+         acc(2,i) = acc(2,i) + ay(i)
+         acc(3,i) = acc(3,i) + az(i)
+      end do
+
+      return
+   end subroutine swiftest_kick_getacch_int_block_pl
+
+
+   module subroutine swiftest_kick_getacch_int_all_chunk_rad_pl(npl, nplpl, r, Gmass, radius, acc)
+      !! author: David A. Minton
+      !!
+      !! Compute direct cross (third) term heliocentric accelerations for massive bodies, with parallelization.
+      !! This is the flattened (single loop) version. The loop over the flattened index k is split into chunks of FLAT_CHUNK_SIZE 
+      !! consecutive pairs. The (i, j) indices of the first pair of a chunk are computed from k, and the rest are found by stepping 
+      !! through the upper triangular matrix row by row, so no pair index array is needed.
+      !!
+      !! Adapted from Hal Levison's Swift routine getacch_ah3.f
+      !! Adapted from David E. Kaufmann's Swifter routine whm_kick_getacch_ah3.f90 and helio_kick_getacch_int.f9
+      implicit none
+      integer(I4B),                 intent(in)             :: npl    !! Number of massive bodies
+      integer(I8B),                 intent(in)             :: nplpl  !! Number of massive body interactions to compute
+      real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+      real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+      real(DP),     dimension(:),   intent(in)             :: radius !! Array of massive body radii
+      real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+      ! Internals
+      integer(I8B)                  :: k, ichunk, nchunk
+      real(DP), dimension(NDIM,npl) :: ahi, ahj
+      integer(I4B) :: i, j
+      real(DP)     :: rji2, rlim2
+      real(DP)     :: rx, ry, rz
+
+      ahi(:,:) = 0.0_DP
+      ahj(:,:) = 0.0_DP
+      nchunk = (nplpl + FLAT_CHUNK_SIZE - 1_I8B) / FLAT_CHUNK_SIZE
+
+      !$omp parallel do default(private) schedule(static)&
+      !$omp shared(r, Gmass, radius) &
+      !$omp firstprivate(npl, nplpl, nchunk) &
+      !$omp reduction(+:ahi,ahj) 
+      do ichunk = 1_I8B, nchunk
+         call swiftest_util_flatten_eucl_k_to_ij(npl, (ichunk - 1_I8B) * FLAT_CHUNK_SIZE + 1_I8B, i, j)
+         do k = (ichunk - 1_I8B) * FLAT_CHUNK_SIZE + 1_I8B, min(ichunk * FLAT_CHUNK_SIZE, nplpl)
+            rx = r(1, j) - r(1, i) 
+            ry = r(2, j) - r(2, i) 
+            rz = r(3, j) - r(3, i) 
+            rji2 = rx**2 + ry**2 + rz**2
+            rlim2 = (radius(i) + radius(j))**2
+            if (rji2 > rlim2) call swiftest_kick_getacch_int_one_pl(rji2, rx, ry, rz, Gmass(i), Gmass(j), &
+                                    ahi(1,i), ahi(2,i), ahi(3,i), ahj(1,j), ahj(2,j), ahj(3,j))
+            j = j + 1
+            if (j > npl) then
+               i = i + 1
+               j = i + 1
+            end if
+         end do
+      end do
+      !$omp end parallel do 
+
+      acc(:,1:npl) = acc(:,1:npl) + ahi(:,:) + ahj(:,:)
+
+      return
+   end subroutine swiftest_kick_getacch_int_all_chunk_rad_pl
+
+
+   module subroutine swiftest_kick_getacch_int_all_chunk_norad_pl(npl, nplpl, r, Gmass, acc)
+      !! author: David A. Minton
+      !!
+      !! Compute direct cross (third) term heliocentric accelerations for massive bodies, with parallelization.
+      !! This is the flattened (single loop) version. The loop over the flattened index k is split into chunks of FLAT_CHUNK_SIZE 
+      !! consecutive pairs. The (i, j) indices of the first pair of a chunk are computed from k, and the rest are found by stepping 
+      !! through the upper triangular matrix row by row, so no pair index array is needed.
+      !!
+      !! Adapted from Hal Levison's Swift routine getacch_ah3.f
+      !! Adapted from David E. Kaufmann's Swifter routine whm_kick_getacch_ah3.f90 and helio_kick_getacch_int.f9
+      implicit none
+      integer(I4B),                 intent(in)             :: npl    !! Number of massive bodies
+      integer(I8B),                 intent(in)             :: nplpl  !! Number of massive body interactions to compute
+      real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+      real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+      real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+      ! Internals
+      integer(I8B)                  :: k, ichunk, nchunk
+      real(DP), dimension(NDIM,npl) :: ahi, ahj
+      integer(I4B) :: i, j
+      real(DP)     :: rji2
+      real(DP)     :: rx, ry, rz
+
+      ahi(:,:) = 0.0_DP
+      ahj(:,:) = 0.0_DP
+      nchunk = (nplpl + FLAT_CHUNK_SIZE - 1_I8B) / FLAT_CHUNK_SIZE
+
+      !$omp parallel do default(private) schedule(static)&
+      !$omp shared(r, Gmass) &
+      !$omp firstprivate(npl, nplpl, nchunk) &
+      !$omp reduction(+:ahi,ahj) 
+      do ichunk = 1_I8B, nchunk
+         call swiftest_util_flatten_eucl_k_to_ij(npl, (ichunk - 1_I8B) * FLAT_CHUNK_SIZE + 1_I8B, i, j)
+         do k = (ichunk - 1_I8B) * FLAT_CHUNK_SIZE + 1_I8B, min(ichunk * FLAT_CHUNK_SIZE, nplpl)
+            rx = r(1, j) - r(1, i) 
+            ry = r(2, j) - r(2, i) 
+            rz = r(3, j) - r(3, i) 
+            rji2 = rx**2 + ry**2 + rz**2
+            call swiftest_kick_getacch_int_one_pl(rji2, rx, ry, rz, Gmass(i), Gmass(j), &
+                                          ahi(1,i), ahi(2,i), ahi(3,i), ahj(1,j), ahj(2,j), ahj(3,j))
+            j = j + 1
+            if (j > npl) then
+               i = i + 1
+               j = i + 1
+            end if
+         end do
+      end do
+      !$omp end parallel do
+
+      acc(:,1:npl) = acc(:,1:npl) + ahi(:,:) + ahj(:,:)
+
+      return
+   end subroutine swiftest_kick_getacch_int_all_chunk_norad_pl
+
+
    module subroutine swiftest_kick_getacch_int_all_flat_rad_pl(npl, nplpl, k_plpl, r, Gmass, radius, acc)
       !! author: David A. Minton
       !!
@@ -415,6 +720,169 @@ contains
    end subroutine swiftest_kick_getacch_int_all_tp
 
 
+   module subroutine swiftest_kick_getacch_int_tree_tp(ntp, npl, rtp, rpl, GMpl, rencpl, theta, lmask, acc)
+      !! author: David A. Minton
+      !!
+      !! Compute cross (third) term heliocentric accelerations of test particles by massive bodies using a Barnes-Hut octree. 
+      !! The tree is built from the massive bodies, and each test particle walks the tree. A cell is replaced by a point mass at its 
+      !! center of mass when its width is smaller than theta times its distance from the test particle. A cell is always opened 
+      !! if any of its bodies could be within its close encounter radius of the test particle, so that these bodies are computed 
+      !! by direct summation and the close encounter handling of the integrators is unchanged.
+      !!
+      !! Reference: Barnes, J. & Hut, P. (1986) A hierarchical O(N log N) force-calculation algorithm. Nature 324, 446–449.
+      implicit none
+      integer(I4B),                 intent(in)    :: ntp    !! Number of test particles
+      integer(I4B),                 intent(in)    :: npl    !! Number of massive bodies
+      real(DP),     dimension(:,:), intent(in)    :: rtp    !! Test particle position vector array
+      real(DP),     dimension(:,:), intent(in)    :: rpl    !! Massive body particle position vector array
+      real(DP),     dimension(:),   intent(in)    :: GMpl   !! Array of massive body G*mass
+      real(DP),     dimension(:),   intent(in)    :: rencpl !! Array of massive body critical radii for close encounters
+      real(DP),                     intent(in)    :: theta  !! Opening angle of the tree
+      logical,      dimension(:),   intent(in)    :: lmask  !! Logical mask indicating which test particles should be computed
+      real(DP),     dimension(:,:), intent(inout) :: acc    !! Acceleration vector array 
+      ! Internals
+      type(swiftest_octree_node), dimension(:), allocatable :: node
+      integer(I4B), dimension(:), allocatable :: ind
+      integer(I4B), dimension(8*(TREE_MAX_DEPTH+1)) :: stack
+      integer(I4B) :: i, j, k, m, nstack
+      real(DP) :: rji2, rx, ry, rz
+      real(DP), dimension(NDIM) :: dx
+
+      call swiftest_kick_build_octree(npl, rpl, GMpl, rencpl, node, ind)
+
+      !$omp parallel do default(private) schedule(static)&
+      !$omp shared(ntp, lmask, rtp, rpl, GMpl, node, ind, theta, acc)
+      do i = 1, ntp
+         if (.not.lmask(i)) cycle
+         nstack = 1
+         stack(1) = 1
+         do while (nstack > 0)
+            k = stack(nstack)
+            nstack = nstack - 1
+            dx(:) = rtp(:, i) - node(k)%rcom(:)
+            rji2 = dot_product(dx(:), dx(:))
+            if ((2 * node(k)%half < theta * sqrt(rji2)) .and. (sqrt(rji2) - node(k)%rmax > node(k)%rencmax)) then
+               call swiftest_kick_getacch_int_one_tp(rji2, dx(1), dx(2), dx(3), node(k)%GM, acc(1,i), acc(2,i), acc(3,i))
+            else if (node(k)%nchild == 0) then
+               do m = node(k)%ibeg, node(k)%iend
+                  j = ind(m)
+                  rx = rtp(1, i) - rpl(1, j)
+                  ry = rtp(2, i) - rpl(2, j)
+                  rz = rtp(3, i) - rpl(3, j)
+                  rji2 = rx**2 + ry**2 + rz**2
+                  call swiftest_kick_getacch_int_one_tp(rji2, rx, ry, rz, GMpl(j), acc(1,i), acc(2,i), acc(3,i))
+               end do
+            else
+               do m = node(k)%ichild, node(k)%ichild + node(k)%nchild - 1
+                  nstack = nstack + 1
+                  stack(nstack) = m
+               end do
+            end if
+         end do
+      end do
+      !$omp end parallel do
+
+      return
+   end subroutine swiftest_kick_getacch_int_tree_tp
+
+
+   subroutine swiftest_kick_build_octree(npl, rpl, GMpl, rencpl, node, ind)
+      !! author: David A. Minton
+      !!
+      !! Builds the massive body octree used by the Barnes-Hut pl-tp acceleration. Nodes are built breadth first, so that the 
+      !! children of each node are stored contiguously in the node array. The bodies of each node are stored contiguously in the 
+      !! index array, and are partitioned among its children with a counting sort on their octant.
+      implicit none
+      ! Arguments
+      integer(I4B),                                          intent(in)  :: npl    !! Number of massive bodies
+      real(DP),                   dimension(:,:),            intent(in)  :: rpl    !! Massive body particle position vector array
+      real(DP),                   dimension(:),              intent(in)  :: GMpl   !! Array of massive body G*mass
+      real(DP),                   dimension(:),              intent(in)  :: rencpl !! Array of massive body critical radii
+      type(swiftest_octree_node), dimension(:), allocatable, intent(out) :: node   !! Nodes of the tree (the root is node 1)
+      integer(I4B),               dimension(:), allocatable, intent(out) :: ind    !! Index array of bodies sorted by node
+      ! Internals
+      type(swiftest_octree_node), dimension(:), allocatable :: tmp
+      integer(I4B), dimension(npl) :: oct, ibuf
+      integer(I4B), dimension(8) :: noct, ifill
+      integer(I4B) :: i, j, k, m, nnode
+      real(DP), dimension(NDIM) :: rlo, rhi, dx
+
+      allocate(node(max(16, npl / TREE_LEAF_SIZE * 2)))
+      ind = [(i, i = 1, npl)]
+      rlo(:) = minval(rpl(:,1:npl), dim=2)
+      rhi(:) = maxval(rpl(:,1:npl), dim=2)
+      nnode = 1
+      node(1)%center(:) = 0.5_DP * (rlo(:) + rhi(:))
+      node(1)%half = 0.5_DP * maxval(rhi(:) - rlo(:))
+      node(1)%ibeg = 1
+      node(1)%iend = npl
+
+      k = 0
+      do while (k < nnode)
+         k = k + 1
+         associate(nd => node(k))
+            nd%GM = sum(GMpl(ind(nd%ibeg:nd%iend)))
+            if (nd%GM > 0.0_DP) then
+               do i = 1, NDIM
+                  nd%rcom(i) = sum(GMpl(ind(nd%ibeg:nd%iend)) * rpl(i, ind(nd%ibeg:nd%iend))) / nd%GM
+               end do
+            else
+               nd%rcom(:) = nd%center(:)
+            end if
+            do m = nd%ibeg, nd%iend
+               j = ind(m)
+               dx(:) = rpl(:, j) - nd%rcom(:)
+               nd%rmax = max(nd%rmax, norm2(dx(:)))
+               nd%rencmax = max(nd%rencmax, rencpl(j))
+            end do
+            if ((nd%iend - nd%ibeg + 1 <= TREE_LEAF_SIZE) .or. (nd%depth >= TREE_MAX_DEPTH)) cycle
+
+            ! Partition the bodies of this node among its octants
+            noct(:) = 0
+            do m = nd%ibeg, nd%iend
+               j = ind(m)
+               oct(m) = 1 + merge(1, 0, rpl(1, j) > nd%center(1)) + merge(2, 0, rpl(2, j) > nd%center(2)) &
+                          + merge(4, 0, rpl(3, j) > nd%center(3))
+               noct(oct(m)) = noct(oct(m)) + 1
+            end do
+            ifill(1) = nd%ibeg
+            do i = 2, 8
+               ifill(i) = ifill(i - 1) + noct(i - 1)
+            end do
+            do m = nd%ibeg, nd%iend
+               ibuf(ifill(oct(m))) = ind(m)
+               ifill(oct(m)) = ifill(oct(m)) + 1
+            end do
+            ind(nd%ibeg:nd%iend) = ibuf(nd%ibeg:nd%iend)
+         end associate
+
+         ! Add the non-empty octants as the children of this node
+         if (nnode + 8 > size(node)) then
+            allocate(tmp(2 * size(node)))
+            tmp(1:nnode) = node(1:nnode)
+            call move_alloc(tmp, node)
+         end if
+         node(k)%ichild = nnode + 1
+         m = node(k)%ibeg
+         do i = 1, 8
+            if (noct(i) == 0) cycle
+            nnode = nnode + 1
+            node(nnode)%half = 0.5_DP * node(k)%half
+            node(nnode)%center(1) = node(k)%center(1) + merge(1, -1, btest(i - 1, 0)) * node(nnode)%half
+            node(nnode)%center(2) = node(k)%center(2) + merge(1, -1, btest(i - 1, 1)) * node(nnode)%half
+            node(nnode)%center(3) = node(k)%center(3) + merge(1, -1, btest(i - 1, 2)) * node(nnode)%half
+            node(nnode)%ibeg = m
+            node(nnode)%iend = m + noct(i) - 1
+            node(nnode)%depth = node(k)%depth + 1
+            m = m + noct(i)
+         end do
+         node(k)%nchild = nnode - node(k)%ichild + 1
+      end do
+
+      return
+   end subroutine swiftest_kick_build_octree
+
+
    pure module subroutine swiftest_kick_getacch_int_one_pl(rji2, xr, yr, zr, Gmi, Gmj, axi, ayi, azi, axj, ayj, azj)
       !! author: David A. Minton
       !!
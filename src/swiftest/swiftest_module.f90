@@ -51,6 +51,13 @@ module swiftest
    implicit none
    public
 
+   integer(I8B), parameter :: FLAT_CHUNK_SIZE = 4096_I8B !! Number of consecutive pairs of the flattened upper triangular matrix that 
+                                                         !!    are computed together when INTERACTION_LOOPS = "FLAT"
+   integer(I4B), parameter :: AUTOTUNE_NTRIAL = 3          !! Number of trial evaluations of each method when a method is set to "AUTO". 
+                                                         !!    The fastest of the trials is used.
+   real(DP),     parameter :: AUTOTUNE_REEVAL_FACTOR = 2.0_DP !! Factor by which the number of bodies must change before the "AUTO" 
+                                                              !!    methods are selected again
+
    type, extends(netcdf_parameters) :: swiftest_netcdf_parameters
    contains
       procedure :: initialize      => swiftest_io_netcdf_initialize_output !! Initialize a set of parameters used to identify a NetCDF output object
@@ -63,10 +70,24 @@ module swiftest
    end type swiftest_netcdf_parameters
 
 
+   type :: swiftest_output_buffer
+      !! Frames of the system history that have been handed over to the output writer thread when ASYNC_OUTPUT is turned on
+      type(base_storage_frame), dimension(:), allocatable :: frame         !! Stored frames to write
+      integer(I4B)                                        :: iframe = 0    !! Number of frames to write
+      class(swiftest_netcdf_parameters),      allocatable :: nc            !! NetCDF object used to write the frames
+      class(swiftest_parameters),             allocatable :: param         !! Copy of the run configuration parameters used to write 
+                                                                           !!    the frames
+      class(swiftest_parameters),             allocatable :: param_restart !! Restart parameters that are dumped once the frames 
+                                                                           !!    have been written
+   end type swiftest_output_buffer
+
+
    type, extends(base_storage) :: swiftest_storage
       class(swiftest_netcdf_parameters), allocatable :: nc             !! NetCDF object attached to this storage object
+      type(swiftest_output_buffer),      pointer     :: writer => null() !! Buffer being written by the output writer thread 
    contains
       procedure :: dump             => swiftest_io_dump_storage        !! Dumps storage object contents to file
+      procedure :: flush            => swiftest_io_flush_storage       !! Waits for the output writer thread to finish writing
       procedure :: dealloc          => swiftest_util_dealloc_storage   !! Resets a storage object by deallocating all items and resetting the frame counter to 0
       procedure :: get_index_values => swiftest_util_get_vals_storage  !! Gets the unique values of the indices of a storage object (i.e. body id or time value)
       procedure :: make_index_map   => swiftest_util_index_map_storage !! Maps body id values to storage index values so we don't have to use unlimited dimensions for id
@@ -173,6 +194,7 @@ module swiftest
       procedure :: setup           => swiftest_util_setup_body              !! A constructor that sets the number of bodies and allocates all allocatable arrays
       procedure :: accel_user      => swiftest_user_kick_getacch_body       !! Add user-supplied heliocentric accelerations to planets
       procedure :: append          => swiftest_util_append_body             !! Appends elements from one structure to another
+      procedure :: copy_output     => swiftest_util_copy_output_body        !! Copies only the components that are written to the output file into an empty body object
       procedure :: dealloc         => swiftest_util_dealloc_body            !! Deallocates all allocatable arrays
       procedure :: fill            => swiftest_util_fill_body               !! "Fills" bodies from one object into another depending on the results of a mask (uses the UNPACK intrinsic)
       procedure :: get_peri        => swiftest_util_peri_body               !! Determine nbody_system pericenter passages for test particles 
@@ -247,7 +269,6 @@ module swiftest
       real(DP),                dimension(:),   allocatable :: k2      !! Tidal Love number
       real(DP),                dimension(:),   allocatable :: Q       !! Tidal quality factor
       real(DP),                dimension(:),   allocatable :: tlag    !! Tidal phase lag
-      integer(I4B),            dimension(:,:), allocatable :: k_plpl  !! Index array used to convert flattened the body-body comparison upper triangular matrix
       integer(I8B)                                         :: nplpl   !! Number of body-body comparisons in the flattened upper triangular matrix
       type(swiftest_kinship),  dimension(:),   allocatable :: kin        !! Array of merger relationship structures that can account for multiple pairwise mergers in a single step
       logical,                 dimension(:),   allocatable :: lmtiny     !! flag indicating whether this body is below the GMTINY cutoff value
@@ -274,7 +295,7 @@ module swiftest
       procedure :: rh2rb          => swiftest_util_coord_rh2rb_pl    !! Convert massive bodies from heliocentric to barycentric coordinates (position only)
       procedure :: dealloc        => swiftest_util_dealloc_pl        !! Deallocates all allocatable arrays
       procedure :: fill           => swiftest_util_fill_pl           !! "Fills" bodies from one object into another depending on the results of a mask (uses the UNPACK intrinsic)
-      procedure :: flatten        => swiftest_util_flatten_eucl_plpl !! Sets up the (i, j) -> k indexing used for the single-loop blocking Euclidean distance matrix
+      procedure :: flatten        => swiftest_util_flatten_eucl_plpl !! Sets the number of pairs in the single-loop blocking Euclidean distance matrix
       procedure :: rearray        => swiftest_util_rearray_pl        !! Clean up the massive body structures to remove discarded bodies and add new bodies
       procedure :: resize         => swiftest_util_resize_pl         !! Checks the current size of a Swiftest body against the requested size and resizes it if it is too small.
       procedure :: reset_kinship  => swiftest_util_reset_kinship_pl  !! Resets the kinship status of bodies
@@ -402,6 +423,7 @@ module swiftest
       procedure(abstract_step_system), deferred :: step
 
       ! Concrete classes that are common to the basic integrator (only test particles considered for discard)
+      procedure :: autotune                => swiftest_util_autotune_system                        !! Times the interaction loop and encounter check methods set to "AUTO" and selects the fastest ones
       procedure :: discard                 => swiftest_discard_system                              !! Perform a discard step on the nbody_system
       procedure :: compact_output          => swiftest_io_compact_output                           !! Prints out out terminal output when display_style is set to COMPACT
       procedure :: conservation_report     => swiftest_io_conservation_report                      !! Compute energy and momentum and print out the change with time
@@ -635,12 +657,19 @@ module swiftest
          class(swiftest_storage),      intent(inout) :: system_history    !! Stores the system history between output dumps
       end subroutine swiftest_io_dump_system
 
-      module subroutine swiftest_io_dump_storage(self, param)
+      module subroutine swiftest_io_dump_storage(self, param, param_restart)
          implicit none
-         class(swiftest_storage), intent(inout) :: self   !! Swiftest simulation history storage object
-         class(swiftest_parameters), intent(inout) :: param  !! Current run configuration parameters 
+         class(swiftest_storage),    intent(inout)        :: self          !! Swiftest simulation history storage object
+         class(swiftest_parameters), intent(inout)        :: param         !! Current run configuration parameters 
+         class(swiftest_parameters), intent(in), optional :: param_restart !! Restart parameters to dump once the frames are written
       end subroutine swiftest_io_dump_storage
 
+      module subroutine swiftest_io_flush_storage(self, param)
+         implicit none
+         class(swiftest_storage),    intent(inout) :: self  !! Swiftest simulation history storage object
+         class(swiftest_parameters), intent(inout) :: param !! Current run configuration parameters 
+      end subroutine swiftest_io_flush_storage
+
       module subroutine swiftest_io_get_args(integrator, param_file_name, display_style, from_cli) 
          implicit none
          character(len=:), allocatable, intent(inout) :: integrator      !! Symbolic code of the requested integrator  
@@ -903,6 +932,13 @@ module swiftest
          integer(I4B)                               :: ierr  !! Error code: returns 0 if the read is successful
       end function swiftest_io_read_frame_system
 
+      module function swiftest_io_get_shard_name(file_name, image) result(shard_name)
+         implicit none
+         character(*), intent(in)      :: file_name  !! Name of the shared output file
+         integer(I4B), intent(in)      :: image      !! Index of the Coarray image that writes the shard
+         character(len=:), allocatable :: shard_name !! Name of the output file shard of the image
+      end function swiftest_io_get_shard_name
+
       module subroutine swiftest_io_set_display_param(self, display_style)
          implicit none
          class(swiftest_parameters), intent(inout) :: self            !! Current run configuration parameters
@@ -927,14 +963,28 @@ module swiftest
          class(swiftest_parameters), intent(inout) :: param !! Current swiftest run configuration parameters
       end subroutine swiftest_kick_getacch_int_pl
 
-      module subroutine swiftest_kick_getacch_int_tp(self, param, GMpl, rhp, npl)
+      module subroutine swiftest_kick_getacch_int_tp(self, param, GMpl, rhp, npl, rencpl)
          implicit none
-         class(swiftest_tp),         intent(inout) :: self  !! Swiftest test particle object
-         class(swiftest_parameters), intent(inout) :: param !! Current swiftest run configuration parameters
-         real(DP), dimension(:),     intent(in)    :: GMpl  !! Massive body masses
-         real(DP), dimension(:,:),   intent(in)    :: rhp   !! Massive body position vectors
-         integer(I4B),               intent(in)    :: npl   !! Number of active massive bodies
+         class(swiftest_tp),         intent(inout)        :: self   !! Swiftest test particle object
+         class(swiftest_parameters), intent(inout)        :: param  !! Current swiftest run configuration parameters
+         real(DP), dimension(:),     intent(in)           :: GMpl   !! Massive body masses
+         real(DP), dimension(:,:),   intent(in)           :: rhp    !! Massive body position vectors
+         integer(I4B),               intent(in)           :: npl    !! Number of active massive bodies
+         real(DP), dimension(:),     intent(in), optional :: rencpl !! Massive body critical radii for close encounters
       end subroutine swiftest_kick_getacch_int_tp
+
+      module subroutine swiftest_kick_getacch_int_tree_tp(ntp, npl, rtp, rpl, GMpl, rencpl, theta, lmask, acc)
+         implicit none
+         integer(I4B),                 intent(in)    :: ntp    !! Number of test particles
+         integer(I4B),                 intent(in)    :: npl    !! Number of massive bodies
+         real(DP),     dimension(:,:), intent(in)    :: rtp    !! Test particle position vector array
+         real(DP),     dimension(:,:), intent(in)    :: rpl    !! Massive body particle position vector array
+         real(DP),     dimension(:),   intent(in)    :: GMpl   !! Array of massive body G*mass
+         real(DP),     dimension(:),   intent(in)    :: rencpl !! Array of massive body critical radii for close encounters
+         real(DP),                     intent(in)    :: theta  !! Opening angle of the tree
+         logical,      dimension(:),   intent(in)    :: lmask  !! Logical mask indicating which test particles should be computed
+         real(DP),     dimension(:,:), intent(inout) :: acc    !! Acceleration vector array 
+      end subroutine swiftest_kick_getacch_int_tree_tp
    end interface
 
    interface swiftest_kick_getacch_int_all
@@ -959,6 +1009,25 @@ module swiftest
          real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
       end subroutine swiftest_kick_getacch_int_all_flat_norad_pl
 
+      module subroutine swiftest_kick_getacch_int_all_chunk_rad_pl(npl, nplpl, r, Gmass, radius, acc)
+         implicit none
+         integer(I4B),                 intent(in)             :: npl    !! Number of massive bodies
+         integer(I8B),                 intent(in)             :: nplpl  !! Number of massive body interactions to compute
+         real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+         real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+         real(DP),     dimension(:),   intent(in)             :: radius !! Array of massive body radii
+         real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+      end subroutine swiftest_kick_getacch_int_all_chunk_rad_pl
+
+      module subroutine swiftest_kick_getacch_int_all_chunk_norad_pl(npl, nplpl, r, Gmass, acc)
+         implicit none
+         integer(I4B),                 intent(in)             :: npl    !! Number of massive bodies
+         integer(I8B),                 intent(in)             :: nplpl  !! Number of massive body interactions to compute
+         real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+         real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+         real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+      end subroutine swiftest_kick_getacch_int_all_chunk_norad_pl
+
       module subroutine swiftest_kick_getacch_int_all_tri_rad_pl(npl, nplm, r, Gmass, radius, acc)
          implicit none
          integer(I4B),                 intent(in)             :: npl    !! Total number of massive bodies
@@ -990,6 +1059,27 @@ module swiftest
       end subroutine swiftest_kick_getacch_int_all_tp
    end interface
 
+   interface swiftest_kick_getacch_int_all_block
+      module subroutine swiftest_kick_getacch_int_all_block_rad_pl(npl, nplm, r, Gmass, radius, acc)
+         implicit none
+         integer(I4B),                 intent(in)             :: npl    !! Total number of massive bodies
+         integer(I4B),                 intent(in)             :: nplm   !! Number of fully interacting massive bodies
+         real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+         real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+         real(DP),     dimension(:),   intent(in)             :: radius !! Array of massive body radii
+         real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+      end subroutine swiftest_kick_getacch_int_all_block_rad_pl
+
+      module subroutine swiftest_kick_getacch_int_all_block_norad_pl(npl, nplm, r, Gmass, acc)
+         implicit none
+         integer(I4B),                 intent(in)             :: npl    !! Total number of massive bodies
+         integer(I4B),                 intent(in)             :: nplm   !! Number of fully interacting massive bodies
+         real(DP),     dimension(:,:), intent(in)             :: r      !! Position vector array
+         real(DP),     dimension(:),   intent(in)             :: Gmass  !! Array of massive body G*mass
+         real(DP),     dimension(:,:), intent(inout)          :: acc    !! Acceleration vector array 
+      end subroutine swiftest_kick_getacch_int_all_block_norad_pl
+   end interface
+
    interface
       pure module subroutine swiftest_kick_getacch_int_one_pl(rji2, xr, yr, zr, Gmi, Gmj, axi, ayi, azi, axj, ayj, azj)
          !$omp declare simd(swiftest_kick_getacch_int_one_pl)
@@ -1191,6 +1281,12 @@ module swiftest
          logical, dimension(:), intent(in)    :: lsource_mask !! Logical mask indicating which elements to append to
       end subroutine swiftest_util_append_tp
 
+      module subroutine swiftest_util_autotune_system(self, param)
+         implicit none
+         class(swiftest_nbody_system), intent(inout) :: self  !! Swiftest nbody system object
+         class(swiftest_parameters),   intent(inout) :: param !! Current run configuration parameters
+      end subroutine swiftest_util_autotune_system
+
       module subroutine swiftest_util_coord_b2h_pl(self, cb)
          implicit none
          class(swiftest_pl), intent(inout) :: self !! Swiftest massive body object
@@ -1251,6 +1347,14 @@ module swiftest
          class(swiftest_cb), intent(in) :: cb      !! Swiftest central body object
       end subroutine swiftest_util_coord_rh2rb_tp
 
+      module subroutine swiftest_util_copy_output_body(self, source, param, linfo)
+         implicit none
+         class(swiftest_body),       intent(inout) :: self   !! Swiftest body object to store the output components in
+         class(swiftest_body),       intent(in)    :: source !! Swiftest body object to copy from
+         class(swiftest_parameters), intent(in)    :: param  !! Current run configuration parameters
+         logical,                    intent(in)    :: linfo  !! Copy the particle information metadata
+      end subroutine swiftest_util_copy_output_body
+
       module subroutine swiftest_util_copy_particle_info(self, source)
          implicit none
          class(swiftest_particle_info),  intent(inout) :: self
@@ -1382,11 +1486,10 @@ module swiftest
    end interface
 
    interface swiftest_util_get_potential_energy
-      module subroutine swiftest_util_get_potential_energy_flat(npl, nplpl, k_plpl, lmask, GMcb, Gmass, mass, rb, pe)
+      module subroutine swiftest_util_get_potential_energy_flat(npl, nplpl, lmask, GMcb, Gmass, mass, rb, pe)
          implicit none
          integer(I4B),                 intent(in)  :: npl
          integer(I8B),                 intent(in)  :: nplpl
-         integer(I4B), dimension(:,:), intent(in)  :: k_plpl
          logical,      dimension(:),   intent(in)  :: lmask
          real(DP),                     intent(in)  :: GMcb
          real(DP),     dimension(:),   intent(in)  :: Gmass
@@ -1728,15 +1831,16 @@ module swiftest
 
 #ifdef COARRAY
    interface
-      module subroutine swiftest_coarray_balance_system(nbody_system, param)
+      module subroutine swiftest_coarray_balance_system(nbody_system, param, timer)
          !! author: David A. Minton
          !!
-         !! Checks whether or not the system needs to be rebalance. Rebalancing occurs when the image with the smallest number of test particles 
-         !! has <90% of that of the image with the largest number of test particles.
+         !! Checks whether or not the system needs to be rebalanced. Rebalancing occurs when the step time of the slowest image, 
+         !! measured by timer, exceeds the mean step time of all images by more than the fraction COARRAY_IMBALANCE.
          implicit none
          ! Arguments
          class(swiftest_nbody_system), intent(inout) :: nbody_system !! Swiftest nbody system 
          class(swiftest_parameters),   intent(inout) :: param        !! Current run configuration parameters 
+         type(walltimer),              intent(inout) :: timer        !! Timer of the integration steps of this image since the last check
       end subroutine swiftest_coarray_balance_system
 
       module subroutine swiftest_coarray_collect_system(nbody_system, param)
@@ -1745,10 +1849,11 @@ module swiftest
          class(swiftest_parameters),   intent(inout) :: param        !! Current run configuration parameters 
       end subroutine swiftest_coarray_collect_system
 
-      module subroutine swiftest_coarray_distribute_system(nbody_system, param)
+      module subroutine swiftest_coarray_distribute_system(nbody_system, param, tpcost)
          implicit none
-         class(swiftest_nbody_system), intent(inout) :: nbody_system !! Swiftest nbody system 
-         class(swiftest_parameters),   intent(inout) :: param        !! Current run configuration parameters 
+         class(swiftest_nbody_system),     intent(inout) :: nbody_system !! Swiftest nbody system 
+         class(swiftest_parameters),       intent(inout) :: param        !! Current run configuration parameters 
+         real(DP), dimension(:), optional, intent(in)    :: tpcost       !! Estimated cost of each test particle on image 1
       end subroutine swiftest_coarray_distribute_system
    end interface
 
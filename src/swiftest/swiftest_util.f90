@@ -199,8 +199,6 @@ contains
          call util_append(self%nplenc, source%nplenc, lsource_mask=lsource_mask)
          call util_append(self%ntpenc, source%ntpenc, lsource_mask=lsource_mask)
 
-         if (allocated(self%k_plpl)) deallocate(self%k_plpl)
-
          call swiftest_util_append_body(self, source, lsource_mask)
       class default
          write(*,*) "Invalid object passed to the append method. Source must be of class swiftest_pl or its descendents"
@@ -236,6 +234,215 @@ contains
    end subroutine swiftest_util_append_tp
 
 
+   module subroutine swiftest_util_autotune_system(self, param)
+      !! author: David A. Minton
+      !!
+      !! Selects the fastest interaction loop and encounter check methods for any that are set to "AUTO". Each available method 
+      !! is timed over a few trial evaluations on the current nbody system, the fastest one is turned on, and the timings are 
+      !! recorded in the timer log files. The selection is only repeated when the number of massive bodies or test particles has
+      !! changed by more than a factor of AUTOTUNE_REEVAL_FACTOR since it was last made. In Coarray runs, the decision is based on 
+      !! the total number of test particles of all images, and the methods selected by image 1 are used by all images.
+      implicit none
+      ! Arguments
+      class(swiftest_nbody_system), intent(inout) :: self  !! Swiftest nbody system object
+      class(swiftest_parameters),   intent(inout) :: param !! Current run configuration parameters
+      ! Internals
+      character(len=*), dimension(3), parameter :: LOOP_METHODS = [character(len=10) :: "TRIANGULAR", "FLAT", "BLOCKED"]
+      character(len=*), dimension(3), parameter :: ENCOUNTER_METHODS = [character(len=10) :: "TRIANGULAR", "SORTSWEEP", "GRID"]
+      logical :: linteractions, lplpl, lpltp, lfirst, llog
+      integer(I4B) :: i, itrial, ibest, npl, ntp, ntp_tot, nplm, nplt
+      integer(I8B) :: count_start, count_stop, count_rate, npairs, nenc
+      real(DP), dimension(size(LOOP_METHODS)) :: wall_loop
+      real(DP), dimension(size(ENCOUNTER_METHODS)) :: wall_enc
+      real(DP), dimension(:), allocatable :: renc
+      real(DP), dimension(:,:), allocatable :: ah
+      integer(I4B), dimension(:), allocatable :: index1, index2
+      logical, dimension(:), allocatable :: lvdotr
+
+      associate(pl => self%pl, tp => self%tp)
+         npl = pl%nbody
+         ntp = tp%nbody
+         ntp_tot = ntp
+         llog = .true.
+#ifdef COARRAY
+         ! Each image only holds its share of the test particles, so all images must make the same decision from the total
+         if (param%lcoarray) then
+            call cocollect(ntp_tot)
+            call coclone(ntp_tot)
+            llog = (this_image() == 1)
+         end if
+#endif
+         linteractions = param%lautotune_interactions .and. (npl > 1)
+         lplpl = param%lautotune_encounter_plpl .and. param%lclose .and. (param%integrator == INT_SYMBA) .and. (npl > 1)
+         lpltp = param%lautotune_encounter_pltp .and. param%lclose .and. (npl > 0) .and. (ntp_tot > 0) .and. &
+                 ((param%integrator == INT_SYMBA) .or. (param%integrator == INT_RMVS))
+         if (.not.(linteractions .or. lplpl .or. lpltp)) return
+
+         lfirst = (param%autotune_npl == 0)
+         if (.not.lfirst .and. .not.(lchanged(npl, param%autotune_npl) .or. lchanged(ntp_tot, param%autotune_ntp))) return
+         param%autotune_npl = npl
+         param%autotune_ntp = ntp_tot
+
+         if (linteractions) then
+            if (lfirst .and. llog) call swiftest_io_log_start(param, INTERACTION_TIMER_LOG_OUT, "Interaction loop timer logfile. " &
+                                             // "Diagnostic values: loop style, time (s), number of pairs, time per pair (s)")
+            if (param%integrator == INT_SYMBA) then
+               npairs = pl%nplplm
+            else
+               npairs = pl%nplpl
+            end if
+
+            ! The trial evaluations accumulate into the acceleration array, so save it and put it back when we are done
+            allocate(ah, source=pl%ah)
+            do i = 1, size(LOOP_METHODS)
+               param%lflatten_interactions = (LOOP_METHODS(i) == "FLAT")
+               param%lblock_interactions = (LOOP_METHODS(i) == "BLOCKED")
+               wall_loop(i) = huge(1.0_DP)
+               do itrial = 1, AUTOTUNE_NTRIAL
+                  call system_clock(count_start, count_rate)
+                  call pl%accel_int(param)
+                  call system_clock(count_stop)
+                  wall_loop(i) = min(wall_loop(i), (count_stop - count_start) / real(count_rate, kind=DP))
+               end do
+            end do
+            call move_alloc(ah, pl%ah)
+
+            ibest = minloc(wall_loop, dim=1)
+            param%lflatten_interactions = (LOOP_METHODS(ibest) == "FLAT")
+            param%lblock_interactions = (LOOP_METHODS(ibest) == "BLOCKED")
+            call autotune_log(INTERACTION_TIMER_LOG_OUT, "interaction loop", LOOP_METHODS, wall_loop, ibest)
+         end if
+
+         if (lplpl .or. lpltp) then
+            ! The encounter radii are not set until the first step, so fall back on the Hill radii when timing the checks
+            if (any(pl%renc(1:npl) > 0.0_DP)) then
+               allocate(renc, source=pl%renc(1:npl))
+            else
+               allocate(renc, source=pl%rhill(1:npl))
+            end if
+         end if
+
+         if (lplpl) then
+            if (lfirst .and. llog) call swiftest_io_log_start(param, ENCOUNTER_PLPL_TIMER_LOG_OUT, "Encounter check loop timer logfile. " &
+                                             // "Diagnostic values: loop style, time (s), number of pairs, time per pair (s)")
+            nplm = pl%nplm
+            nplt = npl - nplm
+            npairs = pl%nplplm
+
+            do i = 1, size(ENCOUNTER_METHODS)
+               param%lencounter_sas_plpl = (ENCOUNTER_METHODS(i) == "SORTSWEEP")
+               param%lencounter_grid_plpl = (ENCOUNTER_METHODS(i) == "GRID")
+               wall_enc(i) = huge(1.0_DP)
+               do itrial = 1, AUTOTUNE_NTRIAL
+                  call system_clock(count_start, count_rate)
+                  if (nplt == 0) then
+                     call encounter_check_all_plpl(param, npl, pl%rh, pl%vh, renc, param%dt, nenc, index1, index2, lvdotr)
+                  else
+                     call encounter_check_all_plplm(param, nplm, nplt, pl%rh(:,1:nplm), pl%vh(:,1:nplm), pl%rh(:,nplm+1:npl), &
+                           pl%vh(:,nplm+1:npl), renc(1:nplm), renc(nplm+1:npl), param%dt, nenc, index1, index2, lvdotr)
+                  end if
+                  call system_clock(count_stop)
+                  wall_enc(i) = min(wall_enc(i), (count_stop - count_start) / real(count_rate, kind=DP))
+               end do
+            end do
+
+            ibest = minloc(wall_enc, dim=1)
+            param%lencounter_sas_plpl = (ENCOUNTER_METHODS(ibest) == "SORTSWEEP")
+            param%lencounter_grid_plpl = (ENCOUNTER_METHODS(ibest) == "GRID")
+            call autotune_log(ENCOUNTER_PLPL_TIMER_LOG_OUT, "pl-pl encounter check", ENCOUNTER_METHODS, wall_enc, ibest)
+         end if
+
+         if (lpltp) then
+            if (lfirst .and. llog) call swiftest_io_log_start(param, ENCOUNTER_PLTP_TIMER_LOG_OUT, "Encounter check loop timer logfile. " &
+                                             // "Diagnostic values: loop style, time (s), number of pairs, time per pair (s)")
+            npairs = int(npl, kind=I8B) * ntp
+
+            do i = 1, size(ENCOUNTER_METHODS)
+               param%lencounter_sas_pltp = (ENCOUNTER_METHODS(i) == "SORTSWEEP")
+               param%lencounter_grid_pltp = (ENCOUNTER_METHODS(i) == "GRID")
+               wall_enc(i) = huge(1.0_DP)
+               do itrial = 1, AUTOTUNE_NTRIAL
+                  call system_clock(count_start, count_rate)
+                  call encounter_check_all_pltp(param, npl, ntp, pl%rh, pl%vh, tp%rh, tp%vh, renc, param%dt, &
+                                                nenc, index1, index2, lvdotr)
+                  call system_clock(count_stop)
+                  wall_enc(i) = min(wall_enc(i), (count_stop - count_start) / real(count_rate, kind=DP))
+               end do
+            end do
+
+            ibest = minloc(wall_enc, dim=1)
+            param%lencounter_sas_pltp = (ENCOUNTER_METHODS(ibest) == "SORTSWEEP")
+            param%lencounter_grid_pltp = (ENCOUNTER_METHODS(ibest) == "GRID")
+            call autotune_log(ENCOUNTER_PLTP_TIMER_LOG_OUT, "pl-tp encounter check", ENCOUNTER_METHODS, wall_enc, ibest, &
+                              ntp_timed=ntp)
+         end if
+
+#ifdef COARRAY
+         if (param%lcoarray) then
+            call coclone(param%lflatten_interactions)
+            call coclone(param%lblock_interactions)
+            call coclone(param%lencounter_sas_plpl)
+            call coclone(param%lencounter_grid_plpl)
+            call coclone(param%lencounter_sas_pltp)
+            call coclone(param%lencounter_grid_pltp)
+         end if
+#endif
+      end associate
+
+      return
+
+      contains
+
+         pure function lchanged(nnew, nold)
+            !! Checks whether a body count has changed by more than the re-evaluation factor
+            implicit none
+            integer(I4B), intent(in) :: nnew, nold
+            logical                  :: lchanged
+
+            lchanged = (max(nnew, 1) > AUTOTUNE_REEVAL_FACTOR * max(nold, 1)) .or. &
+                       (max(nold, 1) > AUTOTUNE_REEVAL_FACTOR * max(nnew, 1))
+
+            return
+         end function lchanged
+
+         subroutine autotune_log(file, label, methods, wall, ibest, ntp_timed)
+            !! Records the timing of each method and the one that was selected
+            implicit none
+            character(len=*),               intent(in)           :: file      !! Name of the timer log file
+            character(len=*),               intent(in)           :: label     !! Name of the type of method that was timed
+            character(len=*), dimension(:), intent(in)           :: methods   !! Names of the methods that were timed
+            real(DP),         dimension(:), intent(in)           :: wall      !! Wall time of the fastest trial of each method
+            integer(I4B),                   intent(in)           :: ibest     !! Index of the selected method
+            integer(I4B),                   intent(in), optional :: ntp_timed !! Number of test particles the methods were timed 
+                                                                               !! with, if the number of pairs depends on it
+            integer(I4B)      :: i
+            character(STRMAX) :: message
+
+            if (.not.llog) return
+            write(message, '(A,ES24.16,2(A,I0))') "swiftest_util_autotune_system: " // label // " timer turned on at t = ", &
+                                                  self%t, " with npl = ", npl, " and ntp = ", ntp_tot
+            call swiftest_io_log_one_message(file, message)
+            if (present(ntp_timed)) then
+               if (ntp_timed /= ntp_tot) then
+                  write(message, '(A,I0,A)') "swiftest_util_autotune_system: the number of pairs and time per pair are per image, " &
+                                             // "for the ", ntp_timed, " test particles on this image"
+                  call swiftest_io_log_one_message(file, message)
+               end if
+            end if
+            do i = 1, size(methods)
+               write(message, '(A10,1X,ES12.5,1X,I0,1X,ES12.5)') methods(i), wall(i), npairs, wall(i) / max(npairs, 1_I8B)
+               call swiftest_io_log_one_message(file, message)
+            end do
+            write(message, '(A)') "swiftest_util_autotune_system: the fastest " // label // " method tested is " &
+                                  // trim(methods(ibest))
+            call swiftest_io_log_one_message(file, message)
+
+            return
+         end subroutine autotune_log
+
+   end subroutine swiftest_util_autotune_system
+
+
    module subroutine swiftest_util_coord_h2b_pl(self, cb)
       !! author: David A. Minton
       !!
@@ -562,6 +769,51 @@ contains
    end subroutine swiftest_util_coord_rh2rb_tp
 
 
+   module subroutine swiftest_util_copy_output_body(self, source, param, linfo)
+      !! author: David A. Minton
+      !!
+      !! Copies only the components of a body object that are written to the output file into an empty body object of the same
+      !! type. This keeps the snapshots stored between output dumps compact. The particle information metadata is only copied if
+      !! linfo is true.
+      implicit none
+      ! Arguments
+      class(swiftest_body),       intent(inout) :: self   !! Swiftest body object to store the output components in
+      class(swiftest_body),       intent(in)    :: source !! Swiftest body object to copy from
+      class(swiftest_parameters), intent(in)    :: param  !! Current run configuration parameters
+      logical,                    intent(in)    :: linfo  !! Copy the particle information metadata
+
+      associate(n => source%nbody)
+         self%nbody = n
+         if (n == 0) return
+
+         allocate(self%id, source=source%id(1:n))
+         allocate(self%status, source=source%status(1:n))
+         allocate(self%mu, source=source%mu(1:n))
+         allocate(self%rh, source=source%rh(:,1:n))
+         allocate(self%vh, source=source%vh(:,1:n))
+         if (linfo) allocate(self%info, source=source%info(1:n))
+
+         select type(self)
+         class is (swiftest_pl)
+            select type(source)
+            class is (swiftest_pl)
+               self%nplm = source%nplm
+               allocate(self%Gmass, source=source%Gmass(1:n))
+               allocate(self%mass, source=source%mass(1:n))
+               if (param%lrhill_present) allocate(self%rhill, source=source%rhill(1:n))
+               if (param%lclose) allocate(self%radius, source=source%radius(1:n))
+               if (param%lrotation) then
+                  allocate(self%Ip, source=source%Ip(:,1:n))
+                  allocate(self%rot, source=source%rot(:,1:n))
+               end if
+            end select
+         end select
+      end associate
+
+      return
+   end subroutine swiftest_util_copy_output_body
+
+
    module subroutine swiftest_util_copy_particle_info(self, source)
       !! author: David A. Minton
       !!
@@ -752,7 +1004,6 @@ contains
       if (allocated(self%k2)) deallocate(self%k2)
       if (allocated(self%Q)) deallocate(self%Q)
       if (allocated(self%tlag)) deallocate(self%tlag)
-      if (allocated(self%k_plpl)) deallocate(self%k_plpl)
       if (allocated(self%lmtiny)) deallocate(self%lmtiny)
       if (allocated(self%nplenc)) deallocate(self%nplenc)
       if (allocated(self%ntpenc)) deallocate(self%ntpenc)
@@ -781,6 +1032,7 @@ contains
       class(swiftest_storage), intent(inout) :: self !! Swiftest storage object
 
       if (allocated(self%nc)) deallocate(self%nc)
+      if (associated(self%writer)) deallocate(self%writer)
       call base_util_dealloc_storage(self)
 
       return
@@ -1002,8 +1254,6 @@ contains
             call util_fill(keeps%kin,     inserts%kin,     lfill_list)
             call util_fill(keeps%nplenc,  inserts%nplenc,  lfill_list)
             call util_fill(keeps%ntpenc,  inserts%ntpenc,  lfill_list)
-
-            if (allocated(keeps%k_plpl)) deallocate(keeps%k_plpl)
             
             call swiftest_util_fill_body(keeps, inserts, lfill_list)
          class default
@@ -1104,8 +1354,10 @@ contains
    module subroutine swiftest_util_flatten_eucl_plpl(self, param)
       !! author: Jacob R. Elliott and David A. Minton
       !!
-      !! Turns i,j indices into k index for use in the Euclidean distance matrix for pl-pl interactions for a Swiftest massive body 
-      !! object
+      !! Sets the number of pairs in the flattened upper triangular Euclidean distance matrix for pl-pl interactions for a Swiftest 
+      !! massive body object. The (i, j) indices of each pair are computed from the flattened index k as they are needed (see 
+      !! swiftest_util_flatten_eucl_k_to_ij), so no index array is stored and only this count needs to be updated when bodies are 
+      !! added or removed.
       !!
       !! Reference:
       !!
@@ -1116,32 +1368,10 @@ contains
       class(swiftest_pl),         intent(inout) :: self  !! Swiftest massive body object
       class(swiftest_parameters), intent(inout) :: param !! Current run configuration parameters
       ! Internals
-      integer(I4B) :: err, i, j, npl
-      integer(I8B) :: k, npl8
+      integer(I8B) :: npl8
 
-      associate(nplpl => self%nplpl)
-         npl = self%nbody
-         npl8 = int(npl, kind=I8B)
-         nplpl = npl8 * (npl8 - 1_I8B) / 2_I8B ! number of entries in a strict lower triangle, npl x npl
-         if (param%lflatten_interactions) then
-            if (allocated(self%k_plpl)) deallocate(self%k_plpl) ! Reset the index array if it's been set previously
-            allocate(self%k_plpl(2, nplpl), stat=err)
-            if (err /=0) then ! An error occurred trying to allocate this big array. This probably means it's too big to fit in 
-                              ! memory, and so we will force the run back into triangular mode
-               param%lflatten_interactions = .false.
-            else
-#ifdef DOCONLOC
-               do concurrent (i=1:npl, j=1:npl, j>i) shared(self) local(k)
-#else
-               do concurrent (i=1:npl, j=1:npl, j>i)
-#endif
-                  call swiftest_util_flatten_eucl_ij_to_k(npl, i, j, k)
-                  self%k_plpl(1, k) = i
-                  self%k_plpl(2, k) = j
-               end do
-            end if
-         end if
-      end associate
+      npl8 = int(self%nbody, kind=I8B)
+      self%nplpl = npl8 * (npl8 - 1_I8B) / 2_I8B ! number of entries in a strict lower triangle, npl x npl
 
       return
    end subroutine swiftest_util_flatten_eucl_plpl
@@ -1274,8 +1504,7 @@ contains
          end if
   
          if (param%lflatten_interactions) then
-            call swiftest_util_get_potential_energy(npl, pl%nplpl, pl%k_plpl, pl%lmask, cb%Gmass, pl%Gmass, pl%mass, pl%rb, &
-                                                    nbody_system%pe)
+            call swiftest_util_get_potential_energy(npl, pl%nplpl, pl%lmask, cb%Gmass, pl%Gmass, pl%mass, pl%rb, nbody_system%pe)
          else
             call swiftest_util_get_potential_energy(npl, pl%lmask, cb%Gmass, pl%Gmass, pl%mass, pl%rb, nbody_system%pe)
          end if
@@ -1308,7 +1537,7 @@ contains
    end subroutine swiftest_util_get_energy_and_momentum_system
 
 
-   module subroutine swiftest_util_get_potential_energy_flat(npl, nplpl, k_plpl, lmask, GMcb, Gmass, mass, rb, pe)
+   module subroutine swiftest_util_get_potential_energy_flat(npl, nplpl, lmask, GMcb, Gmass, mass, rb, pe)
       !! author: David A. Minton
       !!
       !! Compute total nbody_system potential energy
@@ -1316,7 +1545,6 @@ contains
       ! Arguments
       integer(I4B),                 intent(in)  :: npl
       integer(I8B),                 intent(in)  :: nplpl
-      integer(I4B), dimension(:,:), intent(in)  :: k_plpl
       logical,      dimension(:),   intent(in)  :: lmask
       real(DP),                     intent(in)  :: GMcb
       real(DP),     dimension(:),   intent(in)  :: Gmass
@@ -1325,10 +1553,9 @@ contains
       real(DP),                     intent(out) :: pe
       ! Internals
       integer(I4B) :: i, j
-      integer(I8B) :: k
+      integer(I8B) :: k, ichunk, nchunk
+      real(DP) :: pepl
       real(DP), dimension(npl) :: pecb
-      real(DP), dimension(nplpl) :: pepl 
-      logical, dimension(nplpl) :: lstatpl
 
       ! Do the central body potential energy component first
       where(.not. lmask(1:npl))
@@ -1343,22 +1570,27 @@ contains
          pecb(i) = -GMcb * mass(i) / norm2(rb(:,i)) 
       end do
 
+      ! Each chunk of consecutive pairs finds the indices of its first pair and steps through the rest in order
+      pepl = 0.0_DP
+      nchunk = (nplpl + FLAT_CHUNK_SIZE - 1_I8B) / FLAT_CHUNK_SIZE
       !$omp parallel do default(private) schedule(static)&
-      !$omp shared(k_plpl, rb, mass, Gmass, pepl, lstatpl, lmask) &
-      !$omp firstprivate(nplpl)
-      do k = 1, nplpl
-         i = k_plpl(1,k)
-         j = k_plpl(2,k)
-         lstatpl(k) = (lmask(i) .and. lmask(j))
-         if (lstatpl(k)) then
-            pepl(k) = -(Gmass(i) * mass(j)) / norm2(rb(:, i) - rb(:, j))
-         else
-            pepl(k) = 0.0_DP
-         end if
+      !$omp shared(rb, mass, Gmass, lmask) &
+      !$omp firstprivate(npl, nplpl, nchunk) &
+      !$omp reduction(+:pepl)
+      do ichunk = 1_I8B, nchunk
+         call swiftest_util_flatten_eucl_k_to_ij(npl, (ichunk - 1_I8B) * FLAT_CHUNK_SIZE + 1_I8B, i, j)
+         do k = (ichunk - 1_I8B) * FLAT_CHUNK_SIZE + 1_I8B, min(ichunk * FLAT_CHUNK_SIZE, nplpl)
+            if (lmask(i) .and. lmask(j)) pepl = pepl - (Gmass(i) * mass(j)) / norm2(rb(:, i) - rb(:, j))
+            j = j + 1
+            if (j > npl) then
+               i = i + 1
+               j = i + 1
+            end if
+         end do
       end do
       !$omp end parallel do 
 
-      pe = sum(pepl(:), lstatpl(:)) + sum(pecb(1:npl), lmask(1:npl))
+      pe = pepl + sum(pecb(1:npl), lmask(1:npl))
 
       return
    end subroutine swiftest_util_get_potential_energy_flat
@@ -2068,7 +2300,6 @@ contains
 
 
 
-      if (allocated(self%k_plpl)) deallocate(self%k_plpl)
 
       return
    end subroutine swiftest_util_resize_pl
@@ -2714,6 +2945,7 @@ contains
                                                                          !!  in collision snapshots)
       ! Internals
       class(swiftest_nbody_system), allocatable :: snapshot
+      logical                                   :: linfo_pl, linfo_tp
 
       ! To allow for runs to be restarted in a bit-identical way, we'll need to run the same coordinate conversion routines we would
       !  run upon restarting
@@ -2734,11 +2966,27 @@ contains
 
       if (.not.param%lrhill_present) call nbody_system%pl%set_rhill(nbody_system%cb)
 
-      ! Take a minimal snapshot wihout all of the extra storage objects
+      ! The particle information metadata only changes when bodies are added or removed, so it only needs to be stored when the
+      ! list of ids differs from the previous stored frame
+      linfo_pl = .true.
+      linfo_tp = .true.
+      if (self%iframe > 0) then
+         if (allocated(self%frame(self%iframe)%item)) then
+            select type(last => self%frame(self%iframe)%item)
+            class is (swiftest_nbody_system)
+               linfo_pl = .not. same_ids(last%pl, nbody_system%pl)
+               linfo_tp = .not. same_ids(last%tp, nbody_system%tp)
+            end select
+         end if
+      end if
+
+      ! Take a minimal snapshot that only contains the components that are written to the output file
       allocate(snapshot, mold=nbody_system)
       allocate(snapshot%cb, source=nbody_system%cb )
-      allocate(snapshot%pl, source=nbody_system%pl )
-      allocate(snapshot%tp, source=nbody_system%tp )
+      allocate(snapshot%pl, mold=nbody_system%pl )
+      allocate(snapshot%tp, mold=nbody_system%tp )
+      call snapshot%pl%copy_output(nbody_system%pl, param, linfo_pl)
+      call snapshot%tp%copy_output(nbody_system%tp, param, linfo_tp)
 
       snapshot%t                 = nbody_system%t
       snapshot%GMtot             = nbody_system%GMtot
@@ -2789,6 +3037,23 @@ contains
       if (allocated(nbody_system%tp)) self%nid = self%nid + nbody_system%tp%nbody
        
       return
+
+   contains
+
+      pure function same_ids(last, body) result(lsame)
+         !! Checks whether a body object in the previous snapshot contains the same bodies as the current one
+         implicit none
+         class(swiftest_body), intent(in) :: last  !! Body object in the previous snapshot
+         class(swiftest_body), intent(in) :: body  !! Current body object
+         logical                          :: lsame !! True if both objects contain the same list of ids
+
+         lsame = (last%nbody == body%nbody)
+         if (.not.lsame .or. (body%nbody == 0)) return
+         lsame = all(last%id(1:last%nbody) == body%id(1:body%nbody))
+
+         return
+      end function same_ids
+
    end subroutine swiftest_util_snapshot_system
 
 
@@ -2897,7 +3162,7 @@ contains
             call util_sort(direction * pl%nplenc(1:npl), ind)
          case("ntpenc")
             call util_sort(direction * pl%ntpenc(1:npl), ind)
-         case("lmtiny", "nplm", "nplplm", "kin", "rbeg", "rend", "vbeg", "Ip", "rot", "k_plpl", "nplpl")
+         case("lmtiny", "nplm", "nplplm", "kin", "rbeg", "rend", "vbeg", "Ip", "rot", "nplpl")
             write(*,*) 'Cannot sort by ' // trim(adjustl(sortby)) // '. Component not sortable!'
          case default ! Look for components in the parent class
             call swiftest_util_sort_body(pl, sortby, ascending)
@@ -3075,8 +3340,6 @@ contains
          call util_sort_rearrange(pl%nplenc,     ind, npl)
          call util_sort_rearrange(pl%ntpenc,     ind, npl)
 
-         if (allocated(pl%k_plpl)) deallocate(pl%k_plpl)
-
          call swiftest_util_sort_rearrange_body(pl, ind)
       end associate
 
@@ -3299,8 +3562,6 @@ contains
             call util_spill(keeps%nplenc,  discards%nplenc,  lspill_list, ldestructive)
             call util_spill(keeps%ntpenc,  discards%ntpenc,  lspill_list, ldestructive)
 
-            if (ldestructive .and. allocated(keeps%k_plpl)) deallocate(keeps%k_plpl)
-
             call swiftest_util_spill_body(keeps, discards, lspill_list, ldestructive)
          class default
             write(*,*) 'Error! spill method called for incompatible return type on swiftest_pl'
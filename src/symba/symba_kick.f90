@@ -24,7 +24,9 @@ contains
       class(swiftest_parameters), intent(inout) :: param !! Current Swiftest run configuration parameter
 
       if (param%lflatten_interactions) then
-         call swiftest_kick_getacch_int_all(self%nbody, self%nplplm, self%k_plpl, self%rh, self%Gmass, self%radius, self%ah)
+         call swiftest_kick_getacch_int_all(self%nbody, self%nplplm, self%rh, self%Gmass, self%radius, self%ah)
+      else if (param%lblock_interactions) then
+         call swiftest_kick_getacch_int_all_block(self%nbody, self%nplm, self%rh, self%Gmass, self%radius, self%ah)
       else
          call swiftest_kick_getacch_int_all(self%nbody, self%nplm, self%rh, self%Gmass, self%radius, self%ah)
       end if
@@ -20,6 +20,7 @@ module walltime
    character(len=*), parameter :: INTERACTION_TIMER_LOG_OUT  = "interaction_timer.log" !! Name of log file for recording results of interaction loop timing
    character(len=*), parameter :: ENCOUNTER_PLPL_TIMER_LOG_OUT  = "encounter_check_plpl_timer.log" !! Name of log file for recording results of encounter check method timing
    character(len=*), parameter :: ENCOUNTER_PLTP_TIMER_LOG_OUT  = "encounter_check_pltp_timer.log" !! Name of log file for recording results of encounter check method timing
+   character(len=*), parameter :: COARRAY_BALANCE_LOG_OUT  = "coarray_balance.log" !! Name of log file for recording the decisions of the Coarray test particle load balancer
 
    type :: walltimer
       integer(I8B) :: count_rate                 !! Rate at wich the clock ticks
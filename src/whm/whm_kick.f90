@@ -100,7 +100,7 @@ contains
 #endif
                tp%ah(:, i) = tp%ah(:, i) + ah0(:)
             end do
-            call tp%accel_int(param, pl%Gmass(1:npl), pl%rbeg(:, 1:npl), npl)
+            call tp%accel_int(param, pl%Gmass(1:npl), pl%rbeg(:, 1:npl), npl, pl%renc(1:npl))
          else
             ah0(:) = whm_kick_getacch_ah0(pl%Gmass(1:npl), pl%rend(:, 1:npl), npl)
 #ifdef DOCONLOC
@@ -110,7 +110,7 @@ contains
 #endif
                tp%ah(:, i) = tp%ah(:, i) + ah0(:)
             end do
-            call tp%accel_int(param, pl%Gmass(1:npl), pl%rend(:, 1:npl), npl)
+            call tp%accel_int(param, pl%Gmass(1:npl), pl%rend(:, 1:npl), npl, pl%renc(1:npl))
          end if
 
          if (param%loblatecb) call tp%accel_obl(nbody_system)
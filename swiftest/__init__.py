@@ -10,4 +10,5 @@ If not, see: https://www.gnu.org/licenses.
 """
 
 from .constants import *
-from .simulation_class import Simulation
\ No newline at end of file
+from .simulation_class import Simulation, SimulationRun
+from .ensemble import Ensemble
\ No newline at end of file
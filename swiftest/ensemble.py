@@ -0,0 +1,216 @@
+"""
+Copyright 2022 - David Minton, Carlisle Wishard, Jennifer Pouplin, Jake Elliott, & Dana Singh
+This file is part of Swiftest.
+Swiftest is free software: you can redistribute it and/or modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+Swiftest is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty
+of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with Swiftest.
+If not, see: https://www.gnu.org/licenses.
+"""
+
+from __future__ import annotations
+
+from .simulation_class import Simulation, _run_driver_in_dir
+import os
+import copy
+import multiprocessing
+import multiprocessing.connection
+from pathlib import Path
+import xarray as xr
+from typing import (
+    Dict,
+    List,
+    Callable,
+    Any
+)
+
+
+def _run_member(integrator, param_file, simdir, threads_per_member):
+    """
+    Runs the Swiftest driver for a single ensemble member inside its own process. The number of OpenMP threads is set
+    before the Swiftest library is loaded in the process.
+    """
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_member)
+    _run_driver_in_dir(integrator, param_file, simdir, "progress")
+    return
+
+
+class Ensemble(object):
+    """
+    A collection of Swiftest simulations built from a common base Simulation, each with its own parameter overrides or
+    initial condition perturbations. Each member is run in its own simulation directory in a separate worker process, and
+    the results are collected into a single Dataset with a `member` dimension.
+    """
+
+    def __init__(self,
+                 base: Simulation,
+                 members: List[Dict[str, Any]] | None = None,
+                 perturb: Callable[[Simulation, int], None] | None = None,
+                 nmembers: int | None = None,
+                 names: List[str] | None = None,
+                 simdir: os.PathLike | str = "ensemble"
+                 ):
+        """
+        Set up a new ensemble of simulations.
+
+        Parameters
+        ----------
+        base : Simulation
+            The Simulation that all members are copied from. Its parameters and bodies are used for every member.
+        members : list of dict, optional
+            One dictionary of keyword arguments to `set_parameter` per member (for instance, `[{"dt" : 0.01}, {"dt" : 0.02}]`).
+            If not passed, `nmembers` members are created with the parameters of `base`.
+        perturb : callable, optional
+            Function called as `perturb(sim, i)` for the Simulation of member `i` before its initial conditions are saved.
+            This can be used to modify the bodies of each member (for instance, to generate a random-seed ensemble).
+        nmembers : int, optional
+            Number of members to create when `members` is not passed.
+        names : list of str, optional
+            Names of the members, which are used both for the `member` coordinate and the member simulation directories.
+            Default is "member_000", "member_001", etc.
+        simdir : PathLike, default `"ensemble"`
+            Directory where the member simulation directories are created.
+        """
+
+        if members is None:
+            if nmembers is None:
+                raise ValueError("Either members or nmembers must be passed to Ensemble")
+            members = [{} for _ in range(nmembers)]
+        elif nmembers is not None and nmembers != len(members):
+            raise ValueError(f"nmembers={nmembers} does not match the length of members ({len(members)})")
+
+        if names is None:
+            names = [f"member_{i:03d}" for i in range(len(members))]
+        elif len(names) != len(members):
+            raise ValueError(f"The number of names ({len(names)}) does not match the number of members ({len(members)})")
+
+        self.base = base
+        self.members = members
+        self.perturb = perturb
+        self.names = list(names)
+        self.simdir = Path.cwd() / Path(simdir)
+        self.simulations = []
+        self.data = xr.Dataset()
+        return
+
+    def setup(self) -> List[Simulation]:
+        """
+        Creates one simulation directory per member and saves its parameter and initial condition files.
+
+        Returns
+        -------
+        simulations : list of Simulation
+            The Simulation object of each member. These are also stored in the `simulations` instance variable.
+        """
+
+        self.simulations = []
+        for i, (name, overrides) in enumerate(zip(self.names, self.members)):
+            sim = copy.deepcopy(self.base)
+            sim.set_parameter(verbose=False, simdir=self.simdir / name, param_file=self.base.param_file)
+            if len(overrides) > 0:
+                sim.set_parameter(verbose=False, **overrides)
+            if self.perturb is not None:
+                self.perturb(sim, i)
+            sim.clean()
+            sim.save(verbose=False)
+            self.simulations.append(sim)
+
+        return self.simulations
+
+    def run(self,
+            max_workers: int | None = None,
+            threads_per_member: int = 1,
+            dask: bool = False,
+            verbose: bool | None = None
+            ) -> xr.Dataset:
+        """
+        Runs all members of the ensemble, each in its own worker process, and collects the results. The members are set up
+        first if `setup` has not been called yet. The worker processes are started with "spawn", so the calling script must be
+        protected by an ``if __name__ == "__main__":`` block.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            Number of members that run at the same time. Default is the number of CPUs divided by `threads_per_member`.
+        threads_per_member : int, default 1
+            Number of OpenMP threads used by each member.
+        dask : bool, default False
+            Use Dask to lazily load the member output data (useful for very large datasets)
+        verbose : bool, optional
+            If passed, it will override the verbose flag of the base Simulation
+
+        Returns
+        -------
+        data : xarray dataset
+            The output of all members, concatenated along a new `member` dimension. This is also stored in the `data`
+            instance variable.
+
+        Raises
+        ------
+        RuntimeError
+            If one or more members did not terminate normally.
+        """
+
+        if len(self.simulations) == 0:
+            self.setup()
+
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 1) // threads_per_member)
+
+        if verbose is None:
+            verbose = self.base.verbose
+        if verbose:
+            print(f"Running an ensemble of {len(self.simulations)} members with {max_workers} workers and {threads_per_member} threads per member")
+
+        # Each member runs in a process of its own, so a driver that stops with an error only takes down its own member
+        ctx = multiprocessing.get_context("spawn")
+        queue = list(zip(self.names, self.simulations))
+        running = {}
+        failed = {}
+        while len(queue) > 0 or len(running) > 0:
+            while len(queue) > 0 and len(running) < max_workers:
+                name, sim = queue.pop(0)
+                process = ctx.Process(target=_run_member, 
+                                      args=(sim.integrator, sim.param_file, sim.simdir, threads_per_member))
+                process.start()
+                running[process.sentinel] = (name, process)
+            for sentinel in multiprocessing.connection.wait(list(running)):
+                name, process = running.pop(sentinel)
+                process.join()
+                if process.exitcode != 0:
+                    failed[name] = f"exit code {process.exitcode}"
+
+        if len(failed) > 0:
+            msg = "\n".join(f"{name}: {reason}" for name, reason in failed.items())
+            raise RuntimeError(f"The following ensemble members did not terminate normally:\n{msg}")
+
+        return self.read_output_files(dask=dask)
+
+    def read_output_files(self,
+                          dask: bool = False
+                          ) -> xr.Dataset:
+        """
+        Reads in the output of every member and concatenates it into a single Dataset along a new `member` dimension.
+        Members with different bodies or output times are aligned with an outer join, so missing values are filled with NaN.
+
+        Parameters
+        ----------
+        dask : bool, default False
+            Use Dask to lazily load the member output data (useful for very large datasets)
+
+        Returns
+        -------
+        data : xarray dataset
+            The output of all members. This is also stored in the `data` instance variable.
+        """
+
+        for sim in self.simulations:
+            sim.read_encounters = True
+            sim.read_collisions = True
+            sim.read_output_file(dask=dask)
+
+        self.data = xr.concat([sim.data for sim in self.simulations], dim="member", join="outer",
+                              coords="minimal", compat="override")
+        self.data = self.data.assign_coords(member=self.names)
+        return self.data
@@ -18,6 +18,10 @@ import astropy.units as u
 from astropy.coordinates import SkyCoord
 import datetime
 import xarray as xr
+import hashlib
+import json
+import os
+from pathlib import Path
 from typing import (
     Literal,
     Dict,
@@ -25,6 +29,9 @@ from typing import (
     Any
 )
 
+# Location of the observer used for all JPL/Horizons queries unless another one is passed as a keyword argument
+_horizons_default_location = '@sun'
+
 def horizons_get_physical_properties(altid,**kwargs):
     """
     Parses the raw output from JPL Horizons in order to extract physical properties of a body if they exist
@@ -160,7 +167,7 @@ def horizons_get_physical_properties(altid,**kwargs):
     return Gmass,Rpl,rot
 
 
-def horizons_query(id, ephemerides_start_date, exclude_spacecraft=True, verbose=False,**kwargs):
+def horizons_query(id, ephemerides_start_date, exclude_spacecraft=True, verbose=False, location=_horizons_default_location, **kwargs):
     """
     Queries JPL/Horizons for a body matching the id. If one is found, a HorizonsClass object is returned for the first object that
     matches the passed id string. If more than one match is found, a list of alternate ids is also returned. If no object is found
@@ -176,6 +183,8 @@ def horizons_query(id, ephemerides_start_date, exclude_spacecraft=True, verbose=
         Indicate whether spacecraft ids should be exluded from the alternate id list
     verbose: bool (optional) - Default True
         Indicate whether to print messages about the query or not
+    location: string (optional) - Default '@sun'
+        Location of the observer passed to Horizons
 
     Returns
     -------
@@ -224,7 +233,7 @@ def horizons_query(id, ephemerides_start_date, exclude_spacecraft=True, verbose=
     ephemerides_step = '1d'
     
     try:
-        jpl = Horizons(id=id, location='@sun',
+        jpl = Horizons(id=id, location=location,
                             epochs={'start': ephemerides_start_date, 'stop': ephemerides_end_date,
                                     'step': ephemerides_step},**kwargs)
         eph=jpl.ephemerides()
@@ -234,7 +243,7 @@ def horizons_query(id, ephemerides_start_date, exclude_spacecraft=True, verbose=
         altid,altname = get_altid(str(e))
         if altid is not None and len(altid) >0: # Return the first matching id
             id = altid[0]
-            jpl = Horizons(id=id, location='@sun',
+            jpl = Horizons(id=id, location=location,
                         epochs={'start': ephemerides_start_date, 'stop': ephemerides_end_date,
                                 'step': ephemerides_step})
             eph=jpl.ephemerides()
@@ -252,10 +261,135 @@ def horizons_query(id, ephemerides_start_date, exclude_spacecraft=True, verbose=
     return jpl,altid,altname
     
     
+# Names of the values returned by solar_system_horizons, in order, and which of them are 3-vectors
+_horizons_body_keys = ["id","name","a","e","inc","capom","omega","capm","rh","vh","Gmass","radius","rhill","Ip","rot","j2rp2","j4rp4"]
+_horizons_vector_keys = ["rh","vh","Ip","rot"]
+
+def default_ephemeris_cache_dir() -> Path:
+    """
+    Returns the default directory used to cache ephemerides retrieved from JPL/Horizons. This is the value of the 
+    SWIFTEST_EPHEMERIS_CACHE environment variable if it is set, otherwise it is ~/.cache/swiftest/ephemerides
+
+    Returns
+    -------
+    cache_dir : Path
+        Ephemeris cache directory
+    """
+    if "SWIFTEST_EPHEMERIS_CACHE" in os.environ:
+        return Path(os.environ["SWIFTEST_EPHEMERIS_CACHE"])
+    return Path.home() / ".cache" / "swiftest" / "ephemerides"
+
+
+def _ephemeris_cache_file(cache_dir: os.PathLike | str,
+                          name: str | None,
+                          ephemeris_id: str | None,
+                          ephemerides_start_date: str,
+                          param: Dict,
+                          **kwargs: Any) -> Path:
+    """
+    Builds the content-addressed path of the cache file for a body. The file name is a hash of everything that determines the
+    values returned by solar_system_horizons: the body, the ephemeris date, the reference frame, the unit system, the input
+    format, the optional body properties that are requested, and any additional arguments passed to Horizons.
+
+    Parameters
+    ----------
+    cache_dir : PathLike or str
+        Ephemeris cache directory
+    name : str
+        Name of the body
+    ephemeris_id : str
+        Id of the body passed to Horizons
+    ephemerides_start_date : str
+        Date of the ephemerides in the format YYYY-MM-DD
+    param : dict
+        Swiftest parameters
+    **kwargs : Any
+        Additional keyword arguments passed to Horizons
+
+    Returns
+    -------
+    cache_file : Path
+        Path to the cache file
+    """
+    kwargs = dict(kwargs)
+    key = {
+        "name": name,
+        "ephemeris_id": None if ephemeris_id is None else str(ephemeris_id),
+        "date": ephemerides_start_date,
+        "location": kwargs.pop("location", _horizons_default_location),
+        "units": [param['MU2KG'], param['DU2M'], param['TU2S']],
+        "IN_FORM": param['IN_FORM'],
+        "options": [bool(param['ROTATION']), bool(param['CHK_CLOSE']), bool(param['RHILL_PRESENT'])],
+        "kwargs": repr(sorted(kwargs.items())),
+    }
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+    return Path(cache_dir) / f"{digest}.json"
+
+
+def _ephemeris_cache_read(cache_file: Path) -> tuple | None:
+    """
+    Reads a body from the ephemeris cache.
+
+    Parameters
+    ----------
+    cache_file : Path
+        Path to the cache file
+
+    Returns
+    -------
+    body : tuple or None
+        The values that would be returned by solar_system_horizons, or None if the body is not in the cache
+    """
+    try:
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    body = []
+    for k in _horizons_body_keys:
+        v = cached.get(k)
+        if k in _horizons_vector_keys and v is not None:
+            v = np.array(v, dtype=np.float64)
+        body.append(v)
+    return tuple(body)
+
+
+def _ephemeris_cache_write(cache_file: Path, body: tuple) -> None:
+    """
+    Writes a body to the ephemeris cache. The file is written to a temporary name first and then moved into place, so that
+    concurrent writers and readers never see a partially written file.
+
+    Parameters
+    ----------
+    cache_file : Path
+        Path to the cache file
+    body : tuple
+        The values returned by solar_system_horizons
+    """
+    cached = {}
+    for k, v in zip(_horizons_body_keys, body):
+        if v is None or isinstance(v, str):
+            cached[k] = v
+        elif k in _horizons_vector_keys:
+            cached[k] = np.asarray(v, dtype=np.float64).tolist()
+        elif k == "id":
+            cached[k] = int(v)
+        else:
+            cached[k] = float(v)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.{id(body)}.tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump(cached, f)
+    os.replace(tmp_file, cache_file)
+    return
+
+
 def solar_system_horizons(name: str,
                           param: Dict,
                           ephemerides_start_date: str,
                           ephemeris_id: str | None = None,
+                          cache_dir: os.PathLike | str | None = None,
+                          offline: bool = False,
                           **kwargs: Any):
     """
     Initializes a Swiftest dataset containing the major planets of the Solar System at a particular data from JPL/Horizons
@@ -271,13 +405,18 @@ def solar_system_horizons(name: str,
         Date to use when obtaining the ephemerides in the format YYYY-MM-DD.
     ephemeris_id : string (optional)
         If passed, this is passed to Horizons instead of `name`. This can be used to find a more precise body than given by `name`. 
+    cache_dir : PathLike or str (optional)
+        If passed, bodies are looked up in this ephemeris cache directory before querying JPL/Horizons, and bodies that are
+        retrieved from JPL/Horizons are saved to it.
+    offline : bool, default False
+        If True, JPL/Horizons is never queried, and a FileNotFoundError is raised if the body is not found in the cache.
     **kwargs: Any
             Additional keyword arguments to pass to the query method (see https://astroquery.readthedocs.io/en/latest/jplhorizons/jplhorizons.html)
 
     Returns
     -------
-    ds : xarray dataset
-        Initial conditions of body formatted for Swiftest
+    body : tuple
+        Initial conditions of body formatted for Swiftest, or None if the body could not be found
     
     Notes
     --------
@@ -333,6 +472,7 @@ def solar_system_horizons(name: str,
     J2 = None
     J4 = None
 
+    cache_file = None
     if name == "Sun" or ephemeris_id == "0": # Create central body
         print("Creating the Sun as a central body")
         Gmass = GMcb
@@ -343,6 +483,16 @@ def solar_system_horizons(name: str,
             Ip = Ipsun
             rot = rotcb
     else: # Fetch solar system ephemerides from Horizons
+        if cache_dir is not None:
+            cache_file = _ephemeris_cache_file(cache_dir, name, ephemeris_id, ephemerides_start_date, param, **kwargs)
+            body = _ephemeris_cache_read(cache_file)
+            if body is not None:
+                print(f"Found ephemerides data for {body[1]} in the ephemeris cache")
+                return body
+        if offline:
+            raise FileNotFoundError(f"Ephemerides data for {name if ephemeris_id is None else ephemeris_id} on {ephemerides_start_date} "
+                                    "is not in the ephemeris cache and offline mode is enabled")
+
         if ephemeris_id is None:
             ephemeris_id = name
             
@@ -412,7 +562,11 @@ def solar_system_horizons(name: str,
     else:
         id = -1
 
-    return id,name,a,e,inc,capom,omega,capm,rh,vh,Gmass,Rpl,rhill,Ip,rot,J2,J4
+    body = (id,name,a,e,inc,capom,omega,capm,rh,vh,Gmass,Rpl,rhill,Ip,rot,J2,J4)
+    if cache_file is not None:
+        _ephemeris_cache_write(cache_file, body)
+
+    return body
 
 
 def vec2xr(param: Dict, **kwargs: Any):
@@ -11,12 +11,17 @@ If not, see: https://www.gnu.org/licenses.
 
 import swiftest
 import numpy as np
-from scipy.io import FortranFile
 import xarray as xr
 import sys
 import tempfile
 import re
 import os
+import time
+import contextlib
+
+# Output files are read by tail_output while the Fortran driver is still writing them, so HDF5 file locking is turned off for 
+# the process unless the user has already chosen a setting.
+os.environ.setdefault("HDF5_USE_FILE_LOCKING", "FALSE")
 
 # This defines features that are new in Swiftest and not in Swifter (for conversion between param.in files)
 newfeaturelist = ("RESTART",
@@ -40,7 +45,17 @@ newfeaturelist = ("RESTART",
                   "MIN_GMFRAG",
                   "NFRAG_REDUCTION",
                   "COLLISION_MODEL",
-                  "COARRAY")
+                  "COARRAY",
+                  "TREE_GRAVITY",
+                  "TREE_THETA",
+                  "ASYNC_OUTPUT",
+                  "NC_CHUNKING",
+                  "NC_CHUNK_TIME",
+                  "NC_CHUNK_NAME",
+                  "NC_DEFLATE_LEVEL",
+                  "NC_SHUFFLE",
+                  "SHARDED_OUTPUT",
+                  "COARRAY_IMBALANCE")
 
 # This list defines features that are booleans, so must be converted to/from string when writing/reading from file
 bool_param = ["RESTART",
@@ -55,13 +70,18 @@ bool_param = ["RESTART",
               "GR",
               "YARKOVSKY",
               "YORP",
-              "COARRAY"]
+              "COARRAY",
+              "TREE_GRAVITY",
+              "ASYNC_OUTPUT",
+              "NC_SHUFFLE",
+              "SHARDED_OUTPUT"]
 
-int_param = ["ISTEP_OUT", "DUMP_CADENCE"]
+int_param = ["ISTEP_OUT", "DUMP_CADENCE", "NC_CHUNK_TIME", "NC_CHUNK_NAME", "NC_DEFLATE_LEVEL"]
 float_param = ["T0", "TSTART", "TSTOP", "DT", "CHK_RMIN", "CHK_RMAX", "CHK_EJECT", "CHK_QMIN", "DU2M", "MU2KG",
-               "TU2S", "MIN_GMFRAG", "GMTINY"]
+               "TU2S", "MIN_GMFRAG", "GMTINY", "TREE_THETA",
+               "COARRAY_IMBALANCE"]
 
-upper_str_param = ["OUT_TYPE","OUT_FORM","OUT_STAT","IN_TYPE","IN_FORM","ENCOUNTER_SAVE", "CHK_QMIN_COORD"]
+upper_str_param = ["OUT_TYPE","OUT_FORM","OUT_STAT","IN_TYPE","IN_FORM","ENCOUNTER_SAVE", "CHK_QMIN_COORD", "NC_CHUNKING"]
 lower_str_param = ["NC_IN", "PL_IN", "TP_IN", "CB_IN", "CHK_QMIN_RANGE"]
 
 param_keys = ['! VERSION'] + int_param + float_param + upper_str_param + lower_str_param+ bool_param
@@ -467,110 +487,182 @@ def write_labeled_param(param, param_file_name):
     return
 
 
-def _swifter_stream(f, param):
+def _swifter_record_dtypes(param):
     """
-    Reads in a Swifter bin.dat file and returns a single frame of data as a datastream
+    Builds the NumPy structured dtypes that describe a single Fortran sequential-access record in a Swifter bin.dat file,
+    including the 4-byte record length markers that bracket each record.
 
     Parameters
     ----------
-    f : file object
-        File object of the Swifter bin.dat file
     param : dict
         Swifter parameters
 
-    Yields
+    Returns
     -------
-    t    : float
-        Time of this frame
-    npl  : int
-        Number of massive bodies
-    plid : int array
-        IDs of massive bodies
-    pvec : float array
-        (npl,N) - vector of N quantities or each particle (6 of XV/EL + Gmass, radius, etc)
-    plab : string list
-        Labels for the pvec data
-    ntp  : int
-        Number of test particles
-    tpid : int array
-        Ids of test particles
-    tvec : float array
-        (ntp,N) - vector of N quantities for each particle (6 of XV/EL, etc.)
-    tlab : string list
-        Labels for the tvec data
+    header_dtype : numpy dtype
+        dtype of the frame header record
+    pl_dtype : numpy dtype
+        dtype of a single massive body record
+    tp_dtype : numpy dtype
+        dtype of a single test particle record
     """
-    
-    while True:  # Loop until you read the end of file
-        try:
-            # Read single-line header
-            record = f.read_record('<f8', '<i4', '<i4', '<i4')
-        except:
+    if param['OUT_FORM'] == 'XV':
+        vec_fields = [('rh', '<f8', (3,)), ('vh', '<f8', (3,))]
+    elif param['OUT_FORM'] == 'EL':
+        vec_fields = [('el', '<f8', (6,))]
+    else:
+        raise ValueError(f"OUT_FORM {param['OUT_FORM']} is not a valid Swifter output format.")
+
+    header_dtype = np.dtype([('head', '<i4'), ('t', '<f8'), ('nbody', '<i4'), ('ntp', '<i4'), ('out_form', '<i4'), ('tail', '<i4')])
+    pl_dtype = np.dtype([('head', '<i4'), ('id', '<i4'), ('Gmass', '<f8'), ('radius', '<f8')] + vec_fields + [('tail', '<i4')])
+    tp_dtype = np.dtype([('head', '<i4'), ('id', '<i4')] + vec_fields + [('tail', '<i4')])
+
+    return header_dtype, pl_dtype, tp_dtype
+
+
+def _swifter_scan(buf, param):
+    """
+    Scans the frame headers of a Swifter bin.dat file once to find the byte offset, time, and body counts of every frame.
+    Only the header records are read. The massive body and test particle blocks are skipped over.
+
+    Parameters
+    ----------
+    buf : numpy memmap
+        Byte view of the Swifter bin.dat file
+    param : dict
+        Swifter parameters
+
+    Returns
+    -------
+    t : float array
+        Time of each frame
+    npl : int array
+        Number of massive bodies in each frame
+    ntp : int array
+        Number of test particles in each frame
+    offset : int array
+        Byte offset of the first massive body record of each frame
+    """
+    header_dtype, pl_dtype, tp_dtype = _swifter_record_dtypes(param)
+    hsize = header_dtype.itemsize
+    t = []
+    npl = []
+    ntp = []
+    offset = []
+    pos = 0
+    nbytes = buf.size
+    while pos + hsize <= nbytes:
+        header = buf[pos:pos + hsize].view(header_dtype)[0]
+        if header['head'] != hsize - 8 or header['tail'] != hsize - 8:
+            raise ValueError(f"Corrupt frame header record found at byte {pos} of {param['BIN_OUT']}")
+        frame_npl = header['nbody'] - 1
+        frame_ntp = header['ntp']
+        frame_end = pos + hsize + frame_npl * pl_dtype.itemsize + frame_ntp * tp_dtype.itemsize
+        if frame_end > nbytes: # Stop at a frame that was only partially written
             break
-        t = record[0]
-        npl = record[1][0] - 1
-        ntp = record[2][0]
-       
-        if param['OUT_FORM'] == 'XV':
-            rpvec = np.empty((npl,3))
-            vpvec = np.empty((npl,3))
-            rtvec = np.empty((ntp,3))
-            vtvec = np.empty((ntp,3))
-        elif param['OUT_FORM'] == 'EL': 
-            elempvec = np.empty((npl,6))
-            elemtvec = np.empty((ntp,6))
-        plid = np.empty(npl, dtype='int')
-        tpid = np.empty(ntp, dtype='int')
-        if npl > 0:
-            GMpl = np.empty(npl)
-            Rpl = np.empty(npl)
-            for i in range(npl):
-                # Read single-line pl frame for
-                if param['OUT_FORM'] == 'XV':
-                    record = f.read_record('<i4', '<f8', '<f8', '(3,)<f8', '(3,)<f8')
-                elif param['OUT_FORM'] == 'EL':
-                    record = f.read_record('<i4', '<f8', '<f8', '(6,)<f8')
-                plid[i] = record[0]
-                GMpl[i] = record[1]
-                Rpl[i] = record[2]
-                if param['OUT_FORM'] == 'XV':
-                    rpvec[i,:] = record[3]
-                    vpvec[i,:] = record[4]
-                elif param['OUT_FORM'] == 'EL':
-                    elempvec[i,:] = record[3]
-        if ntp > 0:
-            for i in range(ntp):
-                if param['OUT_FORM'] == 'XV':
-                    record = f.read_record('<i4', '(3,)<f8', '(3,)<f8')
-                elif param['OUT_FORM'] == 'EL':
-                    record = f.read_record('<i4', '(6,)<f8')
-                tpid[i] = record[0]
-                if param['OUT_FORM'] == 'XV':
-                    rtvec[i,:] = record[1]
-                    vtvec[i,:] = record[2]
-                elif param['OUT_FORM'] == 'EL':
-                    elemtvec[i,:] = record[1]
-        
-        tlab = ['id']
-        if param['OUT_FORM'] == 'XV': 
-            tlab.append('rh')
-            tlab.append('vh')
-        elif param['OUT_FORM'] == 'EL':
-            tlab.append('a')
-            tlab.append('e')
-            tlab.append('inc')
-            tlab.append('capom')
-            tlab.append('omega')
-            tlab.append('capm')
-        plab = tlab.copy()
-        plab.append('Gmass')
-        plab.append('radius')
-        
-        if param['OUT_FORM'] == 'XV':
-            yield t, npl, [plid, rpvec, vpvec, GMpl, Rpl], plab, \
-                  ntp, [tpid, rtvec, vtvec], tlab
-        elif param['OUT_FORM'] == 'EL':
-            yield t, npl, [plid, elempvec, GMpl, Rpl], plab, \
-                  ntp, [tpid, elemtvec], tlab
+        t.append(header['t'])
+        npl.append(frame_npl)
+        ntp.append(frame_ntp)
+        offset.append(pos + hsize)
+        pos = frame_end
+
+    return np.array(t, dtype=np.float64), np.array(npl, dtype=np.int64), np.array(ntp, dtype=np.int64), np.array(offset, dtype=np.int64)
+
+
+def _swifter_stream(buf, param, frames, ids):
+    """
+    Reads a range of frames of a Swifter bin.dat file into preallocated (time, id) arrays and returns them as a single 
+    Dataset. Each frame's massive body and test particle blocks are read as a single structured view of the file.
+
+    Parameters
+    ----------
+    buf : numpy memmap
+        Byte view of the Swifter bin.dat file
+    param : dict
+        Swifter parameters
+    frames : tuple of arrays
+        The (t, npl, ntp, offset) arrays returned by _swifter_scan for the frames to read
+    ids : int array
+        Sorted array of all body ids to use for the id dimension
+
+    Returns
+    -------
+    ds : xarray dataset
+    """
+    header_dtype, pl_dtype, tp_dtype = _swifter_record_dtypes(param)
+    t, npl, ntp, offset = frames
+    nframes = t.size
+    nid = ids.size
+
+    if param['OUT_FORM'] == 'XV':
+        vec_vars = {'rh': np.full((nframes, nid, 3), np.nan), 'vh': np.full((nframes, nid, 3), np.nan)}
+        el_vars = {}
+    else:
+        vec_vars = {}
+        el_vars = {k: np.full((nframes, nid), np.nan) for k in ['a', 'e', 'inc', 'capom', 'omega', 'capm']}
+    Gmass = np.full((nframes, nid), np.nan)
+    radius = np.full((nframes, nid), np.nan)
+
+    for i in range(nframes):
+        plstart = offset[i]
+        tpstart = plstart + npl[i] * pl_dtype.itemsize
+        pl = buf[plstart:tpstart].view(pl_dtype)
+        tp = buf[tpstart:tpstart + ntp[i] * tp_dtype.itemsize].view(tp_dtype)
+        for block in (pl, tp):
+            if block.size == 0:
+                continue
+            idx = np.searchsorted(ids, block['id'])
+            for k, v in vec_vars.items():
+                v[i, idx, :] = block[k]
+            for j, v in enumerate(el_vars.values()):
+                v[i, idx] = block['el'][:, j]
+        if pl.size > 0:
+            idx = np.searchsorted(ids, pl['id'])
+            Gmass[i, idx] = pl['Gmass']
+            radius[i, idx] = pl['radius']
+
+    data_vars = {k: (['time', 'id', 'space'], v) for k, v in vec_vars.items()}
+    data_vars.update({k: (['time', 'id'], v) for k, v in el_vars.items()})
+    data_vars['Gmass'] = (['time', 'id'], Gmass)
+    data_vars['radius'] = (['time', 'id'], radius)
+    ds = xr.Dataset(data_vars=data_vars,
+                    coords={
+                        "time": (["time"], t),
+                        "id": (["id"], ids),
+                        "space": (["space"], np.array(["x", "y", "z"])),
+                    })
+    return ds
+
+
+def _swifter_open(param):
+    """
+    Opens a Swifter bin.dat file as a read-only byte memmap and scans its frame headers and body ids.
+
+    Parameters
+    ----------
+    param : dict
+        Swifter parameters
+
+    Returns
+    -------
+    buf : numpy memmap
+        Byte view of the Swifter bin.dat file
+    frames : tuple of arrays
+        The (t, npl, ntp, offset) arrays returned by _swifter_scan
+    ids : int array
+        Sorted array of all body ids that appear in the file
+    """
+    header_dtype, pl_dtype, tp_dtype = _swifter_record_dtypes(param)
+    buf = np.memmap(param['BIN_OUT'], dtype=np.uint8, mode='r')
+    frames = _swifter_scan(buf, param)
+    t, npl, ntp, offset = frames
+    ids = [np.empty(0, dtype=np.int64)]
+    for i in range(t.size):
+        tpstart = offset[i] + npl[i] * pl_dtype.itemsize
+        ids.append(buf[offset[i]:tpstart].view(pl_dtype)['id'])
+        ids.append(buf[tpstart:tpstart + ntp[i] * tp_dtype.itemsize].view(tp_dtype)['id'])
+    ids = np.unique(np.concatenate(ids)).astype(np.int64)
+    return buf, frames, ids
 
 
 def swifter2xr(param, verbose=True):
@@ -587,33 +679,44 @@ def swifter2xr(param, verbose=True):
     -------
     xarray dataset
     """
-    dims = ['time', 'id','vec']
-    pl = []
-    tp = []
-    with FortranFile(param['BIN_OUT'], 'r') as f:
-        for t, npl, pvec, plab, \
-            ntp, tvec, tlab in _swifter_stream(f, param):
-            
-            sys.stdout.write('\r' + f"Reading in time {t[0]:.3e}")
-            sys.stdout.flush()
-            
-            pvec_args = dict(zip(plab,pvec))
-            pl.append(swiftest.init_cond.vec2xr(param,time=t,**pvec_args))
-            if ntp > 0:
-                tvec_args = dict(zip(tlab,tvec))
-                tp.append(swiftest.init_cond.vec2xr(param,time=t,**tvec_args))
-            
-        plds = xr.concat(pl, dim='time')
-        if len(tp) > 0: 
-            tpds = xr.concat(tp, dim='time')
-        
-        if verbose: print('\nCreating Dataset')
-        if len(tp) > 0:
-            ds = xr.combine_by_coords([plds, tpds])
-        if verbose: print(f"Successfully converted {ds.sizes['time']} output frames.")
+    buf, frames, ids = _swifter_open(param)
+    if verbose: print(f"Reading {frames[0].size} frames containing {ids.size} bodies")
+    ds = _swifter_stream(buf, param, frames, ids)
+    if verbose: print(f"Successfully converted {ds.sizes['time']} output frames.")
     return ds
 
 
+def swifter2xr_chunks(param, chunk_size=100, verbose=True):
+    """
+    Converts a Swifter binary data file into a sequence of xarray DataSets, each containing a range of output frames. All 
+    of the Datasets share the same id dimension, so they can be written out one at a time (e.g. to separate NetCDF files 
+    that are later opened together with ``xr.open_mfdataset``) without holding the entire file in memory.
+
+    Parameters
+    ----------
+    param : dict
+        Swifter parameters
+    chunk_size : int, default 100
+        Number of output frames in each Dataset
+    verbose : bool, default True
+        Print out information about the file being read
+
+    Yields
+    -------
+    xarray dataset
+    """
+    buf, frames, ids = _swifter_open(param)
+    nframes = frames[0].size
+    if verbose: print(f"Reading {nframes} frames containing {ids.size} bodies")
+    for start in range(0, nframes, chunk_size):
+        stop = min(start + chunk_size, nframes)
+        if verbose:
+            sys.stdout.write('\r' + f"Reading in frames {start} to {stop - 1} of {nframes}")
+            sys.stdout.flush()
+        yield _swifter_stream(buf, param, tuple(v[start:stop] for v in frames), ids)
+    if verbose: print("")
+
+
 def process_netcdf_input(ds, param):
     """
     Performs several tasks to convert raw NetCDF files output by the Fortran program into a form that
@@ -637,9 +740,11 @@ def process_netcdf_input(ds, param):
     return ds
 
 
-def swiftest2xr(param, verbose=True, dask=False):
+def swiftest2xr(param, verbose=True, dask=False, time=None, ids=None, variables=None):
     """
-    Converts a Swiftest binary data file into an xarray DataSet.
+    Converts a Swiftest binary data file into an xarray DataSet. The optional `time`, `ids`, and `variables` selections are 
+    applied to the lazily opened file before any data is read or type-converted, so only the selected part of the file is 
+    loaded.
 
     Parameters
     ----------
@@ -649,6 +754,12 @@ def swiftest2xr(param, verbose=True, dask=False):
         Print out information about the file being read
     dask : bool, default False
         Use Dask to lazily load data (useful for very large datasets)
+    time : int, slice, or array-like of int, optional
+        Positional index or indices of the output frames to read (e.g. -1 for the last frame). Default is all frames.
+    ids : int or array-like of int, optional
+        Ids of the bodies to read. Default is all bodies.
+    variables : str or list of str, optional
+        Names of the variables to read. Coordinates are always included. Default is all variables.
 
     Returns
     -------
@@ -658,11 +769,25 @@ def swiftest2xr(param, verbose=True, dask=False):
 
     if ((param['OUT_TYPE'] == 'NETCDF_DOUBLE') or (param['OUT_TYPE'] == 'NETCDF_FLOAT')):
         if verbose: print('\nCreating Dataset from NetCDF file')
-        if dask:
+        shards = shard_file_names(param['BIN_OUT'])
+        if not os.path.exists(param['BIN_OUT']) and len(shards) > 0:
+            if verbose: print(f"Combining the output file shards of {param['BIN_OUT']}")
+            ds = open_sharded_output(param['BIN_OUT'])
+            if not dask:
+                with ds:
+                    ds.load()
+        elif _shards_are_newer(param['BIN_OUT'], shards):
+            if verbose: print(f"Combining {param['BIN_OUT']} with the output file shards written after it")
+            ds = open_output_with_shards(param['BIN_OUT'])
+            if not dask:
+                with ds:
+                    ds.load()
+        elif dask:
             ds = xr.open_mfdataset(param['BIN_OUT'], engine='h5netcdf', mask_and_scale=False)
         else:
             ds = xr.open_dataset(param['BIN_OUT'], mask_and_scale=False)
-        
+
+        ds = select_from_output(ds, time=time, ids=ids, variables=variables)
         ds = process_netcdf_input(ds, param)
     else:
         print(f"Error encountered. OUT_TYPE {param['OUT_TYPE']} not recognized.")
@@ -672,6 +797,386 @@ def swiftest2xr(param, verbose=True, dask=False):
     return ds
 
 
+def shard_file_names(file_name):
+    """
+    Returns the names of the output file shards that were written by the Coarray images of a run with SHARDED_OUTPUT turned
+    on. Each image inserts its image number before the file extension, so that image 3 writes "data.nc" to "data.img003.nc".
+
+    Parameters
+    ----------
+    file_name : str or path-like
+        Name of the shared output file (BIN_OUT)
+
+    Returns
+    -------
+    shards : list of str
+        Names of the shards that exist, sorted by image number
+    """
+    root, ext = os.path.splitext(os.fspath(file_name))
+    dirname, basename = os.path.split(root)
+    pattern = re.compile(re.escape(basename) + r"\.img(\d+)" + re.escape(ext) + "$")
+    if not os.path.isdir(dirname or "."):
+        return []
+
+    shards = []
+    for f in os.listdir(dirname or "."):
+        match = pattern.match(f)
+        if match:
+            shards.append((int(match.group(1)), os.path.join(dirname, f)))
+
+    return [f for _, f in sorted(shards)]
+
+
+def _combine_shard_variable(da, present, dim="shard"):
+    """
+    Combines a variable of the output file shards stacked along `dim` by taking each value from the first shard in which the 
+    body was present. Entries that no shard wrote are set to the fill value of integer variables or to an empty string.
+    """
+    encoding = {k: v for k, v in da.encoding.items() if k in ["dtype", "char_dim_name", "zlib", "complevel", "shuffle"]}
+    dims = [d for d in da.dims if d != dim]
+    combined = da.isel({dim: -1})
+    for i in reversed(range(da.sizes[dim] - 1)):
+        combined = xr.where(present.isel({dim: i}), da.isel({dim: i}), combined)
+    combined = combined.transpose(*dims)
+
+    if "char_dim_name" in da.encoding:
+        combined = combined.fillna(b"").astype(f"S{da.encoding['original_shape'][-1]}")
+    else:
+        combined = _restore_integer_type(combined, da)
+    combined.attrs = da.attrs
+    combined.encoding = encoding
+    return combined
+
+
+def _restore_integer_type(da, reference):
+    """
+    Casts a variable that was turned into floating point by an outer join back to the integer type of the `reference` variable
+    it came from. Entries that were filled in by the join are set to the fill value of the variable, or to the NetCDF default
+    integer fill value if it does not have one. Other variables are returned unchanged.
+    """
+    dtype = np.dtype(reference.encoding.get("dtype", reference.dtype))
+    if not np.issubdtype(dtype, np.integer) or np.issubdtype(da.dtype, np.integer):
+        return da
+    fill = reference.attrs.get("_FillValue", -2147483647)
+    return da.fillna(fill).astype(dtype)
+
+
+def open_sharded_output(file_name, **kwargs):
+    """
+    Opens the output file shards written by the Coarray images of a run with SHARDED_OUTPUT turned on as a single virtual 
+    Dataset, in the same form as the shared output file that would have been written without sharding. The shards are opened
+    lazily with `xr.open_mfdataset`. A body that was moved between images while the run was load balanced appears in more 
+    than one shard, so each of its values is taken from the shard that held the body at that time. The number of test 
+    particles is summed over the shards.
+
+    Parameters
+    ----------
+    file_name : str or path-like
+        Name of the shared output file (BIN_OUT). The shards are found by inserting the image number before its extension.
+    **kwargs : Any
+        Additional keyword arguments passed to `xr.open_mfdataset`
+
+    Returns
+    -------
+    ds : xarray dataset
+        Lazily loaded Dataset containing the output of all of the shards
+    """
+    shards = shard_file_names(file_name)
+    if len(shards) == 0:
+        raise FileNotFoundError(f"No output file shards of {file_name} were found")
+
+    kwargs.setdefault("mask_and_scale", False)
+    stacked = xr.open_mfdataset(shards, combine="nested", concat_dim="shard", join="outer", data_vars="all",
+                                coords="minimal", compat="override", **kwargs)
+
+    # A body belongs to a shard if the shard has its id, and it is present in the shard at a given time if its position (or 
+    # semimajor axis for EL output) was written there. Bodies without a position, like the central body, are taken from the
+    # shards they belong to.
+    in_shard = stacked["id"].notnull()
+    in_shard = in_shard.any(dim=[d for d in in_shard.dims if d not in ["shard", "name"]])
+    if "rh" in stacked:
+        present = stacked["rh"].notnull().any(dim="space")
+    else:
+        present = stacked["a"].notnull()
+    present = present | (in_shard & ~present.any(dim="shard"))
+
+    ds = stacked.drop_vars([v for v in stacked.data_vars if "shard" in stacked[v].dims])
+    for var in stacked.data_vars:
+        da = stacked[var]
+        if "shard" not in da.dims:
+            continue
+        if var == "ntp":
+            ds[var] = da.fillna(0).sum(dim="shard").astype(da.encoding.get("dtype", da.dtype))
+            ds[var].attrs = da.attrs
+            ds[var].encoding = da.encoding
+        elif "name" in da.dims and "time" in da.dims:
+            ds[var] = _combine_shard_variable(da, present)
+        elif "name" in da.dims:
+            ds[var] = _combine_shard_variable(da, in_shard)
+        else:
+            ds[var] = da.isel(shard=0, drop=True)
+
+    # Joining the shards sorts the bodies by name, so put them back in the order of their ids like in the shared output file
+    ds = ds[list(stacked.data_vars)]
+    ds = _sort_by_id(ds)
+    ds.set_close(stacked.close)
+
+    return ds
+
+
+def _sort_by_id(ds):
+    """
+    Sorts the bodies of an output Dataset by their id, as they are in an output file written by Swiftest.
+    """
+    if "id" in ds:
+        ds = ds.sortby(ds["id"].max(dim=[d for d in ds["id"].dims if d != "name"]).compute())
+    return ds
+
+
+def open_output_with_shards(file_name, **kwargs):
+    """
+    Opens the shared output file of a run that was restarted with SHARDED_OUTPUT turned on after its shards had been merged, 
+    together with the output file shards that were written after the restart. Values from the shards take precedence, so 
+    frames that are in both are taken from the shards, and earlier frames are taken from the shared output file.
+
+    Parameters
+    ----------
+    file_name : str or path-like
+        Name of the shared output file (BIN_OUT)
+    **kwargs : Any
+        Additional keyword arguments passed to `open_sharded_output`
+
+    Returns
+    -------
+    ds : xarray dataset
+        Lazily loaded Dataset containing the output of the shared output file and of the shards
+    """
+    kwargs.setdefault("mask_and_scale", False)
+    merged = xr.open_dataset(file_name, mask_and_scale=kwargs["mask_and_scale"], chunks={})
+    sharded = open_sharded_output(file_name, **kwargs)
+
+    ds = sharded.combine_first(merged)
+    for var in ds.data_vars:
+        reference = sharded[var] if var in sharded else merged[var]
+        ds[var] = _restore_integer_type(ds[var], reference)
+        ds[var].attrs = reference.attrs
+        ds[var].encoding = reference.encoding
+    ds = ds[list(merged.data_vars) + [v for v in sharded.data_vars if v not in merged]]
+    ds = _sort_by_id(ds)
+
+    def _close():
+        sharded.close()
+        merged.close()
+    ds.set_close(_close)
+
+    return ds
+
+
+def _shards_are_newer(file_name, shards):
+    """
+    Returns True if the shared output file exists and any of the output file shards were modified after it, which is the case
+    when a run was restarted with SHARDED_OUTPUT turned on after its shards had been merged.
+    """
+    if not os.path.exists(file_name) or len(shards) == 0:
+        return False
+    mtime = os.path.getmtime(file_name)
+    return any(os.path.getmtime(f) > mtime for f in shards)
+
+
+def merge_sharded_output(file_name, remove_shards=False, verbose=True):
+    """
+    Merges the output file shards written by the Coarray images of a run with SHARDED_OUTPUT turned on into the shared output
+    file. This is an optional post-run step that is needed to restart the run or to read the output with tools that do not 
+    know about the shards.
+
+    Parameters
+    ----------
+    file_name : str or path-like
+        Name of the shared output file (BIN_OUT) to write
+    remove_shards : bool, default False
+        Delete the shards once they have been merged
+    verbose : bool, default True
+        Print out information about the shards being merged
+
+    Returns
+    -------
+    None
+    """
+    shards = shard_file_names(file_name)
+    if verbose: print(f"Merging {len(shards)} output file shards into {file_name}")
+    if _shards_are_newer(file_name, shards):
+        # The run was restarted from a merged output file, so the new frames are added to it. The combined Dataset is loaded 
+        # before it is written, as part of it is read from the file that is being replaced.
+        with open_output_with_shards(file_name) as ds:
+            ds.load()
+        ds.to_netcdf(file_name, mode="w", unlimited_dims=["time", "name"])
+    else:
+        with open_sharded_output(file_name) as ds:
+            ds.to_netcdf(file_name, mode="w", unlimited_dims=["time", "name"])
+    if remove_shards:
+        for f in shards:
+            os.remove(f)
+
+    return
+
+
+def select_from_output(ds, time=None, ids=None, variables=None):
+    """
+    Selects a subset of frames, bodies, and variables from a raw (lazily opened) Swiftest output Dataset. 
+
+    Parameters
+    ----------
+    ds : xarray dataset
+        Dataset opened from a Swiftest NetCDF file
+    time : int, slice, or array-like of int, optional
+        Positional index or indices of the output frames to select. Default is all frames.
+    ids : int or array-like of int, optional
+        Ids of the bodies to select. Default is all bodies.
+    variables : str or list of str, optional
+        Names of the variables to select. Coordinates are always included. Default is all variables.
+
+    Returns
+    -------
+    ds : xarray dataset
+        Dataset containing only the selected data
+    """
+    if time is not None and "time" in ds.dims:
+        if np.isscalar(time):
+            time = [time]
+        ds = ds.isel(time=time)
+
+    if ids is not None:
+        ids = np.atleast_1d(ids)
+        if "id" in ds.dims:
+            ds = ds.sel(id=ids)
+        elif "id" in ds:
+            count_dim = ds["id"].dims[-1]
+            selected = np.isin(ds["id"].values, ids).reshape(-1, ds.sizes[count_dim]).any(axis=0)
+            ds = ds.isel({count_dim: np.flatnonzero(selected)})
+
+    if variables is not None:
+        if isinstance(variables, str):
+            variables = [variables]
+        missing = [v for v in variables if v not in ds]
+        if len(missing) > 0:
+            raise ValueError(f"Variables not found in the output file: {missing}")
+        ds = ds[list(variables)]
+
+    return ds
+
+
+def _is_fill(da):
+    """
+    Returns True if every value of a raw (not masked) DataArray is equal to its fill value.
+    """
+    fill = da.attrs.get("_FillValue", da.encoding.get("_FillValue"))
+    values = da.values
+    if np.issubdtype(values.dtype, np.floating):
+        isfill = np.isnan(values)
+        if fill is not None and not np.isnan(fill):
+            isfill |= values == fill
+    elif np.issubdtype(values.dtype, np.integer) and fill is not None:
+        isfill = values == fill
+    else:
+        return False
+    return bool(isfill.all())
+
+
+def _frame_is_complete(ds, tslot):
+    """
+    Checks whether the frame in time slot `tslot` of a raw Swiftest output Dataset has been completely written. The writer fills
+    in the number of test particles `ntp` last, so a frame is incomplete as long as its `ntp` value is still the fill value. For
+    files without `ntp`, only the time value is checked.
+    """
+    sentinel = "ntp" if "ntp" in ds else "time"
+    return not _is_fill(ds[sentinel].isel(time=tslot))
+
+
+def tail_output(param, poll_interval=1.0, timeout=None, start=0, max_retries=10, until=None, verbose=False):
+    """
+    Follows a Swiftest NetCDF output file while it is being written by a running simulation. This is a generator that polls 
+    the length of the time dimension, reads only the newly appended frames, and yields them as small Datasets. 
+
+    The file is reopened read-only on every poll and closed again before yielding, so the reader never holds the file open
+    while the Fortran driver appends to it. HDF5 file locking is disabled when swiftest is imported (unless the 
+    `HDF5_USE_FILE_LOCKING` environment variable is already set) so that the reader does not conflict with the writer's lock. 
+    Because a frame is appended one variable at a time, the last frame is only yielded once the length of the time dimension 
+    has been stable for one poll, or when the generator stops, and only once the writer has filled in its `ntp` value. When 
+    `until` returns True, all remaining frames are yielded. Failed opens (for instance, while the writer is in the middle of a
+    dump) are retried after `poll_interval` seconds, including the final read when the generator stops.
+
+    Parameters
+    ----------
+    param : dict
+        Swiftest parameters. `BIN_OUT` must be the path to the output file.
+    poll_interval : float, default 1.0
+        Time in seconds between polls of the output file.
+    timeout : float, optional
+        Stop after this many seconds without any new frames. Default is to follow the file forever.
+    start : int, default 0
+        Index of the first frame to yield. Frames already in the file before this index are skipped.
+    max_retries : int, default 10
+        Number of consecutive failed opens of the file before the exception is raised.
+    until : callable, optional
+        Function with no arguments that is called on every poll. Once it returns True, any remaining frames are read and the 
+        generator stops. This is used to stop following the file when the process writing it has finished.
+    verbose : bool, default False
+        Print out information about the frames that are read
+
+    Yields
+    ------
+    ds : xarray dataset
+        Dataset containing the frames that were appended since the last poll
+    """
+
+    def _read_frames(first, last, finished):
+        # Returns the frames first to last-1, leaving out the last one if it is still being written
+        with xr.open_dataset(param['BIN_OUT'], mask_and_scale=False, cache=False) as ds:
+            if not finished and not _frame_is_complete(ds, last - 1):
+                last -= 1
+            if last <= first:
+                return None, first
+            ds = select_from_output(ds, time=slice(first, last))
+            ds = process_netcdf_input(ds, param)
+            return ds.load(), last
+
+    def _time_length():
+        with xr.open_dataset(param['BIN_OUT'], mask_and_scale=False, cache=False) as ds:
+            return ds.sizes['time']
+
+    nread = start
+    nlast = None
+    nfail = 0
+    last_update = time.monotonic()
+    while True:
+        finished = until is not None and until()
+        timed_out = timeout is not None and time.monotonic() - last_update > timeout
+        try:
+            if os.path.exists(param['BIN_OUT']):
+                ntime = _time_length()
+                # Only treat the newest frame as complete once the file has stopped growing for one poll
+                ncomplete = ntime if (ntime == nlast or finished or timed_out) else ntime - 1
+                nlast = ntime
+                if ncomplete > nread:
+                    ds, ncomplete = _read_frames(nread, ncomplete, finished)
+                    if ds is not None:
+                        if verbose: print(f"Read output frames {nread} to {ncomplete - 1}")
+                        nread = ncomplete
+                        last_update = time.monotonic()
+                        yield ds
+            nfail = 0
+        except (OSError, RuntimeError, KeyError, ValueError):
+            nfail += 1
+            if nfail > max_retries:
+                raise
+            finished = False
+            timed_out = False
+
+        if finished or timed_out:
+            return
+        time.sleep(poll_interval)
+
+
 def _xstrip_nonstr(a):
     """
     Cleans up the string values in the DataSet to remove extra white space
@@ -718,12 +1223,38 @@ def _string_converter(da):
     da : xarray dataset with the strings cleaned up
     """
 
-    da = da.astype('<U32')
-    da = _xstrip_str(da)
+    if da.dtype != np.dtype('<U32'):
+        da = da.astype('<U32')
+
+    # Dask arrays are stripped lazily. In-memory arrays are only stripped if they actually contain padding
+    if da.chunks is not None or _has_padding(da.values):
+        da = _xstrip_str(da)
 
     return da
 
 
+def _has_padding(values):
+    """
+    Checks whether any of the strings in an array have leading or trailing white space. Only the first and last character of 
+    each string are inspected.
+
+    Parameters
+    ----------
+    values : numpy array of str
+
+    Returns
+    -------
+    bool
+    """
+    lengths = np.char.str_len(values).ravel()
+    nonempty = np.flatnonzero(lengths)
+    if nonempty.size == 0:
+        return False
+    codes = np.ascontiguousarray(values).ravel().view(np.uint32).reshape(values.size, -1)
+    ends = np.concatenate((codes[nonempty, 0], codes[nonempty, lengths[nonempty] - 1]))
+    return bool(np.char.isspace(ends.view('<U1')).any())
+
+
 def _char_converter(da):
     """`
     Converts a string to a unicode string
@@ -793,7 +1324,8 @@ def _unclean_string_values(ds):
 
 def fix_types(ds,itype=np.int64,ftype=np.float64):
     """
-    Converts all variables in the dataset to the specified type
+    Converts all variables in the dataset to the specified type. Variables that already have the correct type are left
+    untouched, and Dask-backed variables are converted lazily.
     
     Parameters
     ----------
@@ -810,17 +1342,19 @@ def fix_types(ds,itype=np.int64,ftype=np.float64):
     """
     ds = _clean_string_values(ds)
     for intvar in int_varnames:
-        if intvar in ds:
-            ds[intvar] = ds[intvar].astype(itype)
+        if intvar in ds and ds[intvar].dtype != np.dtype(itype):
+            ds[intvar] = ds[intvar].astype(itype, copy=False)
 
     float_varnames = [x for x in list(ds.keys()) if x not in string_varnames + int_varnames + char_varnames]
 
     for floatvar in float_varnames:
-        ds[floatvar] = ds[floatvar].astype(ftype)
+        if ds[floatvar].dtype != np.dtype(ftype):
+            ds[floatvar] = ds[floatvar].astype(ftype, copy=False)
 
     float_coordnames = [x for x in list(ds.coords) if x not in string_varnames + int_varnames + char_varnames]
     for floatcoord in float_coordnames:
-        ds[floatcoord] = ds[floatcoord].astype(np.float64)
+        if ds[floatcoord].dtype != np.dtype(np.float64):
+            ds[floatcoord] = ds[floatcoord].astype(np.float64, copy=False)
 
 
     return ds
@@ -870,6 +1404,90 @@ def select_active_from_frame(ds, param, framenum=-1):
     return frame
 
 
+def _format_ascii_columns(*columns):
+    """
+    Formats one line of an ASCII input file for every body at once. Each column is converted to strings in a single 
+    vectorized operation, using the same formatting as Python's ``print``, and the columns are joined by single spaces.
+
+    Parameters
+    ----------
+    *columns : xarray DataArray or array-like
+        One-dimensional (body) arrays, or two-dimensional (body, space) arrays, which contribute one column per space 
+        component.
+
+    Returns
+    -------
+    line : string array
+        One formatted line for each body
+    """
+    cols = []
+    for c in columns:
+        if isinstance(c, xr.DataArray) and "space" in c.dims:
+            c = c.transpose(..., "space")
+        c = np.asarray(c)
+        if c.ndim == 2:
+            cols += [c[:, j] for j in range(c.shape[1])]
+        else:
+            cols.append(np.atleast_1d(c))
+    line = cols[0].astype(str)
+    for c in cols[1:]:
+        line = np.char.add(np.char.add(line, ' '), c.astype(str))
+    return line
+
+
+def _format_ascii_orbits(bodies, in_form):
+    """
+    Formats the two lines containing either the position and velocity vectors or the orbital elements of every body in an
+    ASCII input file.
+
+    Parameters
+    ----------
+    bodies : xarray dataset
+        Dataset containing a single frame of body data
+    in_form : str
+        Either "XV" or "EL"
+
+    Returns
+    -------
+    lines : list of string arrays
+        The two formatted lines for each body
+    """
+    if in_form == 'XV':
+        return [_format_ascii_columns(bodies['rh']), _format_ascii_columns(bodies['vh'])]
+    elif in_form == 'EL':
+        return [_format_ascii_columns(bodies['a'], bodies['e'], bodies['inc']),
+                _format_ascii_columns(bodies['capom'], bodies['omega'], bodies['capm'])]
+    print(f"{in_form} is not a valid input format type.")
+    return []
+
+
+def _write_ascii_records(f, nbody, lines, first_record=None):
+    """
+    Writes the body count followed by the multi-line records of all bodies to an ASCII input file with a single buffered 
+    write.
+
+    Parameters
+    ----------
+    f : file object
+        File to write to
+    nbody : int
+        Number of bodies, which is written as the first line of the file
+    lines : list of string arrays
+        Formatted lines, one array per line of a body record, each containing one entry per body
+    first_record : list of str, optional
+        Lines of a record that is written ahead of the formatted records, such as the central body entry of a Swifter massive
+        body file. This record is included in `nbody`.
+    """
+    records = [str(nbody)]
+    if first_record is not None:
+        records += list(first_record)
+        nbody -= 1
+    if nbody > 0 and len(lines) > 0:
+        records += np.stack(lines, axis=1).ravel().tolist()
+    f.write('\n'.join(records) + '\n')
+    return
+
+
 def swiftest_xr2infile(ds, param, in_type="NETCDF_DOUBLE", infile_name=None,framenum=-1,verbose=True):
     """
     Writes a set of Swiftest input files from a single frame of a Swiftest xarray dataset
@@ -907,10 +1525,16 @@ def swiftest_xr2infile(ds, param, in_type="NETCDF_DOUBLE", infile_name=None,fram
         return frame
 
     # All other file types need seperate files for each of the inputs
-    cb = frame.isel(name=0)
-    pl = frame.where(name != cb.name)
-    pl = pl.where(np.invert(np.isnan(pl['Gmass'])), drop=True).drop_vars(['j2rp2', 'j2rp2'],errors="ignore")
-    tp = frame.where(np.isnan(frame['Gmass']), drop=True).drop_vars(['Gmass', 'radius', 'j2rp2', 'j4rp4'],errors="ignore")
+    frame = frame.isel(time=0)
+    if "name" in frame.dims:
+        count_dim = "name"
+    else:
+        count_dim = "id"
+    cb = frame.isel({count_dim: 0})
+    bodies = frame.isel({count_dim: slice(1, None)})
+    ispl = ~np.isnan(bodies['Gmass'].values)
+    pl = bodies.isel({count_dim: ispl})
+    tp = bodies.isel({count_dim: ~ispl})
     
     GMSun = np.double(cb['Gmass'])
     if param['CHK_CLOSE']:
@@ -919,7 +1543,7 @@ def swiftest_xr2infile(ds, param, in_type="NETCDF_DOUBLE", infile_name=None,fram
        RSun = param['CHK_RMIN']
     J2 = np.double(cb['j2rp2'])
     J4 = np.double(cb['j4rp4'])
-    cbname = cb['name'].values[0]
+    cbname = cb['name'].values.item()
     if param['ROTATION']:
         Ip1cb = np.double(cb['Ip'].values[0])
         Ip2cb = np.double(cb['Ip'].values[1])
@@ -942,44 +1566,25 @@ def swiftest_xr2infile(ds, param, in_type="NETCDF_DOUBLE", infile_name=None,fram
             print(rotxcb, rotycb, rotzcb, file=cbfile)
         cbfile.close()
         
-        plfile = open(param['PL_IN'], 'w')
-        print(pl.id.count().values, file=plfile)
-        for i in pl.id:
-            pli = pl.sel(id=i)
-            if param['RHILL_PRESENT']:
-               print(pli['name'].values[0], pli['Gmass'].values[0], pli['rhill'].values[0], file=plfile)
-            else:
-               print(pli['name'].values[0], pli['Gmass'].values[0], file=plfile)
-            if param['CHK_CLOSE']:
-               print(pli['radius'].values[0], file=plfile)
-            if param['IN_FORM'] == 'XV':
-                print(pli['rh'].values[0,0], pli['rh'].values[0,1], pli['rh'].values[0,2], file=plfile)
-                print(pli['vh'].values[0,0], pli['vh'].values[0,1], pli['vh'].values[0,2], file=plfile)
-            elif param['IN_FORM'] == 'EL':
-                print(pli['a'].values[0], pli['e'].values[0], pli['inc'].values[0], file=plfile)
-                print(pli['capom'].values[0], pli['omega'].values[0], pli['capm'].values[0], file=plfile)
-            else:
-                print(f"{param['IN_FORM']} is not a valid input format type.")
-            if param['ROTATION']:
-                print(pli['Ip'].values[0,0], pli['Ip'].values[0,1], pli['Ip'].values[0,2], file=plfile)
-                print(pli['rot'].values[0,0], pli['rot'].values[0,1], pli['rot'].values[0,2], file=plfile)
-        plfile.close()
+        # PL file
+        if param['RHILL_PRESENT']:
+            lines = [_format_ascii_columns(pl['name'], pl['Gmass'], pl['rhill'])]
+        else:
+            lines = [_format_ascii_columns(pl['name'], pl['Gmass'])]
+        if param['CHK_CLOSE']:
+            lines.append(_format_ascii_columns(pl['radius']))
+        lines += _format_ascii_orbits(pl, param['IN_FORM'])
+        if param['ROTATION']:
+            lines.append(_format_ascii_columns(pl['Ip']))
+            lines.append(_format_ascii_columns(pl['rot']))
+        with open(param['PL_IN'], 'w') as plfile:
+            _write_ascii_records(plfile, pl.sizes[count_dim], lines)
         
         # TP file
-        tpfile = open(param['TP_IN'], 'w')
-        print(tp.id.count().values, file=tpfile)
-        for i in tp.id:
-            tpi = tp.sel(id=i)
-            print(tpi['name'].values[0], file=tpfile)
-            if param['IN_FORM'] == 'XV':
-                print(tpi['rh'].values[0,0], tpi['rh'].values[0,1], tpi['rh'].values[0,2], file=tpfile)
-                print(tpi['vh'].values[0,0], tpi['vh'].values[0,1], tpi['vh'].values[0,2], file=tpfile)
-            elif param['IN_FORM'] == 'EL':
-                print(tpi['a'].values[0], tpi['e'].values[0], tpi['inc'].values[0], file=tpfile)
-                print(tpi['capom'].values[0], tpi['omega'].values[0], tpi['capm'].values[0], file=tpfile)
-            else:
-                print(f"{param['IN_FORM']} is not a valid input format type.")
-        tpfile.close()
+        lines = [_format_ascii_columns(tp['name'])]
+        lines += _format_ascii_orbits(tp, param['IN_FORM'])
+        with open(param['TP_IN'], 'w') as tpfile:
+            _write_ascii_records(tpfile, tp.sizes[count_dim], lines)
     else:
         print(f"{in_type} is an unknown file type")
     return
@@ -1023,33 +1628,22 @@ def swifter_xr2infile(ds, param, simdir=os.getcwd, framenum=-1):
     param['J4'] = np.double(cb['j4rp4'])
     
     if param['IN_TYPE'] == 'ASCII':
-        # Swiftest Central body file
-        plfile = open(os.path.join(simdir,param['PL_IN']), 'w')
-        print(pl.id.count().values + 1, file=plfile)
-        print(cb.id.values[0], GMSun, file=plfile)
-        print('0.0 0.0 0.0', file=plfile)
-        print('0.0 0.0 0.0', file=plfile)
-        for i in pl.id:
-            pli = pl.sel(id=i)
-            if param['RHILL_PRESENT']:
-                print(i.values, pli['Gmass'].values, pli['rhill'].values, file=plfile)
-            else:
-                print(i.values, pli['Gmass'].values, file=plfile)
-            if param['CHK_CLOSE']:
-                print(pli['radius'].values, file=plfile)
-            print(pli['rh'].values[0], pli['rh'].values[1], pli['rh'].values[2], file=plfile)
-            print(pli['vh'].values[0], pli['vh'].values[1], pli['vh'].values[2], file=plfile)
-        plfile.close()
+        # Swifter PL file, which includes the central body as the first entry
+        if param['RHILL_PRESENT']:
+            lines = [_format_ascii_columns(pl['id'], pl['Gmass'], pl['rhill'])]
+        else:
+            lines = [_format_ascii_columns(pl['id'], pl['Gmass'])]
+        if param['CHK_CLOSE']:
+            lines.append(_format_ascii_columns(pl['radius']))
+        lines += _format_ascii_orbits(pl, 'XV')
+        cb_record = [f"{cb.id.values[0]} {GMSun}", '0.0 0.0 0.0', '0.0 0.0 0.0']
+        with open(os.path.join(simdir,param['PL_IN']), 'w') as plfile:
+            _write_ascii_records(plfile, pl.id.size + 1, lines, first_record=cb_record)
         
         # TP file
-        tpfile = open(os.path.join(simdir,param['TP_IN']), 'w')
-        print(tp.id.count().values, file=tpfile)
-        for i in tp.id:
-            tpi = tp.sel(id=i)
-            print(i.values, file=tpfile)
-            print(tpi['rh'].values[0], tpi['rh'].values[1], tpi['rh'].values[2], file=tpfile)
-            print(tpi['vh'].values[0], tpi['vh'].values[1], tpi['vh'].values[2], file=tpfile)
-        tpfile.close()
+        lines = [_format_ascii_columns(tp['id'])] + _format_ascii_orbits(tp, 'XV')
+        with open(os.path.join(simdir,param['TP_IN']), 'w') as tpfile:
+            _write_ascii_records(tpfile, tp.id.size, lines)
     else:
         print(f"{param['IN_TYPE']} is an unknown input file type")
 
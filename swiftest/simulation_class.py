@@ -24,11 +24,17 @@ import numpy.typing as npt
 import shutil
 import warnings
 import contextlib
+import concurrent.futures
+import multiprocessing
+import threading
+import asyncio
+import time
 from typing import (
     Literal,
     Dict,
     List,
     Tuple,
+    Callable,
     Any
 )
 from cython import nogil
@@ -42,6 +48,176 @@ def _cwd(newdir):
     finally:
         os.chdir(olddir)
 
+def _run_driver_in_dir(integrator, param_file, simdir, display_style):
+    """
+    Runs the Swiftest driver from inside the simulation directory. This is the target of the child process used by 
+    background runs, so the working directory of the calling process is never changed. The driver output to stdout is
+    discarded, as the run information is written to the log file.
+    """
+    from ._bindings import driver
+
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    os.chdir(simdir)
+    driver(integrator, str(param_file), display_style)
+    return
+
+
+class SimulationRun(object):
+    """
+    Handle to a Swiftest integration running in the background, returned by `Simulation.run(background=True)` and 
+    `Simulation.run_async`. The driver runs in a separate process, and a monitor thread follows the output file to report
+    the progress of the run. The handle can be polled, joined, cancelled, or awaited from asyncio code.
+    """
+
+    def __init__(self, sim, process, dask=False, callback=None, poll_interval=1.0):
+        self.sim = sim
+        self.process = process
+        self.dask = dask
+        self.callback = callback
+        self.cancelled = False
+        self._status = {"time": sim.param['TSTART'], "tstop": sim.param['TSTOP'], "fraction_complete": 0.0, 
+                        "step_rate": 0.0, "energy_error": None, "momentum_error": None, "mass_error": None}
+        self._status_lock = threading.Lock()
+        self._result_lock = threading.Lock()
+        self._finished = False
+        self._wall_start = time.monotonic()
+        self._initial = None
+        self._monitor = threading.Thread(target=self._follow, args=(poll_interval,), daemon=True)
+        self._monitor.start()
+        return
+
+    def _follow(self, poll_interval):
+        """
+        Follows the output file of the run and updates the status after every batch of new frames.
+        """
+        param_tmp = self.sim.param.copy()
+        param_tmp['BIN_OUT'] = os.path.join(self.sim.simdir, self.sim.param['BIN_OUT'])
+        try:
+            for frames in io.tail_output(param_tmp, poll_interval=poll_interval, until=lambda: not self.process.is_alive()):
+                self._update_status(frames)
+        except (OSError, RuntimeError, KeyError, ValueError) as e:
+            warnings.warn(f"Stopped monitoring the background run: {e}",stacklevel=2)
+        return
+
+    def _update_status(self, frames):
+        """
+        Computes the current time, step rate, and conservation errors from a batch of new output frames.
+        """
+        latest = frames.isel(time=-1)
+        conservation = {}
+        if all(v in frames for v in ("TE", "L_orbit", "L_spin", "L_escape", "Gmass", "GMescape")):
+            if self._initial is None:
+                first = frames.isel(time=0)
+                self._initial = {"TE": first['TE'].values, 
+                                 "L_tot": (first['L_orbit'] + first['L_spin'] + first['L_escape']).values,
+                                 "GMtot": first['Gmass'].sum(dim='name', skipna=True).values + first['GMescape'].values}
+            L_tot = (latest['L_orbit'] + latest['L_spin'] + latest['L_escape']).values
+            GMtot = latest['Gmass'].sum(dim='name', skipna=True).values + latest['GMescape'].values
+            conservation["energy_error"] = float((latest['TE'].values - self._initial['TE']) / self._initial['TE'])
+            conservation["momentum_error"] = float(np.linalg.norm(L_tot - self._initial['L_tot']) / 
+                                                   np.linalg.norm(self._initial['L_tot']))
+            conservation["mass_error"] = float((GMtot - self._initial['GMtot']) / self._initial['GMtot'])
+
+        t = float(latest['time'].values)
+        tstart = self.sim.param['TSTART']
+        tstop = self.sim.param['TSTOP']
+        wall = time.monotonic() - self._wall_start
+        with self._status_lock:
+            self._status["time"] = t
+            self._status["fraction_complete"] = (t - tstart) / (tstop - tstart) if tstop > tstart else 1.0
+            self._status["step_rate"] = (t - tstart) / self.sim.param['DT'] / wall if wall > 0 else 0.0
+            self._status.update(conservation)
+            status = dict(self._status)
+        if self.callback is not None:
+            self.callback(status)
+        return
+
+    @property
+    def status(self) -> Dict:
+        """
+        The most recent progress report of the run, as a dictionary with the current simulation `time`, `tstop`, the 
+        `fraction_complete`, the `step_rate` in steps per wall-clock second, and the relative `energy_error`, 
+        `momentum_error`, and `mass_error` (None unless the conservation values are being computed).
+        """
+        with self._status_lock:
+            return dict(self._status)
+
+    def running(self) -> bool:
+        """
+        Returns True if the driver is still running.
+        """
+        return self.process.is_alive()
+
+    def done(self) -> bool:
+        """
+        Returns True if the driver has finished, either normally or because it was cancelled.
+        """
+        return not self.process.is_alive()
+
+    def cancel(self) -> bool:
+        """
+        Stops the run by terminating the driver process. The output written up to this point is left on disk.
+
+        Returns
+        -------
+        bool
+            True if the run was cancelled, False if it had already finished.
+        """
+        if not self.process.is_alive():
+            return False
+        self.process.terminate()
+        self.process.join()
+        self.cancelled = True
+        return True
+
+    def join(self, 
+             timeout: float | None = None
+             ) -> Simulation:
+        """
+        Waits for the run to finish and reads the output into the Simulation, as `Simulation.run` does for a foreground run.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time in seconds to wait. Default is to wait until the run finishes.
+
+        Returns
+        -------
+        Simulation
+            The Simulation object that started the run, with the output data read in.
+
+        Raises
+        ------
+        TimeoutError
+            If the run is still going after `timeout` seconds.
+        RuntimeError
+            If the run was cancelled or the driver did not terminate normally.
+        """
+        self.process.join(timeout)
+        if self.process.is_alive():
+            raise TimeoutError(f"The Swiftest run did not finish within {timeout} seconds")
+        self._monitor.join()
+        if self.cancelled:
+            raise RuntimeError("The Swiftest run was cancelled")
+        if self.process.exitcode != 0:
+            raise RuntimeError(f"The Swiftest driver did not terminate normally (exit code {self.process.exitcode})")
+
+        with self._result_lock:
+            if not self._finished:
+                self.sim.read_encounters = True
+                self.sim.read_collisions = True
+                self.sim.read_output_file(dask=self.dask)
+                self._finished = True
+        return self.sim
+
+    result = join
+
+    def __await__(self):
+        return asyncio.get_running_loop().run_in_executor(None, self.join).__await__()
+
+
 class Simulation(object):
     """
     This is a class that defines the basic Swift/Swifter/Swiftest simulation object
@@ -186,6 +362,28 @@ class Simulation(object):
             Specifies the format for the data saved to the output file. If "XV" then cartesian position and velocity
             vectors for all bodies are stored. If "XVEL" then the orbital elements are also stored.
             Parameter input file equivalent is `OUT_FORM`
+        nc_chunking : {"DEFAULT", "TIMESERIES", "SNAPSHOT"}, default "DEFAULT"
+            Chunk layout of the NetCDF output file. "TIMESERIES" uses chunks that span many output frames of a few bodies,
+            which speeds up reading the history of individual bodies. "SNAPSHOT" uses chunks that span all bodies of a
+            single output frame, which speeds up reading whole frames. "DEFAULT" uses the chunking of the NetCDF library.
+            Only compatible with Swiftest.
+            Parameter input file equivalent is `NC_CHUNKING`
+        nc_chunk_time : int, default 0
+            Number of output frames per chunk along the time dimension. Overrides the value set by `nc_chunking` if greater
+            than 0. With "DEFAULT" chunking, the name dimension is then chunked as in "SNAPSHOT". Only compatible with Swiftest.
+            Parameter input file equivalent is `NC_CHUNK_TIME`
+        nc_chunk_name : int, default 0
+            Number of bodies per chunk along the name dimension. Overrides the value set by `nc_chunking` if greater than 0.
+            With "DEFAULT" chunking, the time dimension is then chunked as in "SNAPSHOT". Only compatible with Swiftest.
+            Parameter input file equivalent is `NC_CHUNK_NAME`
+        nc_deflate_level : int, default 0
+            Level of the zlib compression of the NetCDF output file, from 0 (no compression) to 9. Only compatible with
+            Swiftest.
+            Parameter input file equivalent is `NC_DEFLATE_LEVEL`
+        nc_shuffle : bool, default False
+            Apply the byte shuffle filter to the NetCDF output file, which usually improves the compression of floating
+            point data. Only compatible with Swiftest.
+            Parameter input file equivalent is `NC_SHUFFLE`
         MU : str, default "MSUN"
             The mass unit system to use. Case-insensitive valid options are 
             
@@ -311,15 +509,19 @@ class Simulation(object):
             execute. If false, will start a new run. If the file given by `output_file_name` exists, it will be replaced
             when the run is executed.
             Parameter input file equivalent is `OUT_STAT`
-        interaction_loops : {"TRIANGULAR","FLAT"}, default "TRIANGULAR"
+        interaction_loops : {"TRIANGULAR","FLAT","BLOCKED","AUTO"}, default "TRIANGULAR"
             *Swiftest Experimental feature*
             Specifies which algorithm to use for the computation of body-body gravitational forces.
             
             * "TRIANGULAR" - Upper-triangular double-loops.
             * "FLAT" - Body-body interation pairs are flattened into a 1-D array.
+            * "BLOCKED" - Body-body interaction pairs are computed in cache-sized tiles of bodies.
+            * "AUTO" - Each of the above is timed on the system at the start of the run, and the fastest one is used.
+              The timings are recorded in `interaction_timer.log`, and the choice is made again if the number of
+              bodies changes by more than a factor of 2.
             
             Parameter input file equivalent is `INTERACTION_LOOPS`
-        encounter_check_loops : {"TRIANGULAR","SORTSWEEP"}, default "TRIANGULAR"
+        encounter_check_loops : {"TRIANGULAR","SORTSWEEP","GRID","AUTO"}, default "TRIANGULAR"
             *Swiftest Experimental feature*
             Specifies which algorithm to use for checking whether bodies are in a close encounter state or not.
             
@@ -327,6 +529,11 @@ class Simulation(object):
             * "SORTSWEEP" - A Sort-Sweep algorithm is used to reduce the population of potential close encounter bodies.
               This algorithm is still in development, and does not necessarily speed up the encounter checking.
               Use with caution.
+            * "GRID" - Bodies are binned into a uniform grid of cells with spatial hashing, and only bodies that share a cell
+              are checked for close encounters.
+            * "AUTO" - Each of the above is timed on the system at the start of the run, and the fastest one is used.
+              The timings are recorded in `encounter_check_plpl_timer.log` and `encounter_check_pltp_timer.log`, and 
+              the choice is made again if the number of bodies changes by more than a factor of 2.
               
             Parameter input file equivalent is `ENCOUNTER_CHECK`
         dask : bool, default False
@@ -335,6 +542,28 @@ class Simulation(object):
             If true, will employ Coarrays on test particle structures to run in single program/multiple data parallel mode. 
             In order to use this capability, Swiftest must be compiled for Coarray support. Only certain integrators can use 
             Coarrays. RMVS, WHM, Helio are all compatible, but SyMBA is not, due to the way tp-pl close encounters are handeled.
+        sharded_output : bool, default False
+            If true, each Coarray image writes its own shard of the output file (for instance, "data.img003.nc") instead of 
+            waiting its turn to write into the shared one. The shards are read as a single Dataset by `read_output_file`, and 
+            can be merged into the shared output file with `swiftest.io.merge_sharded_output`. A restarted run appends to its
+            shards, which are combined with the shared output file when read. Only used when `coarray` is True.
+            Parameter input file equivalent is `SHARDED_OUTPUT`
+        coarray_imbalance : float, default 0.1
+            Fractional imbalance of the per-image step time above which the test particles are redistributed between Coarray
+            images at each dump, weighted by the measured cost of each image. Only used when `coarray` is True.
+            Parameter input file equivalent is `COARRAY_IMBALANCE`
+        tree_gravity : bool, default False
+            If true, the accelerations of test particles by massive bodies are computed with a Barnes-Hut octree instead of
+            direct summation. Massive bodies that are within their close encounter radius of a test particle are always
+            computed directly. This is useful when there are many test particles and many massive bodies.
+            Parameter input file equivalent is `TREE_GRAVITY`
+        tree_opening_angle : float, default 0.5
+            Opening angle of the Barnes-Hut octree used when `tree_gravity` is True. Smaller values are more accurate but slower.
+            Parameter input file equivalent is `TREE_THETA`
+        async_output : bool, default False
+            If true, the stored output frames are written to file on a separate writer thread while the integration
+            continues. Requires Swiftest to be compiled with OpenMP, and is not compatible with Coarrays.
+            Parameter input file equivalent is `ASYNC_OUTPUT`
         verbose : bool, default True
             If set to True, then more information is printed by Simulation methods as they are executed. Setting to
             False suppresses most messages other than errors.
@@ -349,6 +578,8 @@ class Simulation(object):
         self.init_cond = xr.Dataset()
         self.encounters = xr.Dataset()
         self.collisions = xr.Dataset()
+        self._staged_bodies = None
+        self._staged_save = False
 
         # Set the location of the parameter input file, choosing the default if it isn't specified.
         self.simdir = Path.cwd() / Path(simdir)
@@ -422,8 +653,11 @@ class Simulation(object):
 
     def run(self,
             dask: bool = False, 
+            background: bool = False,
+            callback: Callable[[Dict], None] | None = None,
+            poll_interval: float = 1.0,
             **kwargs: Any
-            ) -> None:
+            ) -> SimulationRun | None:
         """
         Runs a Swiftest integration. Uses the parameters set by the `param` dictionary unless overridden by keyword
         arguments. Accepts any keyword arguments that can be passed to `set_parameter`.
@@ -432,12 +666,22 @@ class Simulation(object):
         ----------
         dask : bool, default False
             If true, will use Dask to lazily load data (useful for very large datasets)
+        background : bool, default False
+            If true, the driver is started in a separate process and a `SimulationRun` handle is returned immediately. The 
+            output data is read in when the handle is joined. The driver process is started with "spawn" on all platforms, 
+            so the calling script must be protected by an ``if __name__ == "__main__":`` block.
+        callback : callable, optional
+            For background runs, a function that is called with the `SimulationRun.status` dictionary every time new output
+            frames are written.
+        poll_interval : float, default 1.0
+            For background runs, the time in seconds between checks of the output file for progress reports.
         **kwargs : Any
             Any valid keyword arguments accepted by `set_parameter`
 
         Returns
         -------
-        None
+        SimulationRun or None
+            A handle to the background run if `background` is True, otherwise None
         """
 
         if len(kwargs) > 0:
@@ -456,6 +700,12 @@ class Simulation(object):
 
         print(f"Running a {self.codename} {self.integrator} run from tstart={self.param['TSTART']} {self.TU_name} to tstop={self.param['TSTOP']} {self.TU_name}")
 
+        if background:
+            process = multiprocessing.get_context("spawn").Process(target=_run_driver_in_dir, 
+                                                                   args=(self.integrator, self.param_file, self.simdir, "progress"))
+            process.start()
+            return SimulationRun(self, process, dask=dask, callback=callback, poll_interval=poll_interval)
+
         self._run_swiftest_driver()
 
         # Read in new data
@@ -465,6 +715,40 @@ class Simulation(object):
 
         return
 
+    def run_async(self,
+                  dask: bool = False,
+                  callback: Callable[[Dict], None] | None = None,
+                  poll_interval: float = 1.0,
+                  **kwargs: Any
+                  ) -> SimulationRun | None:
+        """
+        Starts a Swiftest integration in the background and returns immediately. This is equivalent to 
+        `run(background=True)`. The returned handle reports the progress of the run and can be joined, cancelled, or awaited.
+
+        Parameters
+        ----------
+        dask : bool, default False
+            If true, will use Dask to lazily load data when the run is joined
+        callback : callable, optional
+            Function that is called with the `SimulationRun.status` dictionary every time new output frames are written.
+        poll_interval : float, default 1.0
+            Time in seconds between checks of the output file for progress reports.
+        **kwargs : Any
+            Any valid keyword arguments accepted by `set_parameter`
+
+        Returns
+        -------
+        SimulationRun
+            Handle to the background run
+
+        Examples
+        --------
+        >>> handle = sim.run_async(tstop=1e6, callback=print)
+        >>> handle.status["fraction_complete"]
+        >>> sim = handle.join()
+        """
+        return self.run(dask=dask, background=True, callback=callback, poll_interval=poll_interval, **kwargs)
+
     def _get_valid_arg_list(self, 
                             arg_list: str | List[str] | None = None, 
                             valid_var: Dict | None = None
@@ -767,6 +1051,11 @@ class Simulation(object):
             "output_file_type": "NETCDF_DOUBLE",
             "output_file_name": None,
             "output_format": "XVEL",
+            "nc_chunking": "DEFAULT",
+            "nc_chunk_time": 0,
+            "nc_chunk_name": 0,
+            "nc_deflate_level": 0,
+            "nc_shuffle": False,
             "MU": "MSUN",
             "DU": "AU",
             "TU": "Y",
@@ -798,6 +1087,11 @@ class Simulation(object):
             "restart": False,
             "encounter_save" : "NONE",
             "coarray" : False,
+            "sharded_output" : False,
+            "coarray_imbalance" : 0.1,
+            "tree_gravity" : False,
+            "tree_opening_angle" : 0.5,
+            "async_output" : False,
             "simdir" : self.simdir,
         }
         param_file = kwargs.pop("param_file",None)
@@ -1035,10 +1329,15 @@ class Simulation(object):
                     rhill_present: bool | None = None,
                     restart: bool | None = None,
                     tides: bool | None = None,
-                    interaction_loops: Literal["TRIANGULAR", "FLAT"] | None = None,
-                    encounter_check_loops: Literal["TRIANGULAR", "SORTSWEEP"] | None = None,
+                    interaction_loops: Literal["TRIANGULAR", "FLAT", "BLOCKED", "AUTO"] | None = None,
+                    encounter_check_loops: Literal["TRIANGULAR", "SORTSWEEP", "GRID", "AUTO"] | None = None,
                     encounter_save: Literal["NONE", "TRAJECTORY", "CLOSEST", "BOTH"] | None = None,
                     coarray: bool | None = None,
+                    sharded_output: bool | None = None,
+                    coarray_imbalance: float | None = None,
+                    tree_gravity: bool | None = None,
+                    tree_opening_angle: float | None = None,
+                    async_output: bool | None = None,
                     verbose: bool | None = None,
                     simdir: str | os.PathLike = None, 
                     **kwargs: Any
@@ -1091,14 +1390,18 @@ class Simulation(object):
             Includes big bodies when performing a discard (Swifter only)
         rhill_present : bool, optional
             Include the Hill's radius with the input files.
-        interaction_loops : {"TRIANGULAR","FLAT"}, default "TRIANGULAR"
+        interaction_loops : {"TRIANGULAR","FLAT","BLOCKED","AUTO"}, default "TRIANGULAR"
             *Swiftest Experimental feature*
             Specifies which algorithm to use for the computation of body-body gravitational forces.
             
             * "TRIANGULAR" : Upper-triangular double-loops .
             * "FLAT" : Body-body interation pairs are flattened into a 1-D array.
+            * "BLOCKED" : Body-body interaction pairs are computed in cache-sized tiles of bodies.
+            * "AUTO" : Each of the above is timed on the system at the start of the run, and the fastest one is used.
+              The timings are recorded in `interaction_timer.log`, and the choice is made again if the number of
+              bodies changes by more than a factor of 2.
             
-        encounter_check_loops : {"TRIANGULAR","SORTSWEEP"}, default "TRIANGULAR"
+        encounter_check_loops : {"TRIANGULAR","SORTSWEEP","GRID","AUTO"}, default "TRIANGULAR"
             *Swiftest Experimental feature*
             Specifies which algorithm to use for checking whether bodies are in a close encounter state or not.
             
@@ -1106,12 +1409,32 @@ class Simulation(object):
             * "SORTSWEEP" : A Sort-Sweep algorithm is used to reduce the population of potential close encounter bodies.
               This algorithm is still in development, and does not necessarily speed up the encounter checking.
               Use with caution.
+            * "GRID" : Bodies are binned into a uniform grid of cells with spatial hashing, and only bodies that share a cell
+              are checked for close encounters.
+            * "AUTO" : Each of the above is timed on the system at the start of the run, and the fastest one is used.
+              The timings are recorded in `encounter_check_plpl_timer.log` and `encounter_check_pltp_timer.log`, and 
+              the choice is made again if the number of bodies changes by more than a factor of 2.
               
         coarray : bool, default False
             If true, will employ Coarrays on test particle structures to run in single program/multiple data parallel mode. 
             In order to use this capability, Swiftest must be compiled for Coarray support. Only certain integrators
             can use Coarrays: RMVS, WHM, Helio are all compatible, but SyMBA is not, due to the way tp-pl close encounters 
             are handeled.           
+        sharded_output : bool, default False
+            If true, each Coarray image writes its own shard of the output file instead of waiting its turn to write into the
+            shared one. The shards can be merged into the shared output file with `swiftest.io.merge_sharded_output`.
+        coarray_imbalance : float, default 0.1
+            Fractional imbalance of the per-image step time above which the test particles are redistributed between Coarray
+            images, weighted by their measured cost.
+        tree_gravity : bool, default False
+            If true, the accelerations of test particles by massive bodies are computed with a Barnes-Hut octree instead of
+            direct summation. Massive bodies that are within their close encounter radius of a test particle are always
+            computed directly.
+        tree_opening_angle : float, default 0.5
+            Opening angle of the Barnes-Hut octree used when `tree_gravity` is True. Smaller values are more accurate but slower.
+        async_output : bool, default False
+            If true, the stored output frames are written to file on a separate writer thread while the integration
+            continues. Requires Swiftest to be compiled with OpenMP, and is not compatible with Coarrays.
         tides : bool, optional
             Turns on tidal model (IN DEVELOPMENT - IGNORED)
         Yarkovsky : bool, optional
@@ -1220,7 +1543,7 @@ class Simulation(object):
                 update_list.append("restart")
 
             if interaction_loops is not None:
-                valid_vals = ["TRIANGULAR", "FLAT"]
+                valid_vals = ["TRIANGULAR", "FLAT", "BLOCKED", "AUTO"]
                 interaction_loops = interaction_loops.upper()
                 if interaction_loops not in valid_vals:
                     msg = f"{interaction_loops} is not a valid option for interaction loops."
@@ -1233,7 +1556,7 @@ class Simulation(object):
                     update_list.append("interaction_loops")
 
             if encounter_check_loops is not None:
-                valid_vals = ["TRIANGULAR", "SORTSWEEP"]
+                valid_vals = ["TRIANGULAR", "SORTSWEEP", "GRID", "AUTO"]
                 encounter_check_loops = encounter_check_loops.upper()
                 if encounter_check_loops not in valid_vals:
                     msg = f"{encounter_check_loops} is not a valid option for interaction loops."
@@ -1262,6 +1585,35 @@ class Simulation(object):
                 if self.codename == "Swiftest":
                     self.param["COARRAY"] = coarray
                     update_list.append("coarray")     
+
+            if sharded_output is not None:
+                if self.codename == "Swiftest":
+                    self.param["SHARDED_OUTPUT"] = sharded_output
+                    update_list.append("sharded_output")
+
+            if coarray_imbalance is not None:
+                if coarray_imbalance < 0.0:
+                    warnings.warn("coarray_imbalance must be non-negative", stacklevel=2)
+                elif self.codename == "Swiftest":
+                    self.param["COARRAY_IMBALANCE"] = coarray_imbalance
+                    update_list.append("coarray_imbalance")
+
+            if tree_gravity is not None:
+                if self.codename == "Swiftest":
+                    self.param["TREE_GRAVITY"] = tree_gravity
+                    update_list.append("tree_gravity")
+
+            if tree_opening_angle is not None:
+                if tree_opening_angle <= 0.0:
+                    warnings.warn("tree_opening_angle must be positive", stacklevel=2)
+                elif self.codename == "Swiftest":
+                    self.param["TREE_THETA"] = tree_opening_angle
+                    update_list.append("tree_opening_angle")
+
+            if async_output is not None:
+                if self.codename == "Swiftest":
+                    self.param["ASYNC_OUTPUT"] = async_output
+                    update_list.append("async_output")
                     
             self.param["TIDES"] = False
                 
@@ -1308,6 +1660,11 @@ class Simulation(object):
                      "interaction_loops": "INTERACTION_LOOPS",
                      "encounter_check_loops": "ENCOUNTER_CHECK",
                      "coarray" : "COARRAY",
+                     "sharded_output" : "SHARDED_OUTPUT",
+                     "coarray_imbalance" : "COARRAY_IMBALANCE",
+                     "tree_gravity" : "TREE_GRAVITY",
+                     "tree_opening_angle" : "TREE_THETA",
+                     "async_output" : "ASYNC_OUTPUT",
                      "restart": "RESTART"
                      }
 
@@ -1557,6 +1914,11 @@ class Simulation(object):
                          output_file_name: os.PathLike | str | None = None,
                          output_format: Literal["XV", "XVEL"] | None = None,
                          restart: bool | None = None,
+                         nc_chunking: Literal["DEFAULT", "TIMESERIES", "SNAPSHOT"] | None = None,
+                         nc_chunk_time: int | None = None,
+                         nc_chunk_name: int | None = None,
+                         nc_deflate_level: int | None = None,
+                         nc_shuffle: bool | None = None,
                          verbose: bool | None = None,
                          **kwargs: Any
                          ) -> Dict[str, Any]:
@@ -1581,6 +1943,18 @@ class Simulation(object):
             vectors for all bodies are stored. If "XVEL" then the orbital elements are also stored.
         restart : bool, optional
             Indicates whether this is a restart of an old run or a new run.
+        nc_chunking : {"DEFAULT", "TIMESERIES", "SNAPSHOT"}, optional
+            Chunk layout of the NetCDF output file. "TIMESERIES" favors reading the history of individual bodies, "SNAPSHOT"
+            favors reading whole output frames, and "DEFAULT" uses the chunking of the NetCDF library. Only compatible with
+            Swiftest.
+        nc_chunk_time : int, optional
+            Number of output frames per chunk along the time dimension. Overrides `nc_chunking` if greater than 0.
+        nc_chunk_name : int, optional
+            Number of bodies per chunk along the name dimension. Overrides `nc_chunking` if greater than 0.
+        nc_deflate_level : int, optional
+            Level of the zlib compression of the NetCDF output file, from 0 (no compression) to 9.
+        nc_shuffle : bool, optional
+            Apply the byte shuffle filter to the NetCDF output file.
         verbose : bool, optional
             If passed, it will override the Simulation object's verbose flag
         **kwargs : Any
@@ -1602,8 +1976,46 @@ class Simulation(object):
         if restart is not None:
             self.restart = restart
             update_list.append("restart")
+
+        storage_list = []
+        if nc_chunking is not None:
+            nc_chunking = nc_chunking.upper()
+            if nc_chunking not in ["DEFAULT", "TIMESERIES", "SNAPSHOT"]:
+                warnings.warn(f"{nc_chunking} is not a valid option for nc_chunking. Setting to DEFAULT",stacklevel=2)
+                nc_chunking = "DEFAULT"
+            self.param["NC_CHUNKING"] = nc_chunking
+            storage_list.append("nc_chunking")
+        if nc_chunk_time is not None:
+            if nc_chunk_time < 0:
+                warnings.warn("nc_chunk_time must be non-negative. Setting to 0",stacklevel=2)
+                nc_chunk_time = 0
+            self.param["NC_CHUNK_TIME"] = int(nc_chunk_time)
+            storage_list.append("nc_chunk_time")
+        if nc_chunk_name is not None:
+            if nc_chunk_name < 0:
+                warnings.warn("nc_chunk_name must be non-negative. Setting to 0",stacklevel=2)
+                nc_chunk_name = 0
+            self.param["NC_CHUNK_NAME"] = int(nc_chunk_name)
+            storage_list.append("nc_chunk_name")
+        if nc_deflate_level is not None:
+            if nc_deflate_level < 0 or nc_deflate_level > 9:
+                warnings.warn("nc_deflate_level must be between 0 and 9. Setting to 0",stacklevel=2)
+                nc_deflate_level = 0
+            self.param["NC_DEFLATE_LEVEL"] = int(nc_deflate_level)
+            storage_list.append("nc_deflate_level")
+        if nc_shuffle is not None:
+            self.param["NC_SHUFFLE"] = nc_shuffle
+            storage_list.append("nc_shuffle")
+        if len(storage_list) > 0 and self.codename != "Swiftest":
+            warnings.warn("NetCDF chunking and compression are only compatible with Swiftest",stacklevel=2)
+            for key in ["NC_CHUNKING", "NC_CHUNK_TIME", "NC_CHUNK_NAME", "NC_DEFLATE_LEVEL", "NC_SHUFFLE"]:
+                self.param.pop(key, None)
+            storage_list = []
+
         if len(update_list) == 0:
-            return {}
+            if len(storage_list) == 0:
+                return {}
+            return self.get_output_files(storage_list, verbose=verbose)
 
         if self.codename == "Swiftest":
             if output_file_type is None:
@@ -1650,7 +2062,7 @@ class Simulation(object):
         else:
             self.param["OUT_STAT"] = "REPLACE"
 
-        output_file_dict = self.get_output_files(update_list, verbose=verbose)
+        output_file_dict = self.get_output_files(update_list + storage_list, verbose=verbose)
 
         return output_file_dict
 
@@ -1685,7 +2097,12 @@ class Simulation(object):
         valid_var = {"output_file_type": "OUT_TYPE",
                      "output_file_name": "BIN_OUT",
                      "output_format": "OUT_FORM",
-                     "restart": "OUT_STAT"
+                     "restart": "OUT_STAT",
+                     "nc_chunking": "NC_CHUNKING",
+                     "nc_chunk_time": "NC_CHUNK_TIME",
+                     "nc_chunk_name": "NC_CHUNK_NAME",
+                     "nc_deflate_level": "NC_DEFLATE_LEVEL",
+                     "nc_shuffle": "NC_SHUFFLE"
                      }
 
         valid_arg, output_file_dict = self._get_valid_arg_list(arg_list, valid_var)
@@ -2150,6 +2567,10 @@ class Simulation(object):
                               ephemeris_id: int | List[int] | None = None,
                               date: str | None = None,
                               source: str = "HORIZONS", 
+                              cache: bool = False,
+                              cache_dir: os.PathLike | str | None = None,
+                              offline: bool = False,
+                              max_workers: int | None = None,
                               **kwargs: Any
                               ) -> None:
         """
@@ -2179,6 +2600,18 @@ class Simulation(object):
         source : str, default "Horizons"
             The source of the ephemerides.
              Currently only the JPL Horizons ephemeris is implemented, so this is ignored.
+        cache : bool, default False
+            If True, ephemerides are read from and saved to an on-disk cache, so that repeated requests for the same bodies on the
+            same date with the same unit system do not query JPL Horizons again. The cache is also enabled if `cache_dir` is passed
+            or `offline` is True.
+        cache_dir : PathLike or str, optional
+            Directory of the ephemeris cache. Defaults to the value of the SWIFTEST_EPHEMERIS_CACHE environment variable if it is 
+            set, or ~/.cache/swiftest/ephemerides otherwise.
+        offline : bool, default False
+            If True, JPL Horizons is never queried, and a FileNotFoundError is raised if any requested body is not in the cache.
+        max_workers : int, optional
+            Maximum number of threads used to fetch bodies that are not in the cache from JPL Horizons concurrently. Defaults to 
+            the ThreadPoolExecutor default.
         **kwargs : Any
             Additional keyword arguments to pass to the query method (i.e. astroquery.Horizons)
             
@@ -2219,11 +2652,18 @@ class Simulation(object):
         if source.upper() != "HORIZONS":
             warnings.warn("Currently only the JPL Horizons ephemeris service is supported",stacklevel=2)
 
-        body_list = []
-        for i,n in enumerate(name):
-            body = init_cond.solar_system_horizons(n, self.param, date, ephemeris_id=ephemeris_id[i],**kwargs)
-            if body is not None:
-                body_list.append(body)
+        if cache or offline or cache_dir is not None:
+            if cache_dir is None:
+                cache_dir = init_cond.default_ephemeris_cache_dir()
+            if self.verbose:
+                print(f"Using the ephemeris cache in {cache_dir}")
+
+        def fetch_body(i):
+            return init_cond.solar_system_horizons(name[i], self.param, date, ephemeris_id=ephemeris_id[i], cache_dir=cache_dir, 
+                                                   offline=offline, **kwargs)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            body_list = [body for body in executor.map(fetch_body, range(len(name))) if body is not None]
 
         #Convert the list receieved from the solar_system_horizons output and turn it into arguments to vec2xr
         if len(body_list) == 0:
@@ -2253,15 +2693,16 @@ class Simulation(object):
                 if np.all(np.isnan(kwargs[k])):
                     kwargs[k] = None
 
-        kwargs['time'] = np.array([self.param['TSTART']])
-        
-        if len(self.data) == 0:
-            maxid = -1
-        else:
-            maxid = self.data.id.max().values[()]
+        maxid = self._get_max_id()
 
         nbodies = kwargs["name"].size
         kwargs['id'] = np.where(kwargs['id'] < 0,np.arange(start=maxid+1,stop=maxid+1+nbodies,dtype=int),kwargs['id'])
+
+        if self._staged_bodies is not None:
+            self._staged_bodies.append(kwargs)
+            return
+
+        kwargs['time'] = np.array([self.param['TSTART']])
         
         dsnew = init_cond.vec2xr(self.param,**kwargs)
 
@@ -2553,10 +2994,7 @@ class Simulation(object):
         rot,nbodies = input_to_array_3d(rot,nbodies)
         Ip,nbodies = input_to_array_3d(Ip,nbodies)
 
-        if len(self.data) == 0:
-            maxid = -1
-        else:
-            maxid = self.data.id.max().values[()]
+        maxid = self._get_max_id()
 
         if id is None:
             id = np.arange(start=maxid+1,stop=maxid+1+nbodies,dtype=int)
@@ -2568,6 +3006,10 @@ class Simulation(object):
             dup_id = np.in1d(id, self.data.id)
             if any(dup_id):
                 raise ValueError(f"Duplicate ids detected: ", *id[dup_id])
+        if self._staged_bodies:
+            dup_id = np.isin(id, np.concatenate([b['id'] for b in self._staged_bodies]))
+            if any(dup_id):
+                raise ValueError(f"Duplicate ids detected: ", *id[dup_id])
 
         time = [self.param['TSTART']]
 
@@ -2577,6 +3019,12 @@ class Simulation(object):
             else: 
                 Gmass = self.GU * mass
 
+        if self._staged_bodies is not None:
+            self._staged_save = True
+            self._staged_bodies.append(dict(name=name, a=a, e=e, inc=inc, capom=capom, omega=omega, capm=capm, id=id,
+                                            Gmass=Gmass, radius=radius, rhill=rhill, Ip=Ip, rh=rh, vh=vh, rot=rot, j2rp2=J2, j4rp4=J4))
+            return
+
         dsnew = init_cond.vec2xr(self.param, name=name, a=a, e=e, inc=inc, capom=capom, omega=omega, capm=capm, id=id,
                                  Gmass=Gmass, radius=radius, rhill=rhill, Ip=Ip, rh=rh, vh=vh,rot=rot, j2rp2=J2, j4rp4=J4, time=time)
 
@@ -2586,6 +3034,118 @@ class Simulation(object):
 
         return
 
+    def _get_max_id(self) -> int:
+        """
+        Returns the largest id value of all bodies in the Dataset and all bodies that are staged to be added to it, or -1 if
+        there are no bodies.
+        """
+        if len(self.data) == 0:
+            maxid = -1
+        else:
+            maxid = self.data.id.max().values[()]
+        if self._staged_bodies:
+            maxid = max(maxid, max(b['id'].max() for b in self._staged_bodies))
+        return maxid
+
+    @contextlib.contextmanager
+    def stage_bodies(self):
+        """
+        Context manager that defers the insertion of bodies into the simulation. Inside the context, calls to `add_body` and 
+        `add_solar_system_body` only store the new bodies in column buffers. When the context exits, all of the staged bodies 
+        are combined with the existing Dataset at once by `commit_bodies`, so the Dataset is combined, type-fixed, and saved 
+        to the initial conditions file only one time. If an exception is raised inside the context, the staged bodies are 
+        discarded. While bodies are staged, they do not yet appear in the data and init_cond instance variables.
+
+        Examples
+        --------
+        >>> sim = swiftest.Simulation()
+        >>> with sim.stage_bodies():
+        ...     sim.add_solar_system_body(["Sun","Jupiter","Saturn"])
+        ...     sim.add_body(name=name_tp, a=a_tp, e=e_tp, inc=inc_tp, capom=capom_tp, omega=omega_tp, capm=capm_tp)
+        """
+        if self._staged_bodies is not None: # Nested contexts are committed by the outermost one
+            yield self
+            return
+        self._staged_bodies = []
+        self._staged_save = False
+        try:
+            yield self
+        except BaseException:
+            self._staged_bodies = None
+            raise
+        else:
+            self.commit_bodies()
+
+    def commit_bodies(self) -> None:
+        """
+        Adds all bodies staged inside of a `stage_bodies` context to the Dataset with a single combine, and saves the initial 
+        conditions file. This is called automatically when the `stage_bodies` context exits.
+
+        Returns
+        -------
+        None
+            Sets the data and init_cond instance variables each with an Xarray Dataset containing the body or bodies that were added
+        """
+        staged = self._staged_bodies
+        self._staged_bodies = None
+        if not staged:
+            return
+
+        # Check for collisions that were not visible to the individual calls, such as between ephemeris ids or between names
+        id = np.concatenate([np.asarray(b['id']) for b in staged])
+        if len(self.data) > 0:
+            id = np.concatenate([np.atleast_1d(self.data['id'].values), id])
+        uid, count = np.unique(id, return_counts=True)
+        if any(count > 1):
+            raise ValueError(f"Duplicate ids detected: ", *uid[count > 1])
+        if "id" not in self.data.dims:
+            name = [np.atleast_1d(np.asarray(b['name'], dtype=str)) for b in staged]
+            if len(self.data) > 0:
+                name.insert(0, np.atleast_1d(self.data['name'].values).astype(str))
+            # The Dataset is only dimensioned by name if the first batch of names is unique, as when adding bodies directly
+            if len(np.unique(name[0])) == len(name[0]):
+                uname, count = np.unique(np.concatenate(name), return_counts=True)
+                if any(count > 1):
+                    raise ValueError(f"Duplicate names detected: ", *uname[count > 1])
+
+        # Massive bodies get default rotation values from vec2xr when they are added one batch at a time
+        if self.param.get('ROTATION', False):
+            for b in staged:
+                if b.get('Gmass') is not None:
+                    if b.get('rot') is None:
+                        b['rot'] = np.zeros((len(b['id']),3))
+                    if b.get('Ip') is None:
+                        b['Ip'] = np.full((len(b['id']),3), 0.4)
+
+        vector_vars = ["rh","vh","Ip","rot"]
+        keys = []
+        for b in staged:
+            keys += [k for k,v in b.items() if v is not None and k not in keys]
+
+        kwargs = {}
+        for k in keys:
+            columns = []
+            for b in staged:
+                n = len(b['id'])
+                v = b.get(k)
+                if v is None:
+                    if k in vector_vars:
+                        v = np.full((n,3), np.nan)
+                    else:
+                        v = np.full(n, np.nan)
+                columns.append(np.asarray(v))
+            kwargs[k] = np.concatenate(columns)
+
+        dsnew = init_cond.vec2xr(self.param, time=np.array([self.param['TSTART']]), **kwargs)
+
+        dsnew = self._combine_and_fix_dsnew(dsnew)
+        # add_body always saves, while add_solar_system_body only saves once there is more than the central body
+        if self._staged_save or dsnew['id'].max() > 0:
+            self.save(verbose=False)
+        self.init_cond = self.data.copy(deep=True)
+
+        return
+
     def _combine_and_fix_dsnew(self,
                                dsnew: xr.Dataset
                                ) -> xr.Dataset:
@@ -2838,10 +3398,15 @@ class Simulation(object):
 
     def read_output_file(self,
                          read_init_cond : bool = True, 
-                         dask : bool = False
+                         dask : bool = False,
+                         time : int | slice | List[int] | npt.NDArray[np.int_] | None = None,
+                         ids : int | List[int] | npt.NDArray[np.int_] | None = None,
+                         variables : str | List[str] | None = None
                          ) -> None:
         """
         Reads in simulation data from an output file and stores it as an Xarray Dataset in the `data` instance variable.
+        The `time`, `ids`, and `variables` arguments select a subset of the output file before it is read, so that only the 
+        selected part of the file is loaded. For instance, `read_output_file(time=-1)` reads only the last frame.
 
         Parameters
         ----------
@@ -2849,6 +3414,12 @@ class Simulation(object):
             Read in an initial conditions file along with the output file. Default is True
         dask : bool, default False
             Use Dask to lazily load data (useful for very large datasets)
+        time : int, slice, or array-like of int, optional
+            Positional index or indices of the output frames to read. Default is all frames. 
+        ids : int or array-like of int, optional
+            Ids of the bodies to read. Default is all bodies.
+        variables : str or list of str, optional
+            Names of the variables to read. Coordinates are always included. Default is all variables.
             
         Returns
         -------
@@ -2863,7 +3434,7 @@ class Simulation(object):
         param_tmp = self.param.copy()
         param_tmp['BIN_OUT'] = os.path.join(self.simdir, self.param['BIN_OUT'])
         if self.codename == "Swiftest":
-            self.data = io.swiftest2xr(param_tmp, verbose=self.verbose, dask=dask)
+            self.data = io.swiftest2xr(param_tmp, verbose=self.verbose, dask=dask, time=time, ids=ids, variables=variables)
             if self.verbose:
                 print('Swiftest simulation data stored as xarray DataSet .data')
             if read_init_cond:
@@ -2891,6 +3462,41 @@ class Simulation(object):
             warnings.warn('Cannot process unknown code type. Call the read_param method with a valid code name. Valid options are "Swiftest", "Swifter", or "Swift".',stacklevel=2)
         return
 
+    def watch(self,
+              poll_interval : float = 1.0,
+              timeout : float | None = None,
+              start : int = 0
+              ):
+        """
+        Follows the output file of a running simulation, yielding each batch of newly written frames as an Xarray Dataset. 
+        This is a thin wrapper around `swiftest.io.tail_output`.
+
+        Parameters
+        ----------
+        poll_interval : float, default 1.0
+            Time in seconds between polls of the output file.
+        timeout : float, optional
+            Stop after this many seconds without any new frames. Default is to follow the file forever.
+        start : int, default 0
+            Index of the first frame to yield.
+
+        Yields
+        ------
+        xarray dataset
+            Dataset containing the frames that were appended since the last poll
+
+        Examples
+        --------
+        >>> for frame in sim.watch(poll_interval=10.0, timeout=600.0):
+        ...     print(frame.time.values)
+        """
+
+        if self.codename != "Swiftest":
+            raise NotImplementedError(f"Following the output of a {self.codename} simulation is not supported.")
+        param_tmp = self.param.copy()
+        param_tmp['BIN_OUT'] = os.path.join(self.simdir, self.param['BIN_OUT'])
+        yield from io.tail_output(param_tmp, poll_interval=poll_interval, timeout=timeout, start=start, verbose=self.verbose)
+
     def read_encounter_file(self, 
                             dask: bool=False
                             ) -> None:
@@ -11,6 +11,9 @@ If not, see: https://www.gnu.org/licenses.
 
 import numpy as np
 import xarray as xr
+
+_TINYVALUE = 4.0e-15 # Tiny value used to prevent floating point errors. Matches the value used in swiftest_orbel.f90
+
 def magnitude(ds,x):
     """
     Computes the magnitude of a vector quantity from a Dataset.
@@ -122,7 +125,8 @@ def follow_swift(ds, ifol=None, nskp=None):
 
 def danby(M, ecc, accuracy=1e-14):
     """
-    Danby's method to solve Kepler's equation. See [1]_ and [2]_ for details.
+    Danby's method to solve Kepler's equation. See [1]_ and [2]_ for details. This is a scalar interface to 
+    :func:`danby_vec`.
 
     Parameters
     ----------
@@ -131,12 +135,12 @@ def danby(M, ecc, accuracy=1e-14):
     ecc : float
         the eccentricity
     accuracy : float
-        the relative accuracy to obtain a solution. Default is 1e-12.
+        the relative accuracy to obtain a solution. Default is 1e-14.
 
     Returns
     ----------
     E : float
-        the eccentric anomaly in radians
+        the eccentric anomaly in radians (or the hyperbolic anomaly if ecc > 1)
 
     References
     __________
@@ -144,97 +148,80 @@ def danby(M, ecc, accuracy=1e-14):
     .. [2] Murray, C.D., Dermott, S.F., 1999. Solar system dynamics, New York, New York. ed, Cambridge University Press.
 
     """
+    E = danby_vec(M, ecc, accuracy=accuracy)
+    if np.ndim(E) == 0:
+        return E.item()
+    return E
 
-    def kepler_root(E, ecc, M, deriv):
-        """
-        The Kepler equation root function. The returned value depends on the value of `deriv`, where::
-        
-            deriv = 0 : 
-                E - e * np.sin(E) - M
-            deriv = 1 : 
-                1 - e * np.cos(E)
-            deriv = 2 : 
-                e * np.sin(E)
-            deriv = 3 : 
-                e * np.cos(E)
-
-        The function will return 0 when E is correct for a given e and M
-
-        Parameters
-        ----------
-        E : float
-            the eccentric anomaly in radians
-        ecc : float
-            the eccentricity
-        M : float
-            the mean anomaly in radians
-        deriv : int between 0 and 3
-            The order of the derivative to compute
 
-        Returns
-        ----------
-        float
-            The value of the Kepler equation root function
-        """
+def danby_vec(M, ecc, accuracy=1e-14, maxloops=50):
+    """
+    Solves Kepler's equation for arrays of orbits using Danby's quartically convergent method. See [1]_ and [2]_ for details.
 
-        if deriv == 0:
-            return E - ecc * np.sin(E) - M
-        elif deriv == 1:
-            return 1.0 - ecc * np.cos(E)
-        elif deriv == 2:
-            return ecc * np.sin(E)
-        elif deriv == 3:
-            return ecc * np.cos(E)
-        else:
-            print(f"deriv={deriv} is undefined")
-            return None
+    The mean anomaly and eccentricity arrays are broadcast against each other. Elements with ecc <= 1 are solved for the 
+    eccentric anomaly E using E - ecc * sin(E) = M, and elements with ecc > 1 are solved for the hyperbolic anomaly F using 
+    ecc * sinh(F) - F = M. Only the elements that have not yet converged are updated on each iteration.
 
-    def delta_ij(E, ecc, M, j):
-        """
-        Danby's intermediate delta functions. This function is recursive for j>1.
+    Parameters
+    ----------
+    M : float array
+        the mean anomaly in radians
+    ecc : float array
+        the eccentricity
+    accuracy : float
+        the relative accuracy to obtain a solution. Default is 1e-14.
+    maxloops : int
+        Maximum number of times to iterate before we give up. Default is 50.
 
-        Parameters
-        ----------
-        E : float
-            the eccentric anomaly in radians
-        ecc : float
-            the eccentricity
-        M : float
-            the mean anomaly in radians
-        j : int between 1 and 3
-            The order of the delta function to compute
+    Returns
+    ----------
+    E : float array
+        the eccentric anomaly (ecc <= 1) or hyperbolic anomaly (ecc > 1) in radians
 
-        Returns
-        ----------
-        float:
-            delta_ij value used in Danby's iterative Kepler equation solver
-        """
-        if j == 1:
-            return -kepler_root(E, ecc, M, 0) / kepler_root(E, ecc, M, 1)
-        elif j == 2:
-            return -kepler_root(E, ecc, M, 0) / (kepler_root(E, ecc, M, 1)
-                                                 - delta_ij(E, ecc, M, 1) * kepler_root(E, ecc, M, 2) / 2.0)
-        elif j == 3:
-            return -kepler_root(E, ecc, M, 0) / (kepler_root(E, ecc, M, 1)
-                                                 + delta_ij(E, ecc, M, 1) * kepler_root(E, ecc, M, 2) / 2.0
-                                                 + delta_ij(E, ecc, M, 2) ** 2 * kepler_root(E, ecc, M,
-                                                                                             3) / 6.0)
-        else:
-            print(f"j = {j} is not a valid input to the delta_ij function")
-
-    # If this is a circular orbit, just return the mean anomaly as the eccentric anomaly
-    if ecc < np.finfo(np.float64).tiny:  # Prevent floating point exception for 0 eccentricity orbits
-        return M
-
-    # Initial guess
-    k = 0.85
-    E = M + np.sign(np.sin(M)) * k * ecc
-    MAXLOOPS = 50  # Maximum number of times to iterate before we give up
-    for i in range(MAXLOOPS):
-        Enew = E + delta_ij(E, ecc, M, 3)
-        if np.abs((Enew - E) / E) < accuracy:
-            return Enew
-        E = Enew
+    References
+    __________
+    .. [1] Danby, J.M.A. 1988. Fundamentals of celestial mechanics. Richmond, Va., U.S.A., Willmann-Bell, 1988. 2nd ed.
+    .. [2] Murray, C.D., Dermott, S.F., 1999. Solar system dynamics, New York, New York. ed, Cambridge University Press.
+    """
+    M, ecc = np.broadcast_arrays(np.asarray(M, dtype=np.float64), np.asarray(ecc, dtype=np.float64))
+    shape = M.shape
+    M = M.ravel()
+    ecc = ecc.ravel()
+    hyper = ecc > 1.0
+
+    # Initial guess. Circular orbits are already solved, as E = M
+    E = np.where(hyper, np.sign(M) * np.log(2 * np.abs(M) / np.where(hyper, ecc, 1.0) + 1.8),
+                 M + np.sign(np.sin(M)) * 0.85 * ecc)
+    E[ecc < np.finfo(np.float64).tiny] = M[ecc < np.finfo(np.float64).tiny]
+    # Elements with a NaN mean anomaly (such as the central body or test particle rows of a Dataset) can never converge, so 
+    # they are left out of the iteration and return NaN
+    active = np.flatnonzero((ecc >= np.finfo(np.float64).tiny) & np.isfinite(M))
+
+    for i in range(maxloops):
+        if active.size == 0:
+            return E.reshape(shape)
+        Ea, ea, Ma, ha = E[active], ecc[active], M[active], hyper[active]
+
+        # The Kepler equation root function and its first three derivatives
+        s = np.where(ha, ea * np.sinh(Ea), ea * np.sin(Ea))
+        c = np.where(ha, ea * np.cosh(Ea), ea * np.cos(Ea))
+        f = np.where(ha, s - Ea - Ma, Ea - s - Ma)
+        fp = np.where(ha, c - 1.0, 1.0 - c)
+        fpp = s
+        fppp = c
+
+        # Danby's intermediate delta functions
+        delta1 = -f / fp
+        delta2 = -f / (fp + 0.5 * delta1 * fpp)
+        delta3 = -f / (fp + 0.5 * delta2 * fpp + delta2**2 * fppp / 6.0)
+        Enew = Ea + delta3
+        E[active] = Enew
+
+        converged = np.abs(delta3) <= accuracy * np.maximum(np.abs(Enew), np.finfo(np.float64).tiny)
+        active = active[~converged]
+
+    if active.size == 0:
+        return E.reshape(shape)
 
     raise RuntimeError("The danby function did not converge on a solution.")
 
@@ -363,34 +350,107 @@ def el2xv_one(mu, a, ecc, inc, Omega, omega, M):
 
 def el2xv_vec(mu, a, ecc, inc, Omega, omega, M):
     """
-    Vectorized call to el2xv_one
+    Array-native conversion from orbital elements to Cartesian position and velocity vectors.
+
+    All arguments are broadcast against each other, so they may have any shape, such as (n) for a set of bodies or
+    (time, n) for an output history, and ``mu`` may be either a scalar or an array that broadcasts against the elements.
+    Elliptic, parabolic, and hyperbolic orbits are all supported. For parabolic orbits, ``a`` is the pericenter distance.
+    For hyperbolic orbits, the magnitude of ``a`` is used, so either sign convention is accepted.
     
     Parameters
     ----------
-    mu : float
+    mu : float or float array
         Central body gravitational constant
-    a : (n) float array
+    a : float array
         semimajor axis
-    ecc : (n) float array
+    ecc : float array
         eccentricity
-    inc : (n) float array
+    inc : float array
         inclination (degrees)
-    Omega : (n) float array
+    Omega : float array
         longitude of ascending node (degrees)
-    omega : (n) float array
+    omega : float array
         argument of periapsis (degrees)
-    M : (n) float array
+    M : float array
         Mean anomaly (degrees)
 
     Returns
     ----------
-    rvec : (n,3) float array
+    rvec : (...,3) float array
         Cartesian position vector
-    vvec : (n,3) float array
+    vvec : (...,3) float array
         Cartesian velocity vector
     """
-    vecfunc = np.vectorize(el2xv_one, signature='(),(),(),(),(),(),()->(3),(3)')
-    return vecfunc(mu, a, ecc, inc, Omega, omega, M)
+    mu, a, ecc, inc, Omega, omega, M = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64) 
+                                                             for x in (mu, a, ecc, inc, Omega, omega, M)])
+    if np.any(ecc < 0.0):
+        print("Error in el2xv! Eccentricity cannot be negative. Setting it to 0")
+    e = np.where(ecc < 0.0, 0.0, ecc)
+    parabola = np.abs(e - 1.0) < 2 * np.finfo(np.float64).eps
+    hyperbola = (e > 1.0) & ~parabola
+    ellipse = ~(parabola | hyperbola)
+
+    sip, cip = np.sin(np.deg2rad(omega)), np.cos(np.deg2rad(omega))
+    so, co = np.sin(np.deg2rad(Omega)), np.cos(np.deg2rad(Omega))
+    si, ci = np.sin(np.deg2rad(inc)), np.cos(np.deg2rad(inc))
+
+    d11 = cip * co - sip * so * ci
+    d12 = cip * so + sip * co * ci
+    d13 = sip * si
+    d21 = -sip * co - cip * so * ci
+    d22 = -sip * so + cip * co * ci
+    d23 = cip * si
+
+    xfac1 = np.zeros_like(e)
+    xfac2 = np.zeros_like(e)
+    vfac1 = np.zeros_like(e)
+    vfac2 = np.zeros_like(e)
+    capm = np.deg2rad(M)
+
+    if np.any(ellipse):
+        ae, ee, mue = a[ellipse], e[ellipse], mu[ellipse]
+        E = danby_vec(capm[ellipse], ee)
+        scap, ccap = np.sin(E), np.cos(E)
+        sqe = np.sqrt(1.0 - ee**2)
+        sqgma = np.sqrt(mue * ae)
+        ri = 1.0 / (ae * (1.0 - ee * ccap))
+        xfac1[ellipse] = ae * (ccap - ee)
+        xfac2[ellipse] = ae * sqe * scap
+        vfac1[ellipse] = -ri * sqgma * scap
+        vfac2[ellipse] = ri * sqgma * sqe * ccap
+
+    if np.any(hyperbola):
+        ah, eh, muh = np.abs(a[hyperbola]), e[hyperbola], mu[hyperbola]
+        F = danby_vec(capm[hyperbola], eh)
+        shcap, chcap = np.sinh(F), np.cosh(F)
+        sqe = np.sqrt(eh**2 - 1.0)
+        sqgma = np.sqrt(muh * ah)
+        ri = 1.0 / (ah * (eh * chcap - 1.0))
+        xfac1[hyperbola] = ah * (eh - chcap)
+        xfac2[hyperbola] = ah * sqe * shcap
+        vfac1[hyperbola] = -ri * sqgma * shcap
+        vfac2[hyperbola] = ri * sqgma * sqe * chcap
+
+    if np.any(parabola):
+        # Barker's equation, z + z**3 / 3 = M, has a closed-form solution
+        ap, mup, Mp = a[parabola], mu[parabola], capm[parabola]
+        w = np.sqrt(2.25 * Mp**2 + 1.0)
+        z = np.cbrt(1.5 * Mp + w) + np.cbrt(1.5 * Mp - w)
+        sqgma = np.sqrt(2 * mup * ap)
+        ri = 1.0 / (ap * (1.0 + z**2))
+        xfac1[parabola] = ap * (1.0 - z**2)
+        xfac2[parabola] = 2 * ap * z
+        vfac1[parabola] = -ri * sqgma * z
+        vfac2[parabola] = ri * sqgma
+
+    rvec = np.stack([d11 * xfac1 + d21 * xfac2,
+                     d12 * xfac1 + d22 * xfac2,
+                     d13 * xfac1 + d23 * xfac2], axis=-1)
+    vvec = np.stack([d11 * vfac1 + d21 * vfac2,
+                     d12 * vfac1 + d22 * vfac2,
+                     d13 * vfac1 + d23 * vfac2], axis=-1)
+
+    return rvec, vvec
 
 
 def xv2el_one(mu,rvec,vvec):
@@ -473,38 +533,221 @@ def xv2el_one(mu,rvec,vvec):
 
 def xv2el_vec(mu, rvec, vvec):
     """
-    Vectorized call to xv2el_one.
+    Array-native conversion from Cartesian position and velocity vectors to orbital elements.
+
+    The position and velocity arrays may have any number of leading dimensions, such as (n,3) for a set of bodies or 
+    (time,n,3) for an output history, and ``mu`` may be either a scalar or an array that broadcasts against the leading 
+    dimensions. Elliptic, parabolic, and hyperbolic orbits are all supported. Hyperbolic orbits are returned with a 
+    negative semimajor axis, and parabolic orbits are returned with the pericenter distance in place of the semimajor axis.
 
     Parameters
     ----------
-    mu : float
+    mu : float or float array
         Central body gravitational constant
-    rvec : (n,3) float array
+    rvec : (...,3) float array
         Cartesian position vector
-    vvec : (n,3) float array
+    vvec : (...,3) float array
         Cartesian velocity vector
 
     Returns
     ----------
-    a : (n) float array
+    a : float array
         semimajor axis
-    ecc : (n) float array
+    ecc : float array
         eccentricity
-    inc : (n) float array
+    inc : float array
         inclination (degrees)
-    Omega : (n) float array
+    Omega : float array
         longitude of ascending node (degrees)
-    omega : (n) float array
+    omega : float array
         argument of periapsis (degrees)
-    M : (n) float array
+    M : float array
         mean anomaly (degrees)
-    varpi : (n) flaot array
+    varpi : float array
         longitude of periapsis (degrees)
-    f : (n) float array
+    f : float array
         true anomaly (degrees)
-    lam : (n) float array
+    lam : float array
         mean longitude (degrees)
     """
+    rvec = np.asarray(rvec, dtype=np.float64)
+    vvec = np.asarray(vvec, dtype=np.float64)
+    rvec, vvec = np.broadcast_arrays(rvec, vvec)
+    mu = np.broadcast_to(np.asarray(mu, dtype=np.float64), rvec.shape[:-1])
+    tiny = np.finfo(np.float64).tiny
+
+    rx, ry, rz = rvec[..., 0], rvec[..., 1], rvec[..., 2]
+    rmag = np.linalg.norm(rvec, axis=-1)
+    vmag2 = np.einsum('...i,...i->...', vvec, vvec)
+    rdotv = np.einsum('...i,...i->...', rvec, vvec)
+    h = np.cross(rvec, vvec)
+    hmag = np.linalg.norm(h, axis=-1)
+
+    rdot = np.sign(rdotv) * np.sqrt(np.maximum(vmag2 - (hmag / rmag)**2, 0.0))
+
+    alpha = 2.0 / rmag - vmag2 / mu
+    parabola = np.abs(0.5 * alpha * rmag) < np.sqrt(_TINYVALUE)
+    hyperbola = (alpha < 0.0) & ~parabola
+    ellipse = ~(parabola | hyperbola)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = np.where(parabola, 0.5 * hmag**2 / mu, 1.0 / alpha)
+        ecc = np.where(parabola, 1.0, np.sqrt(np.abs(1.0 - hmag**2 / (mu * a))))
+        inc = np.arccos(np.clip(h[..., 2] / hmag, -1.0, 1.0))
+
+        goodinc = np.abs(inc) > tiny
+        sO = np.where(goodinc,  np.sign(h[..., 2]) * h[..., 0] / (hmag * np.sin(inc)), 0.0)
+        cO = np.where(goodinc, -np.sign(h[..., 2]) * h[..., 1] / (hmag * np.sin(inc)), 1.0)
+
+        Omega = np.arctan2(sO, cO)
+
+        sof = np.where(goodinc, rz / (rmag * np.sin(inc)), ry / rmag)
+        cof = np.where(goodinc, (rx / rmag + np.sin(Omega) * sof * np.cos(inc)) / np.cos(Omega), rx / rmag)
+
+        of = np.arctan2(sof, cof)
+
+        p = hmag**2 / mu
+        goodecc = ecc > tiny
+        sf = np.where(goodecc, p * rdot / (hmag * ecc), 0.0)
+        cf = np.where(goodecc, (1.0 / ecc) * (p / rmag - 1.0), 1.0)
+
+        f = np.arctan2(sf, cf)
+
+        omega = of - f
+
+        varpi = Omega + omega
+
+        # Compute eccentric, hyperbolic, or parabolic anomaly & mean anomaly in order to get mean longitude
+        E = np.where(goodecc, np.arccos(np.clip(-(rmag - a) / (a * ecc), -1.0, 1.0)), 0.0)
+        E = np.where(rdotv < 0.0, 2 * np.pi - E, E)
+        F = np.arccosh(np.maximum((a - rmag) / (a * ecc), 1.0))
+        F = np.where(rdotv < 0.0, -F, F)
+        D = np.tan(0.5 * f)
+
+        M = np.select([ellipse, hyperbola], [E - ecc * np.sin(E), ecc * np.sinh(F) - F], D * (1.0 + D**2 / 3.0))
+
+    lam = M + varpi
+
+    return a, ecc, np.rad2deg(inc), np.rad2deg(Omega), np.rad2deg(omega), np.rad2deg(M), np.rad2deg(varpi), np.rad2deg(f), np.rad2deg(lam)
+
+
+def _xv2el_kernel(mu, rvec, vvec):
+    """
+    Kernel used by :meth:`SwiftestAccessor.xv2el` that stacks the outputs of :func:`xv2el_vec` along a trailing dimension
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.stack(xv2el_vec(mu, rvec, vvec), axis=-1)
+
+
+def _el2xv_kernel(mu, a, ecc, inc, Omega, omega, M):
+    """
+    Kernel used by :meth:`SwiftestAccessor.el2xv` that wraps :func:`el2xv_vec`
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return el2xv_vec(mu, a, ecc, inc, Omega, omega, M)
+
+
+@xr.register_dataset_accessor("swiftest")
+class SwiftestAccessor(object):
+    """
+    An xarray Dataset accessor, available as ``ds.swiftest``, that derives orbital elements from Cartesian state vectors
+    and vice versa on Swiftest output Datasets. The conversions are applied with ``xr.apply_ufunc``, so Datasets that are
+    backed by Dask arrays (for instance, those read with ``Simulation.read_output_file(dask=True)``) are computed lazily 
+    and in parallel, chunk by chunk.
+    """
+
+    xv2el_varnames = ["a", "e", "inc", "capom", "omega", "capm", "varpi", "f", "lam"]
+    el2xv_varnames = ["a", "e", "inc", "capom", "omega", "capm"]
 
-    vecfunc = np.vectorize(xv2el_one, signature='(),(3),(3)->(),(),(),(),(),(),(),(),()')
-    return vecfunc(mu, rvec, vvec)
\ No newline at end of file
+    def __init__(self, ds):
+        self._ds = ds
+
+
+    def _count_dim(self):
+        """
+        Returns the name of the dimension that indexes bodies in the Dataset
+        """
+        if "name" in self._ds.dims:
+            return "name"
+        return "id"
+
+
+    def _is_central_body(self):
+        """
+        Returns a boolean DataArray that is True for the central body
+        """
+        ds = self._ds
+        count_dim = self._count_dim()
+        if "id" in ds.variables:
+            return ds["id"] == 0
+        return xr.DataArray(np.arange(ds.sizes[count_dim]) == 0, dims=count_dim, coords={count_dim: ds[count_dim]})
+
+
+    def _get_mu(self):
+        """
+        Computes the gravitational parameter used for each body in each frame, which is the central body G*mass of that frame 
+        plus the G*mass of the body itself (test particles contribute nothing).
+
+        Returns
+        -------
+        mu : xarray DataArray
+            Gravitational parameter for each body.
+        is_cb : xarray DataArray
+            Boolean mask that is True for the central body
+        """
+        ds = self._ds
+        count_dim = self._count_dim()
+        is_cb = self._is_central_body()
+        Gmass_cb = ds["Gmass"].where(is_cb).max(dim=count_dim, skipna=True)
+        mu = Gmass_cb + ds["Gmass"].where(~is_cb).fillna(0.0)
+        return mu, is_cb
+
+
+    def xv2el(self):
+        """
+        Computes the orbital elements of all bodies from their heliocentric position and velocity vectors. 
+
+        Returns
+        -------
+        ds : xarray Dataset
+            A copy of the Dataset with the variables ``a``, ``e``, ``inc``, ``capom``, ``omega``, ``capm``, ``varpi``, ``f``, 
+            and ``lam`` added (angles are in degrees). The new variables are chunked like ``rh``, and are lazy if the input 
+            Dataset is backed by Dask arrays. The values for the central body are NaN.
+        """
+        ds = self._ds
+        mu, is_cb = self._get_mu()
+        el = xr.apply_ufunc(_xv2el_kernel, mu, ds["rh"], ds["vh"],
+                            input_core_dims=[[], ["space"], ["space"]],
+                            output_core_dims=[["element"]],
+                            dask="parallelized",
+                            output_dtypes=[np.float64],
+                            dask_gufunc_kwargs={"output_sizes": {"element": len(self.xv2el_varnames)}, "allow_rechunk": True}
+                            )
+        el = el.where(~is_cb)
+        return ds.assign({v: el.isel(element=i, drop=True) for i, v in enumerate(self.xv2el_varnames)})
+
+
+    def el2xv(self):
+        """
+        Computes the heliocentric position and velocity vectors of all bodies from their orbital elements.
+
+        Returns
+        -------
+        ds : xarray Dataset
+            A copy of the Dataset with the variables ``rh`` and ``vh`` added. The new variables are chunked like the 
+            orbital elements, and are lazy if the input Dataset is backed by Dask arrays. The central body is placed at 
+            the origin.
+        """
+        ds = self._ds
+        mu, is_cb = self._get_mu()
+        rh, vh = xr.apply_ufunc(_el2xv_kernel, mu, *[ds[v] for v in self.el2xv_varnames],
+                                input_core_dims=[[]] * (len(self.el2xv_varnames) + 1),
+                                output_core_dims=[["space"], ["space"]],
+                                dask="parallelized",
+                                output_dtypes=[np.float64, np.float64],
+                                dask_gufunc_kwargs={"output_sizes": {"space": 3}}
+                                )
+        space_coords = ds["space"].values if "space" in ds.coords else np.array(["x", "y", "z"])
+        rh = rh.where(~is_cb, 0.0).assign_coords(space=space_coords)
+        vh = vh.where(~is_cb, 0.0).assign_coords(space=space_coords)
+        return ds.assign(rh=rh, vh=vh)
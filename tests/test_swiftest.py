@@ -24,7 +24,11 @@ None
 import swiftest
 import unittest
 import os
+import tempfile
+import warnings
 import numpy as np
+import xarray as xr
+import netCDF4
 from numpy.random import default_rng
 from astroquery.jplhorizons import Horizons
 import datetime
@@ -210,6 +214,891 @@ class TestSwiftest(unittest.TestCase):
             self.assertLess(np.abs(dvarpi_err),dvarpi_limit,msg=f'{dvarpi_err:.2e} /{sim.TU_name} is higher than threshold value of {dvarpi_limit:.2e} "/{sim.TU_name}')
 
         return
+
+    def test_run_async(self):
+        """
+        Tests that a background run reports its progress and gives the same result as a foreground run, without changing the 
+        working directory of the calling process.
+        """
+        print("\ntest_run_async: Tests that a background run matches a foreground run.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=os.path.join(tmpdir, "foreground"), compute_conservation_values=True)
+            sim.add_solar_system_body(major_bodies)
+            sim.set_parameter(tstart=0.0, tstop=1.0, dt=0.01, istep_out=10, dump_cadence=1, integrator="symba")
+            sim.run()
+
+            sim_bg = swiftest.Simulation(simdir=os.path.join(tmpdir, "background"), compute_conservation_values=True)
+            sim_bg.add_solar_system_body(major_bodies)
+            sim_bg.set_parameter(tstart=0.0, tstop=1.0, dt=0.01, istep_out=10, dump_cadence=1, integrator="symba")
+            cwd = os.getcwd()
+            reports = []
+            handle = sim_bg.run_async(callback=reports.append, poll_interval=0.1)
+            self.assertEqual(os.getcwd(), cwd)
+            handle.join()
+            self.assertTrue(handle.done())
+            self.assertGreater(len(reports), 0)
+            self.assertAlmostEqual(handle.status["time"], 1.0)
+            self.assertIsNotNone(handle.status["energy_error"])
+            self.assertTrue(np.allclose(sim.data['rh'].values, sim_bg.data['rh'].values, equal_nan=True))
+        return
+
+    def test_ensemble(self):
+        """
+        Tests that an Ensemble lays out one simulation directory per member with its parameter overrides and perturbations, 
+        and collects the results along a member dimension.
+        """
+        print("\ntest_ensemble: Tests that an ensemble of simulations can be set up, run, and collected.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=os.path.join(tmpdir, "base"), tstop=0.1, dt=0.01, istep_out=5, verbose=False)
+            sim.add_body(name=["Sun", "Planet"], id=[0, 1], a=[np.nan, 1.0], e=[np.nan, 0.05], inc=[np.nan, 1.0], 
+                         capom=[np.nan, 0.0], omega=[np.nan, 0.0], capm=[np.nan, 0.0], Gmass=[4 * np.pi**2, 1e-5], 
+                         radius=[0.005, 1e-5])
+
+            def perturb(member, i):
+                member.data['e'] = member.data['e'] + 0.01 * i
+
+            dt_values = [0.01, 0.02, 0.05]
+            ensemble = swiftest.Ensemble(sim, members=[{"dt" : dt} for dt in dt_values], perturb=perturb, 
+                                         simdir=os.path.join(tmpdir, "ensemble"))
+            ensemble.setup()
+            for i, (member, dt) in enumerate(zip(ensemble.simulations, dt_values)):
+                saved = swiftest.Simulation(simdir=member.simdir, read_param=True, verbose=False)
+                self.assertEqual(saved.param['DT'], dt)
+                self.assertAlmostEqual(float(saved.init_cond['e'].sel(name="Planet").values), 0.05 + 0.01 * i)
+
+            data = ensemble.run(max_workers=3)
+            self.assertEqual(list(data.member.values), ensemble.names)
+            self.assertTrue(np.allclose(data['e'].isel(time=0).sel(name="Planet").values, [0.05, 0.06, 0.07]))
+
+            # A member whose driver stops with an error must not bring down the members running alongside it
+            for member in ensemble.simulations:
+                member.clean()
+            os.remove(ensemble.simulations[0].simdir / ensemble.simulations[0].param['NC_IN'])
+            with self.assertRaises(RuntimeError) as cm:
+                ensemble.run(max_workers=2)
+            self.assertIn(ensemble.names[0], str(cm.exception))
+            for name in ensemble.names[1:]:
+                self.assertNotIn(name, str(cm.exception))
+            for member in ensemble.simulations[1:]:
+                self.assertTrue(os.path.exists(member.simdir / member.param['BIN_OUT']))
+        return
+
+    def test_orbel_conversions(self):
+        """
+        Tests that the array-native orbital element conversion functions match the scalar versions and round-trip elliptic,
+        parabolic, and hyperbolic orbits.
+        """
+        print("\ntest_orbel_conversions: Tests that the vectorized orbital element conversions are correct.")
+
+        n = 200
+        mu = swiftest.GMSun * swiftest.YR2S**2 / swiftest.AU2M**3
+        a = rng.uniform(0.3, 40.0, n)
+        e = rng.uniform(0.0, 0.9, n)
+        inc = rng.uniform(0.0, 180.0, n)
+        capom = rng.uniform(0.0, 360.0, n)
+        omega = rng.uniform(0.0, 360.0, n)
+        capm = rng.uniform(0.0, 360.0, n)
+
+        rh, vh = swiftest.tool.el2xv_vec(mu, a, e, inc, capom, omega, capm)
+        for i in range(n):
+            rh_one, vh_one = swiftest.tool.el2xv_one(mu, a[i], e[i], inc[i], capom[i], omega[i], capm[i])
+            self.assertTrue(np.allclose(rh[i], rh_one, rtol=1e-10, atol=1e-12))
+            self.assertTrue(np.allclose(vh[i], vh_one, rtol=1e-10, atol=1e-12))
+
+        # Leading dimensions and mu broadcasting
+        el = swiftest.tool.xv2el_vec(np.full((2,1), mu), rh.reshape(2, n // 2, 3), vh.reshape(2, n // 2, 3))
+        self.assertEqual(el[0].shape, (2, n // 2))
+        self.assertTrue(np.allclose(el[0].ravel(), a, rtol=1e-10))
+        self.assertTrue(np.allclose(el[1].ravel(), e, rtol=1e-10, atol=1e-10))
+
+        # Hyperbolic and parabolic orbits
+        for e_test, a_test in [(rng.uniform(1.1, 3.0, n), -a), (np.ones(n), a)]:
+            capm_test = rng.uniform(-90.0, 90.0, n)
+            rh, vh = swiftest.tool.el2xv_vec(mu, a_test, e_test, inc, capom, omega, capm_test)
+            el = swiftest.tool.xv2el_vec(mu, rh, vh)
+            self.assertTrue(np.allclose(el[0], a_test, rtol=1e-10))
+            self.assertTrue(np.allclose(el[1], e_test, rtol=1e-10))
+            self.assertTrue(np.allclose(el[5], capm_test, rtol=1e-8, atol=1e-8))
+        return
+
+    def test_danby_vec(self):
+        """
+        Tests that the vectorized Kepler solver solves the elliptic and hyperbolic forms of Kepler's equation.
+        """
+        print("\ntest_danby_vec: Tests that the vectorized Kepler solver is correct.")
+
+        n = 1000
+        M = rng.uniform(-10.0, 10.0, n)
+        ecc = rng.uniform(0.0, 0.99, n)
+        E = swiftest.tool.danby_vec(M, ecc)
+        self.assertTrue(np.allclose(E - ecc * np.sin(E), M, rtol=0.0, atol=1e-12))
+        self.assertAlmostEqual(swiftest.tool.danby(M[0], ecc[0]), E[0], places=12)
+
+        ecc = rng.uniform(1.01, 10.0, n)
+        F = swiftest.tool.danby_vec(M.reshape(10, 100), ecc.reshape(10, 100))
+        self.assertEqual(F.shape, (10, 100))
+        self.assertTrue(np.allclose(ecc * np.sinh(F.ravel()) - F.ravel(), M, rtol=0.0, atol=1e-12))
+
+        M[::7] = np.nan
+        F = swiftest.tool.danby_vec(M, ecc)
+        self.assertTrue(np.isnan(F[::7]).all())
+        self.assertTrue(np.isfinite(np.delete(F, np.s_[::7])).all())
+        return
+
+    def test_accessor(self):
+        """
+        Tests that the swiftest Dataset accessor converts between orbital elements and state vectors, including on Dask-backed
+        Datasets.
+        """
+        print("\ntest_accessor: Tests that the swiftest Dataset accessor round-trips orbital elements.")
+
+        ntime = 4
+        nbody = 6
+        name = ["Sun"] + [f"Body_{i}" for i in range(1, nbody)]
+        shape = (ntime, nbody)
+        el = {"a": rng.uniform(0.3, 5.0, shape),
+              "e": rng.uniform(0.0, 0.5, shape),
+              "inc": rng.uniform(0.0, 30.0, shape),
+              "capom": rng.uniform(0.0, 360.0, shape),
+              "omega": rng.uniform(0.0, 360.0, shape),
+              "capm": rng.uniform(0.0, 360.0, shape)}
+        Gmass = np.full(shape, np.nan)
+        Gmass[:, 0] = 4 * np.pi**2
+        Gmass[:, 1] = 1e-3
+        ds = xr.Dataset({k: (("time", "name"), v) for k, v in el.items()},
+                       coords={"time": np.arange(ntime, dtype=np.float64), "name": name, "space": ["x", "y", "z"]})
+        ds["Gmass"] = (("time", "name"), Gmass)
+        ds["id"] = ("name", np.arange(nbody))
+        ds["a"][:, 0] = np.nan
+
+        xv = ds.swiftest.el2xv()
+        self.assertEqual(xv["rh"].dims, ("time", "name", "space"))
+        self.assertTrue(np.all(xv["rh"].sel(name="Sun").values == 0.0))
+
+        xv = xv.drop_vars(list(el.keys())).chunk({"time": 2})
+        el_new = xv.swiftest.xv2el()
+        self.assertIsNotNone(el_new["a"].chunks)
+        el_new = el_new.compute()
+        self.assertTrue(np.all(np.isnan(el_new["a"].sel(name="Sun").values)))
+        for k in ["a", "e"]:
+            self.assertTrue(np.allclose(el_new[k].isel(name=slice(1, None)), ds[k].isel(name=slice(1, None)), rtol=1e-10))
+        return
+
+    def test_swifter2xr(self):
+        """
+        Tests that a Swifter bin.dat file is read correctly, both all at once and in chunks of frames.
+        """
+        print("\ntest_swifter2xr: Tests that Swifter binary output files can be read.")
+        from scipy.io import FortranFile
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            param = {"BIN_OUT": os.path.join(tmpdir, "bin.dat"), "OUT_FORM": "XV"}
+            nframes = 5
+            rh = {}
+            with FortranFile(param["BIN_OUT"], "w") as f:
+                for k in range(nframes):
+                    plid = np.arange(2, 6 - k // 3, dtype=np.int32)
+                    tpid = np.arange(100, 103, dtype=np.int32)
+                    f.write_record(np.array([k * 0.5]), np.array([plid.size + 1], dtype=np.int32), 
+                                   np.array([tpid.size], dtype=np.int32), np.array([1], dtype=np.int32))
+                    for i in plid:
+                        rh[(k, i)] = rng.uniform(-1.0, 1.0, 3)
+                        f.write_record(np.array([i], dtype=np.int32), np.array([1e-5]), np.array([1e-6]), rh[(k, i)], np.zeros(3))
+                    for i in tpid:
+                        rh[(k, i)] = rng.uniform(-1.0, 1.0, 3)
+                        f.write_record(np.array([i], dtype=np.int32), rh[(k, i)], np.zeros(3))
+
+            ds = swiftest.io.swifter2xr(param, verbose=False)
+            self.assertEqual(ds.sizes["time"], nframes)
+            self.assertEqual(list(ds.id.values), [2, 3, 4, 5, 100, 101, 102])
+            for (k, i), v in rh.items():
+                self.assertTrue(np.allclose(ds["rh"].isel(time=k).sel(id=i).values, v))
+            self.assertTrue(np.isnan(ds["rh"].isel(time=-1).sel(id=5).values).all())
+            self.assertTrue(np.isnan(ds["Gmass"].sel(id=100).values).all())
+
+            chunks = list(swiftest.io.swifter2xr_chunks(param, chunk_size=2, verbose=False))
+            self.assertEqual([c.sizes["time"] for c in chunks], [2, 2, 1])
+            self.assertTrue(xr.concat(chunks, dim="time").identical(ds))
+        return
+
+    def test_swifter_xr2infile(self):
+        """
+        Tests that the Swifter ASCII input files written column by column are identical to the ones written one body at a time.
+        """
+        print("\ntest_swifter_xr2infile: Tests that Swifter ASCII input files match the per-body writer.")
+
+        def write_per_body(frame, param, simdir):
+            # Reference writer that prints one body at a time
+            frame = frame.swap_dims({"name" : "id"}).reset_coords("name")
+            cb = frame.where(frame.id == 0, drop=True)
+            pl = frame.where(frame.id > 0, drop=True)
+            pl = pl.where(np.invert(np.isnan(pl['Gmass'])), drop=True)
+            tp = frame.where(np.isnan(frame['Gmass']), drop=True)
+            with open(os.path.join(simdir, param['PL_IN']), 'w') as plfile:
+                print(pl.id.count().values + 1, file=plfile)
+                print(cb.id.values[0], np.double(cb['Gmass'].values[0]), file=plfile)
+                print('0.0 0.0 0.0', file=plfile)
+                print('0.0 0.0 0.0', file=plfile)
+                for i in pl.id:
+                    pli = pl.sel(id=i)
+                    if param['RHILL_PRESENT']:
+                        print(i.values, pli['Gmass'].values, pli['rhill'].values, file=plfile)
+                    else:
+                        print(i.values, pli['Gmass'].values, file=plfile)
+                    if param['CHK_CLOSE']:
+                        print(pli['radius'].values, file=plfile)
+                    print(pli['rh'].values[0], pli['rh'].values[1], pli['rh'].values[2], file=plfile)
+                    print(pli['vh'].values[0], pli['vh'].values[1], pli['vh'].values[2], file=plfile)
+            with open(os.path.join(simdir, param['TP_IN']), 'w') as tpfile:
+                print(tp.id.count().values, file=tpfile)
+                for i in tp.id:
+                    tpi = tp.sel(id=i)
+                    print(i.values, file=tpfile)
+                    print(tpi['rh'].values[0], tpi['rh'].values[1], tpi['rh'].values[2], file=tpfile)
+                    print(tpi['vh'].values[0], tpi['vh'].values[1], tpi['vh'].values[2], file=tpfile)
+            return
+
+        npl = 4
+        ntp = 3
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=tmpdir, init_cond_format="XV", verbose=False)
+            sim.add_body(name="Sun", id=0, rh=[0.0, 0.0, 0.0], vh=[0.0, 0.0, 0.0], Gmass=4 * np.pi**2, radius=0.005, 
+                         rhill=0.0, J2=0.0, J4=0.0)
+            sim.add_body(id=np.arange(1, npl + 1), rh=rng.uniform(-5.0, 5.0, (npl, 3)), vh=rng.uniform(-1.0, 1.0, (npl, 3)), 
+                         Gmass=rng.uniform(1e-6, 1e-3, npl), radius=rng.uniform(1e-5, 1e-4, npl), 
+                         rhill=rng.uniform(1e-3, 1e-2, npl))
+            sim.add_body(id=np.arange(100, 100 + ntp), rh=rng.uniform(-5.0, 5.0, (ntp, 3)), vh=rng.uniform(-1.0, 1.0, (ntp, 3)))
+            frame = sim.data.isel(time=-1)
+
+            for rhill_present in (False, True):
+                for chk_close in (False, True):
+                    param = {"IN_TYPE": "ASCII", "PL_IN": "pl.in", "TP_IN": "tp.in", "CHK_RMIN": 0.005, 
+                             "RHILL_PRESENT": rhill_present, "CHK_CLOSE": chk_close}
+                    golden = os.path.join(tmpdir, f"golden_{rhill_present}_{chk_close}")
+                    os.mkdir(golden)
+                    write_per_body(frame, param, golden)
+                    swiftest.io.swifter_xr2infile(sim.data, param, simdir=tmpdir)
+                    for f in ("pl.in", "tp.in"):
+                        with open(os.path.join(golden, f)) as expected, open(os.path.join(tmpdir, f)) as written:
+                            self.assertEqual(written.read(), expected.read())
+        return
+
+    def test_stage_bodies(self):
+        """
+        Tests that adding bodies inside of a stage_bodies context gives the same Dataset as adding them one call at a time.
+        """
+        print("\ntest_stage_bodies: Tests that staged body insertion matches direct insertion.")
+
+        def add_bodies(sim):
+            sim.add_body(name=["Sun", "Planet"], id=[0, 1], a=[np.nan, 1.0], e=[np.nan, 0.05], inc=[np.nan, 1.0], 
+                         capom=[np.nan, 0.0], omega=[np.nan, 0.0], capm=[np.nan, 0.0], Gmass=[4 * np.pi**2, 1e-5], 
+                         radius=[0.005, 1e-5])
+            for i in range(5):
+                sim.add_body(a=[1.5, 2.0], e=[0.1, 0.2], inc=[0.0, 5.0], capom=[0.0, 10.0], omega=[0.0, 20.0], capm=[i, 2 * i])
+            return
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=os.path.join(tmpdir, "direct"), rotation=True, verbose=False)
+            add_bodies(sim)
+
+            sim_staged = swiftest.Simulation(simdir=os.path.join(tmpdir, "staged"), rotation=True, verbose=False)
+            with sim_staged.stage_bodies():
+                add_bodies(sim_staged)
+                self.assertEqual(len(sim_staged.data), 0)
+
+            self.assertTrue(sim.data.identical(sim_staged.data))
+            self.assertTrue(os.path.exists(os.path.join(tmpdir, "staged", "init_cond.nc")))
+
+            # Name collisions between batches are caught at commit, and the staged bodies are discarded on errors
+            with self.assertRaises(ValueError):
+                with sim_staged.stage_bodies():
+                    sim_staged.add_body(name="Planet", a=3.0, e=0.0, inc=0.0, capom=0.0, omega=0.0, capm=0.0)
+            with self.assertRaises(KeyboardInterrupt):
+                with sim_staged.stage_bodies():
+                    sim_staged.add_body(name="Extra", a=3.0, e=0.0, inc=0.0, capom=0.0, omega=0.0, capm=0.0)
+                    raise KeyboardInterrupt
+            self.assertIsNone(sim_staged._staged_bodies)
+            self.assertTrue(sim.data.identical(sim_staged.data))
+        return
+
+    def test_tree_gravity_param(self):
+        """
+        Tests that the tree gravity feature is written to and read back from the parameter file.
+        """
+        print("\ntest_tree_gravity_param: Tests that the tree gravity parameters round trip through the parameter file.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=tmpdir, tree_gravity=True, tree_opening_angle=0.7, verbose=False)
+            feature = sim.get_feature(["tree_gravity", "tree_opening_angle"], verbose=False)
+            self.assertTrue(feature["TREE_GRAVITY"])
+            self.assertEqual(feature["TREE_THETA"], 0.7)
+            sim.write_param()
+
+            param = swiftest.io.read_swiftest_param(os.path.join(tmpdir, "param.in"), {}, verbose=False)
+            self.assertTrue(param["TREE_GRAVITY"])
+            self.assertEqual(param["TREE_THETA"], 0.7)
+
+            with self.assertWarns(UserWarning):
+                sim.set_feature(tree_opening_angle=-1.0)
+            self.assertEqual(sim.param["TREE_THETA"], 0.7)
+        return
+
+    def test_block_interactions(self):
+        """
+        Tests that the BLOCKED interaction loops give the same result as the TRIANGULAR ones for a system that spans several
+        tiles, including semi-interacting bodies in SyMBA.
+        """
+        print("\ntest_block_interactions: Tests that the BLOCKED interaction loops match the TRIANGULAR ones.")
+
+        npl = 300
+        a_pl = rng.uniform(1.0, 5.0, npl)
+        capm_pl = rng.uniform(0.0, 360.0, npl)
+        Gmass_pl = np.where(np.arange(npl) % 3 == 0, 1e-6, 1e-10)
+        name_pl = [f"Body_{i:03}" for i in range(npl)]
+
+        rh = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for integrator in ["helio", "symba"]:
+                for loops in ["TRIANGULAR", "BLOCKED"]:
+                    sim = swiftest.Simulation(simdir=os.path.join(tmpdir, f"{integrator}_{loops}"), integrator=integrator,
+                                              interaction_loops=loops, tstart=0.0, tstop=0.1, dt=0.001, istep_out=100,
+                                              dump_cadence=0, verbose=False)
+                    if integrator == "symba":
+                        sim.set_parameter(gmtiny=1e-8, verbose=False)
+                    sim.add_body(name="Sun", id=0, a=np.nan, e=np.nan, inc=np.nan, capom=np.nan, omega=np.nan, capm=np.nan,
+                                 Gmass=4 * np.pi**2, radius=0.005)
+                    sim.add_body(name=name_pl, a=a_pl, e=np.full(npl, 0.05), inc=np.full(npl, 1.0), capom=np.zeros(npl),
+                                 omega=np.zeros(npl), capm=capm_pl, Gmass=Gmass_pl, radius=np.full(npl, 1e-6))
+                    sim.run()
+                    rh[integrator, loops] = sim.data['rh'].isel(time=-1).sel(name=name_pl)
+
+            for integrator in ["helio", "symba"]:
+                self.assertTrue(np.allclose(rh[integrator, "BLOCKED"].values, rh[integrator, "TRIANGULAR"].values, rtol=1e-10,
+                                            atol=0.0), msg=f"{integrator}: BLOCKED and TRIANGULAR interaction loops differ")
+        return
+
+    def test_flat_interactions(self):
+        """
+        Tests that the FLAT interaction loops, which recover the pair indices of each chunk of the flattened upper triangular
+        matrix on the fly, give the same accelerations and energies as the TRIANGULAR ones.
+        """
+        print("\ntest_flat_interactions: Tests that the FLAT interaction loops match the TRIANGULAR ones.")
+
+        # 92 bodies give one full chunk of 4096 pairs and a partial one, and 200 bodies give several chunks that start partway
+        # through a row of the matrix
+        for npl in [92, 200]:
+            a_pl = rng.uniform(1.0, 5.0, npl)
+            capm_pl = rng.uniform(0.0, 360.0, npl)
+            Gmass_pl = np.where(np.arange(npl) % 3 == 0, 1e-6, 1e-10)
+            name_pl = [f"Body_{i:03}" for i in range(npl)]
+
+            out = {}
+            with tempfile.TemporaryDirectory() as tmpdir:
+                for integrator in ["helio", "symba"]:
+                    for loops in ["TRIANGULAR", "FLAT"]:
+                        sim = swiftest.Simulation(simdir=os.path.join(tmpdir, f"{integrator}_{loops}"), integrator=integrator,
+                                                  interaction_loops=loops, tstart=0.0, tstop=0.1, dt=0.001, istep_out=100,
+                                                  dump_cadence=0, compute_conservation_values=True, verbose=False)
+                        if integrator == "symba":
+                            sim.set_parameter(gmtiny=1e-8, verbose=False)
+                        sim.add_body(name="Sun", id=0, a=np.nan, e=np.nan, inc=np.nan, capom=np.nan, omega=np.nan,
+                                     capm=np.nan, Gmass=4 * np.pi**2, radius=0.005)
+                        sim.add_body(name=name_pl, a=a_pl, e=np.full(npl, 0.05), inc=np.full(npl, 1.0), capom=np.zeros(npl),
+                                     omega=np.zeros(npl), capm=capm_pl, Gmass=Gmass_pl, radius=np.full(npl, 1e-6))
+                        sim.run()
+                        out[integrator, loops] = sim.data.isel(time=-1)
+
+            for integrator in ["helio", "symba"]:
+                flat = out[integrator, "FLAT"]
+                tri = out[integrator, "TRIANGULAR"]
+                self.assertTrue(np.allclose(flat['rh'].sel(name=name_pl).values, tri['rh'].sel(name=name_pl).values,
+                                            rtol=1e-10, atol=0.0), msg=f"{integrator}, npl = {npl}: FLAT positions differ")
+                self.assertAlmostEqual(float(flat['PE']), float(tri['PE']), delta=1e-12 * abs(float(tri['PE'])),
+                                       msg=f"{integrator}, npl = {npl}: FLAT potential energy differs")
+        return
+
+    def test_async_output(self):
+        """
+        Tests that the asynchronous output writer produces the same output file as the synchronous one, including the
+        conservation values and a test particle that is discarded partway through the run.
+        """
+        print("\ntest_async_output: Tests that the asynchronous output writer matches the synchronous one.")
+
+        ntp = 10
+        name_tp = [f"TestParticle_{i:02}" for i in range(ntp)]
+        a_tp = rng.uniform(0.5, 3.0, ntp)
+        capm_tp = rng.uniform(0.0, 360.0, ntp)
+        e_tp = np.full(ntp, 0.05)
+        # This one dives into the Sun at its first perihelion passage and is discarded
+        a_tp[0] = 1.0
+        e_tp[0] = 0.999
+        capm_tp[0] = 300.0
+
+        data = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for async_output in [False, True]:
+                sim = swiftest.Simulation(simdir=os.path.join(tmpdir, f"async_{async_output}"), integrator="symba",
+                                          async_output=async_output, tstart=0.0, tstop=1.0, dt=0.01, istep_out=5,
+                                          dump_cadence=3, compute_conservation_values=True, verbose=False)
+                sim.add_solar_system_body(major_bodies)
+                sim.add_body(name=name_tp, a=a_tp, e=e_tp, inc=np.full(ntp, 1.0), capom=np.zeros(ntp), omega=np.zeros(ntp),
+                             capm=capm_tp)
+                sim.run()
+                data[async_output] = sim.data.load()
+
+            self.assertEqual(data[True].sizes, data[False].sizes)
+            self.assertEqual(set(data[True].data_vars), set(data[False].data_vars))
+            for var in data[False].data_vars:
+                self.assertTrue(data[True][var].equals(data[False][var]), msg=f"{var} differs between async and sync output")
+        return
+
+    def test_snapshot_output(self):
+        """
+        Tests that buffering many snapshots between dumps gives the same output file as writing each frame as it is taken,
+        including the particle information of a test particle that is discarded while frames are buffered.
+        """
+        print("\ntest_snapshot_output: Tests that buffered snapshots are written the same as immediate ones.")
+
+        ntp = 10
+        name_tp = [f"TestParticle_{i:02}" for i in range(ntp)]
+        a_tp = rng.uniform(0.5, 3.0, ntp)
+        capm_tp = rng.uniform(0.0, 360.0, ntp)
+        e_tp = np.full(ntp, 0.05)
+        # This one dives into the Sun at its first perihelion passage and is discarded
+        a_tp[0] = 1.0
+        e_tp[0] = 0.999
+        capm_tp[0] = 300.0
+
+        data = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for dump_cadence in [1, 20]:
+                sim = swiftest.Simulation(simdir=os.path.join(tmpdir, f"dump_{dump_cadence}"), integrator="symba",
+                                          tstart=0.0, tstop=1.0, dt=0.01, istep_out=5, dump_cadence=dump_cadence,
+                                          compute_conservation_values=True, verbose=False)
+                sim.add_solar_system_body(major_bodies)
+                sim.add_body(name=name_tp, a=a_tp, e=e_tp, inc=np.full(ntp, 1.0), capom=np.zeros(ntp), omega=np.zeros(ntp),
+                             capm=capm_tp)
+                sim.run()
+                data[dump_cadence] = sim.data.load()
+
+            buffered = data[20]
+            immediate = data[1]
+            self.assertTrue(np.isfinite(buffered['discard_time'].sel(name=name_tp[0]).values))
+            self.assertEqual(buffered.sizes, immediate.sizes)
+            self.assertEqual(set(buffered.data_vars), set(immediate.data_vars))
+            for var in immediate.data_vars:
+                self.assertTrue(buffered[var].equals(immediate[var]), msg=f"{var} differs between buffered and immediate output")
+        return
+
+    def test_kepler_drift(self):
+        """
+        Tests that the batched Kepler drift of test particles orbiting the Sun matches the analytic two-body solution, for
+        enough bodies to fill several batches and a range of eccentricities that covers each of the solution methods.
+        """
+        print("\ntest_kepler_drift: Tests that the batched Kepler drift matches the two-body solution.")
+
+        ntp = 300
+        mu = 4 * np.pi**2
+        tstop = 0.1
+        name_tp = [f"TestParticle_{i:03}" for i in range(ntp)]
+        a_tp = rng.uniform(0.5, 3.0, ntp)
+        e_tp = np.concatenate([rng.uniform(0.0, 1e-3, ntp // 3), rng.uniform(0.0, 0.5, ntp // 3),
+                               rng.uniform(0.5, 0.99, ntp - 2 * (ntp // 3))])
+        inc_tp = rng.uniform(0.0, 30.0, ntp)
+        capom_tp = rng.uniform(0.0, 360.0, ntp)
+        omega_tp = rng.uniform(0.0, 360.0, ntp)
+        capm_tp = rng.uniform(0.0, 360.0, ntp)
+
+        n_tp = np.rad2deg(np.sqrt(mu / a_tp**3))
+        rh_expected, _ = swiftest.tool.el2xv_vec(mu, a_tp, e_tp, inc_tp, capom_tp, omega_tp, capm_tp + n_tp * tstop)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for integrator in ["whm", "helio"]:
+                sim = swiftest.Simulation(simdir=os.path.join(tmpdir, integrator), integrator=integrator, tstart=0.0,
+                                          tstop=tstop, dt=0.001, istep_out=100, dump_cadence=0, general_relativity=False,
+                                          verbose=False)
+                sim.add_body(name="Sun", id=0, a=np.nan, e=np.nan, inc=np.nan, capom=np.nan, omega=np.nan, capm=np.nan,
+                             Gmass=mu, radius=0.005)
+                # A distant massive body with a negligible mass, so that the test particles are only drifted
+                sim.add_body(name="Distant", a=1000.0, e=0.0, inc=0.0, capom=0.0, omega=0.0, capm=0.0, Gmass=1e-30,
+                             radius=1e-10)
+                sim.add_body(name=name_tp, a=a_tp, e=e_tp, inc=inc_tp, capom=capom_tp, omega=omega_tp, capm=capm_tp)
+                sim.run()
+                rh = sim.data['rh'].isel(time=-1).sel(name=name_tp).values
+                err = np.abs(rh - rh_expected).max()
+                self.assertLess(err, 1e-10, msg=f"{integrator}: Kepler drift position error {err:.2e} too large")
+        return
+
+    def test_netcdf_storage_param(self):
+        """
+        Tests that the NetCDF chunking and compression parameters are written to and read back from the parameter file.
+        """
+        print("\ntest_netcdf_storage_param: Tests that the NetCDF storage parameters round trip through the parameter file.")
+
+        expected = {"NC_CHUNKING": "SNAPSHOT", "NC_CHUNK_TIME": 8, "NC_CHUNK_NAME": 64, "NC_DEFLATE_LEVEL": 4, "NC_SHUFFLE": True}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=tmpdir, nc_chunking="snapshot", nc_chunk_time=8, nc_chunk_name=64,
+                                      nc_deflate_level=4, nc_shuffle=True, verbose=False)
+            sim.write_param()
+
+            param = swiftest.io.read_swiftest_param(os.path.join(tmpdir, "param.in"), {}, verbose=False)
+            for key, value in expected.items():
+                self.assertEqual(param[key], value, msg=f"{key} did not round trip through the parameter file")
+                self.assertIs(type(param[key]), type(value))
+        return
+
+    def test_autotune(self):
+        """
+        Tests that the AUTO interaction loop and encounter check options record their selection and give the same result as the
+        default methods.
+        """
+        print("\ntest_autotune: Tests that the AUTO interaction loop and encounter check options select a method.")
+
+        npl = 20
+        ntp = 10
+        a_pl = rng.uniform(1.0, 3.0, npl)
+        capm_pl = rng.uniform(0.0, 360.0, npl)
+        a_tp = rng.uniform(1.0, 3.0, ntp)
+        capm_tp = rng.uniform(0.0, 360.0, ntp)
+        name_pl = [f"Body_{i:02}" for i in range(npl)]
+        name_tp = [f"TestParticle_{i:02}" for i in range(ntp)]
+
+        rh = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for loops in ["TRIANGULAR", "AUTO"]:
+                simdir = os.path.join(tmpdir, loops)
+                sim = swiftest.Simulation(simdir=simdir, integrator="symba", interaction_loops=loops,
+                                          encounter_check_loops=loops, tstart=0.0, tstop=0.1, dt=0.001, istep_out=100,
+                                          dump_cadence=0, verbose=False)
+                sim.add_body(name="Sun", id=0, a=np.nan, e=np.nan, inc=np.nan, capom=np.nan, omega=np.nan, capm=np.nan,
+                             Gmass=4 * np.pi**2, radius=0.005)
+                sim.add_body(name=name_pl, a=a_pl, e=np.full(npl, 0.05), inc=np.full(npl, 1.0), capom=np.zeros(npl),
+                             omega=np.zeros(npl), capm=capm_pl, Gmass=np.full(npl, 1e-6), radius=np.full(npl, 1e-5))
+                sim.add_body(name=name_tp, a=a_tp, e=np.full(ntp, 0.05), inc=np.full(ntp, 1.0), capom=np.zeros(ntp),
+                             omega=np.zeros(ntp), capm=capm_tp)
+                sim.run()
+                rh[loops] = sim.data['rh'].isel(time=-1).sel(name=name_pl + name_tp)
+
+            for log_file in ["interaction_timer.log", "encounter_check_plpl_timer.log", "encounter_check_pltp_timer.log"]:
+                with open(os.path.join(tmpdir, "AUTO", log_file), 'r') as f:
+                    lines = f.readlines()
+                self.assertTrue(any("the fastest" in line for line in lines), msg=f"No method was selected in {log_file}")
+            with open(os.path.join(tmpdir, "AUTO", "interaction_timer.log"), 'r') as f:
+                npairs = [int(line.split()[2]) for line in f if line.split()[0] in ["TRIANGULAR", "FLAT", "BLOCKED"]]
+            self.assertEqual(npairs, [npl * (npl - 1) // 2] * 3)
+            self.assertTrue(np.allclose(rh["AUTO"].values, rh["TRIANGULAR"].values, rtol=1e-10, atol=0.0, equal_nan=True))
+        return
+
+    def test_encounter_check_grid(self):
+        """
+        Tests that the GRID encounter check finds the same encounters as the TRIANGULAR one by comparing SyMBA runs of a
+        crowded ring of massive bodies and test particles.
+        """
+        print("\ntest_encounter_check_grid: Tests that the GRID encounter check matches the TRIANGULAR one.")
+
+        npl = 50
+        ntp = 200
+        a_pl = rng.uniform(1.0, 1.1, npl)
+        capm_pl = rng.uniform(0.0, 360.0, npl)
+        a_tp = rng.uniform(1.0, 1.1, ntp)
+        capm_tp = rng.uniform(0.0, 360.0, ntp)
+        name_pl = [f"Body_{i:02}" for i in range(npl)]
+        name_tp = [f"TestParticle_{i:03}" for i in range(ntp)]
+
+        rh = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for loops in ["TRIANGULAR", "GRID"]:
+                sim = swiftest.Simulation(simdir=os.path.join(tmpdir, loops), integrator="symba", encounter_check_loops=loops,
+                                          tstart=0.0, tstop=0.1, dt=0.001, istep_out=100, dump_cadence=0, verbose=False)
+                sim.add_body(name="Sun", id=0, a=np.nan, e=np.nan, inc=np.nan, capom=np.nan, omega=np.nan, capm=np.nan,
+                             Gmass=4 * np.pi**2, radius=0.005)
+                sim.add_body(name=name_pl, a=a_pl, e=np.full(npl, 0.01), inc=np.full(npl, 0.1), capom=np.zeros(npl),
+                             omega=np.zeros(npl), capm=capm_pl, Gmass=np.full(npl, 1e-7), radius=np.full(npl, 1e-6),
+                             rhill=np.full(npl, 0.01))
+                sim.add_body(name=name_tp, a=a_tp, e=np.full(ntp, 0.01), inc=np.full(ntp, 0.1), capom=np.zeros(ntp),
+                             omega=np.zeros(ntp), capm=capm_tp)
+                sim.run()
+                rh[loops] = sim.data['rh'].isel(time=-1).sel(name=name_pl + name_tp)
+
+            self.assertTrue(np.allclose(rh["GRID"].values, rh["TRIANGULAR"].values, rtol=1e-10, atol=0.0, equal_nan=True))
+        return
+
+    def test_tree_gravity_accuracy(self):
+        """
+        Tests that test particle orbits computed with the Barnes-Hut octree agree with those computed by direct summation,
+        including a test particle that has a close encounter with a massive body in SyMBA.
+        """
+        print("\ntest_tree_gravity_accuracy: Tests that the tree gravity test particle orbits match direct summation.")
+
+        npl = 40
+        ntp = 20
+        a_pl = rng.uniform(1.0, 5.0, npl)
+        capm_pl = rng.uniform(0.0, 360.0, npl)
+        a_tp = rng.uniform(1.0, 5.0, ntp)
+        capm_tp = rng.uniform(0.0, 360.0, ntp)
+        # Put the first test particle next to the first massive body so that SyMBA flags an encounter
+        a_tp[0] = a_pl[0]
+        capm_tp[0] = capm_pl[0] + 0.05
+        name_tp = [f"TestParticle_{i:02}" for i in range(ntp)]
+
+        rh = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for integrator in ["helio", "symba"]:
+                for tree_gravity in [False, True]:
+                    sim = swiftest.Simulation(simdir=os.path.join(tmpdir, f"{integrator}_{tree_gravity}"),
+                                              integrator=integrator, tree_gravity=tree_gravity, tree_opening_angle=0.3,
+                                              tstart=0.0, tstop=0.1, dt=0.001, istep_out=100, dump_cadence=0,
+                                              verbose=False)
+                    sim.add_body(name="Sun", id=0, a=np.nan, e=np.nan, inc=np.nan, capom=np.nan, omega=np.nan, capm=np.nan,
+                                 Gmass=4 * np.pi**2, radius=0.005)
+                    sim.add_body(name=[f"Body_{i:02}" for i in range(npl)], a=a_pl, e=np.full(npl, 0.05),
+                                 inc=np.full(npl, 1.0), capom=np.zeros(npl), omega=np.zeros(npl), capm=capm_pl,
+                                 Gmass=np.full(npl, 1e-6), radius=np.full(npl, 1e-5), rhill=np.full(npl, 0.01))
+                    sim.add_body(name=name_tp, a=a_tp, e=np.full(ntp, 0.05),
+                                 inc=np.full(ntp, 1.0), capom=np.zeros(ntp), omega=np.zeros(ntp), capm=capm_tp)
+                    sim.run()
+                    rh[integrator, tree_gravity] = sim.data['rh'].isel(time=-1).sel(name=name_tp)
+
+            for integrator in ["helio", "symba"]:
+                err = np.abs(rh[integrator, True] - rh[integrator, False]).max().values
+                self.assertLess(err, 1e-8, msg=f"{integrator}: tree gravity test particle position error {err:.2e} too large")
+        return
+
+    def test_read_output_selection(self):
+        """
+        Tests that frame, body, and variable selections passed to read_output_file match selecting from the full Dataset.
+        """
+        print("\ntest_read_output_selection: Tests that selections are applied when reading an output file.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=tmpdir, verbose=False)
+            sim.add_body(name=["Sun", "Planet"], id=[0, 1], a=[np.nan, 1.0], e=[np.nan, 0.05], inc=[np.nan, 1.0], 
+                         capom=[np.nan, 0.0], omega=[np.nan, 0.0], capm=[np.nan, 0.0], Gmass=[4 * np.pi**2, 1e-5], 
+                         radius=[0.005, 1e-5])
+            sim.add_body(a=[1.5, 2.0], e=[0.1, 0.2], inc=[0.0, 5.0], capom=[0.0, 10.0], omega=[0.0, 20.0], capm=[0.0, 90.0])
+            frames = [sim.data.isel(time=[0]).assign_coords(time=[float(t)]) for t in range(4)]
+            frames = [frame.assign(a=frame['a'] * (1.0 + t)) for t, frame in enumerate(frames)]
+            xr.concat(frames, dim="time").to_netcdf(os.path.join(tmpdir, sim.param['BIN_OUT']))
+
+            sim.read_output_file(read_init_cond=False)
+            full = sim.data
+            sim.read_output_file(read_init_cond=False, time=slice(1, None, 2), ids=[1, 3], variables=["a", "e"])
+            self.assertEqual(set(sim.data.data_vars), {"a", "e"})
+            self.assertTrue(np.array_equal(sim.data.time.values, [1.0, 3.0]))
+            expected = full[["a", "e"]].isel(time=[1, 3]).sel(name=full['name'].values[[1, 3]])
+            self.assertTrue(sim.data['a'].identical(expected['a']))
+
+            sim.read_output_file(read_init_cond=False, time=-1)
+            self.assertTrue(sim.data.identical(full.isel(time=[-1])))
+            with self.assertRaises(ValueError):
+                sim.read_output_file(read_init_cond=False, variables=["not_a_variable"])
+        return
+
+    def test_watch(self):
+        """
+        Tests that watch yields each frame of a growing output file exactly once.
+        """
+        print("\ntest_watch: Tests that newly appended output frames are yielded while following a file.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=tmpdir, verbose=False)
+            sim.add_body(name=["Sun", "Planet"], id=[0, 1], a=[np.nan, 1.0], e=[np.nan, 0.05], inc=[np.nan, 1.0], 
+                         capom=[np.nan, 0.0], omega=[np.nan, 0.0], capm=[np.nan, 0.0], Gmass=[4 * np.pi**2, 1e-5], 
+                         radius=[0.005, 1e-5])
+            frames = [sim.data.isel(time=[0]).assign_coords(time=[float(t)]) for t in range(5)]
+            data_file = os.path.join(tmpdir, sim.param['BIN_OUT'])
+
+            xr.concat(frames[:2], dim="time").to_netcdf(data_file, unlimited_dims=["time"])
+            watcher = sim.watch(poll_interval=0.01, timeout=0.2)
+            first = next(watcher)
+            self.assertTrue(np.array_equal(first.time.values, [0.0]))
+
+            xr.concat(frames, dim="time").to_netcdf(data_file, unlimited_dims=["time"])
+            rest = list(watcher)
+            self.assertTrue(np.array_equal(xr.concat([first] + rest, dim="time").time.values, np.arange(5.0)))
+
+            # A last frame whose ntp value has not been written yet is held back when the watcher times out, but a frame where a 
+            # variable is legitimately all fill values is not
+            emptied = frames[0].assign_coords(time=[5.0])
+            emptied['a'] = xr.full_like(emptied['a'], np.nan)
+            fill = netCDF4.default_fillvals['i4']
+            partial = frames[0].assign_coords(time=[6.0])
+            partial['ntp'] = xr.full_like(partial['ntp'], fill)
+            xr.concat(frames + [emptied, partial], dim="time").to_netcdf(data_file, unlimited_dims=["time"], 
+                                                                         encoding={"ntp": {"dtype": "i4", "_FillValue": fill}})
+            frames_read = list(sim.watch(poll_interval=0.01, timeout=0.1))
+            self.assertTrue(np.array_equal(xr.concat(frames_read, dim="time").time.values, np.arange(6.0)))
+
+            # Once the writer has finished, all remaining frames are yielded
+            param = sim.param.copy()
+            param['BIN_OUT'] = data_file
+            frames_read = list(swiftest.io.tail_output(param, poll_interval=0.01, start=6, until=lambda: True))
+            self.assertTrue(np.array_equal(xr.concat(frames_read, dim="time").time.values, [6.0]))
+        return
+
+    def test_fix_types(self):
+        """
+        Tests that fix_types leaves variables with the correct type untouched, keeps Dask arrays lazy, and strips padded strings.
+        """
+        print("\ntest_fix_types: Tests that type normalization avoids unnecessary copies.")
+
+        a = np.linspace(1.0, 2.0, 6).reshape(2, 3)
+        ds = xr.Dataset({"a": (("time", "name"), a), 
+                         "e": (("time", "name"), np.zeros((2, 3), dtype=np.float32)),
+                         "id": (("name",), np.arange(3, dtype=np.int32))},
+                        coords={"time": [0.0, 1.0], "name": np.array([b"Sun   ", b"Earth ", b"Mars  "])})
+        fixed = swiftest.io.fix_types(ds)
+        self.assertTrue(np.shares_memory(fixed["a"].values, a))
+        self.assertEqual(fixed["e"].dtype, np.float64)
+        self.assertEqual(fixed["id"].dtype, np.int64)
+        self.assertEqual(list(fixed["name"].values), ["Sun", "Earth", "Mars"])
+
+        fixed_lazy = swiftest.io.fix_types(ds.chunk({"time": 1}))
+        self.assertIsNotNone(fixed_lazy["e"].chunks)
+        self.assertTrue(fixed_lazy.compute().identical(fixed))
+
+        # Names without padding are not stripped, but are still truncated to the 32 character name length of the output file
+        long_name = "Comet" + "x" * 40
+        fixed = swiftest.io.fix_types(ds.assign_coords(name=["Sun", "Earth", long_name]))
+        self.assertEqual(list(fixed["name"].values), ["Sun", "Earth", long_name[:32]])
+        return
+
+    def test_sharded_output(self):
+        """
+        Tests that output file shards are read as a single Dataset, including a body that moved between shards, and that they
+        can be merged into the shared output file.
+        """
+        print("\ntest_sharded_output: Tests that output file shards are combined when read and merged.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = swiftest.Simulation(simdir=tmpdir, verbose=False)
+            sim.add_body(name=["Sun", "Planet"], id=[0, 1], a=[np.nan, 1.0], e=[np.nan, 0.05], inc=[np.nan, 1.0],
+                         capom=[np.nan, 0.0], omega=[np.nan, 0.0], capm=[np.nan, 0.0], Gmass=[4 * np.pi**2, 1e-5],
+                         radius=[0.005, 1e-5])
+            sim.add_body(name=["TP1", "TP2"], a=[1.5, 2.0], e=[0.1, 0.2], inc=[0.0, 5.0], capom=[0.0, 10.0], omega=[0.0, 20.0],
+                         capm=[0.0, 90.0])
+            frames = [sim.data.isel(time=[0]).assign_coords(time=[float(t)]) for t in range(4)]
+            frames = [frame.assign(a=frame['a'] * (1.0 + t)) for t, frame in enumerate(frames)]
+            full = xr.concat(frames, dim="time")
+            data_file = os.path.join(tmpdir, sim.param['BIN_OUT'])
+            full.to_netcdf(data_file)
+            sim.read_output_file(read_init_cond=False)
+            expected = sim.data
+            os.remove(data_file)
+
+            # TP1 is moved from image 1 to image 2 after the second frame
+            float_vars = [v for v in full.data_vars if full[v].dtype.kind == "f" and "name" in full[v].dims]
+            shard1 = full.sel(name=["Sun", "Planet", "TP1"])
+            shard1[float_vars] = shard1[float_vars].where((shard1.name != "TP1") | (shard1.time < 2))
+            shard2 = full.sel(name=["TP1", "TP2"])
+            shard2[float_vars] = shard2[float_vars].where((shard2.name != "TP1") | (shard2.time >= 2))
+            shard1 = shard1.assign(ntp=("time", [1, 1, 0, 0]))
+            shard2 = shard2.assign(ntp=("time", [1, 1, 2, 2]))
+            shard1.to_netcdf(os.path.join(tmpdir, "data.img001.nc"))
+            shard2.to_netcdf(os.path.join(tmpdir, "data.img002.nc"))
+
+            sim.read_output_file(read_init_cond=False)
+            self.assertEqual(list(sim.data.name.values), list(expected.name.values))
+            self.assertTrue(sim.data['a'].identical(expected['a']))
+            self.assertTrue(sim.data['Gmass'].identical(expected['Gmass']))
+            self.assertTrue(np.array_equal(sim.data['ntp'].values, [2, 2, 2, 2]))
+
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", xr.SerializationWarning)
+                swiftest.io.merge_sharded_output(data_file, remove_shards=True, verbose=False)
+            self.assertEqual(swiftest.io.shard_file_names(data_file), [])
+            sim.read_output_file(read_init_cond=False)
+            self.assertTrue(sim.data['a'].identical(expected['a']))
+
+            # After a restart from the merged file at the last frame, the new shards are combined with the merged file
+            later = xr.concat(frames[:3], dim="time").assign_coords(time=[3.0, 4.0, 5.0])
+            later['a'] = later['a'] * 10.0
+            later.sel(name=["Sun", "Planet", "TP1"]).assign(ntp=("time", [1, 1, 1])).to_netcdf(os.path.join(tmpdir, "data.img001.nc"))
+            later.sel(name=["TP2"]).assign(ntp=("time", [1, 1, 1])).to_netcdf(os.path.join(tmpdir, "data.img002.nc"))
+            os.utime(data_file, (0, 0))
+            sim.read_output_file(read_init_cond=False)
+            self.assertTrue(np.array_equal(sim.data.time.values, np.arange(6.0)))
+            self.assertEqual(list(sim.data.name.values), list(expected.name.values))
+            self.assertTrue(sim.data['a'].isel(time=slice(0, 3)).identical(expected['a'].isel(time=slice(0, 3))))
+            self.assertTrue(np.allclose(sim.data['a'].isel(time=slice(3, 6)).values, 10.0 * expected['a'].isel(time=slice(0, 3)).values, 
+                                        equal_nan=True))
+            self.assertTrue(np.array_equal(sim.data['ntp'].values, [2, 2, 2, 2, 2, 2]))
+
+            swiftest.io.merge_sharded_output(data_file, remove_shards=True, verbose=False)
+            merged = sim.data
+            sim.read_output_file(read_init_cond=False)
+            self.assertTrue(sim.data['a'].identical(merged['a']))
+        return
+
+    def test_coarray_balance(self):
+        """
+        Tests that a Coarray run records the test particle cost split in the load balancer log and gives the same result as a run
+        without Coarrays.
+        """
+        print("\ntest_coarray_balance: Tests that the Coarray load balancer logs the test particle cost split.")
+
+        ntp = 20
+        name_tp = [f"TestParticle_{i:02}" for i in range(ntp)]
+        a_tp = rng.uniform(1.0, 3.0, ntp)
+        capm_tp = rng.uniform(0.0, 360.0, ntp)
+
+        rh = {}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for coarray in [False, True]:
+                simdir = os.path.join(tmpdir, f"coarray_{coarray}")
+                sim = swiftest.Simulation(simdir=simdir, integrator="whm", coarray=coarray, tstart=0.0, tstop=0.1, dt=0.01,
+                                          istep_out=1, dump_cadence=1, verbose=False)
+                sim.add_solar_system_body(major_bodies)
+                sim.add_body(name=name_tp, a=a_tp, e=np.full(ntp, 0.05), inc=np.full(ntp, 1.0), capom=np.zeros(ntp),
+                             omega=np.zeros(ntp), capm=capm_tp)
+                sim.run()
+                rh[coarray] = sim.data['rh'].isel(time=-1).sel(name=name_tp)
+            self.assertTrue(np.allclose(rh[True].values, rh[False].values, rtol=1e-12, atol=0.0))
+
+            log_file = os.path.join(tmpdir, "coarray_True", "coarray_balance.log")
+            if not os.path.exists(log_file):
+                self.skipTest("Swiftest was not compiled with Coarray support")
+            with open(log_file, 'r') as f:
+                lines = [line.split() for line in f.readlines()]
+            # Each check lists the number of test particles and the step time of every image
+            images = [line for line in lines if len(line) == 3 and line[0].isdigit()]
+            self.assertGreater(len(images), 0)
+            for img, ntp_img, wall_img in images:
+                self.assertEqual(int(ntp_img), ntp)
+                self.assertGreaterEqual(float(wall_img), 0.0)
+            self.assertTrue(any("step time per test particle" in " ".join(line) for line in lines))
+        return
+
+    def test_ephemeris_cache(self):
+        """
+        Tests that solar system bodies are read back from the ephemeris cache in offline mode, and that a cache miss in offline
+        mode raises an exception without querying JPL/Horizons.
+        """
+        print("\ntest_ephemeris_cache: Tests that the ephemeris cache works in offline mode.")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_dir = os.path.join(tmpdir, "cache")
+            sim = swiftest.Simulation(simdir=os.path.join(tmpdir, "simdata"), verbose=False)
+            with self.assertRaises(FileNotFoundError):
+                sim.add_solar_system_body(["Sun", "Mars"], cache_dir=cache_dir, offline=True)
+
+            cache_file = swiftest.init_cond._ephemeris_cache_file(cache_dir, "Mars", None, sim.ephemeris_date, sim.param)
+            nanvec = np.full(3, np.nan)
+            body = (-1, "Mars", 1.52, 0.093, 1.85, 49.5, 286.5, 19.4, nanvec, nanvec, 9.55e-11, None, None, nanvec, nanvec, None, None)
+            swiftest.init_cond._ephemeris_cache_write(cache_file, body)
+
+            sim.add_solar_system_body(["Sun", "Mars"], cache_dir=cache_dir, offline=True)
+            self.assertEqual(list(sim.data["name"].values), ["Sun", "Mars"])
+            self.assertAlmostEqual(float(sim.data["a"].sel(name="Mars").values), 1.52)
+
+            # The observer location passed to Horizons is part of the cache key
+            self.assertNotEqual(cache_file, swiftest.init_cond._ephemeris_cache_file(cache_dir, "Mars", None, sim.ephemeris_date, 
+                                                                                      sim.param, location="@0"))
+            self.assertEqual(cache_file, swiftest.init_cond._ephemeris_cache_file(cache_dir, "Mars", None, sim.ephemeris_date, 
+                                                                                   sim.param, location="@sun"))
+        return
        
         
 if __name__ == '__main__':